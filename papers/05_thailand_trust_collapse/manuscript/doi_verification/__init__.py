@@ -0,0 +1,82 @@
+"""
+DOI verification for .bib files, as a library.
+==============================================
+The code behind ``verify_dois.py``, split by stage so other scripts and
+R/Quarto chunks can call the parts they need:
+
+    parser      parse_bib_entries, iter_bib_file, parse_bib_string
+    verifier    verify_doi_crossref, verify_batch, clean_doi, result_status
+    cache       DOICache (the shared on-disk CrossRef cache)
+    report      generate_report, REPORT_WRITERS
+    progress    load_progress, save_progress, plan_resume
+    revalidate  plan_revalidation (which saved results to check again)
+    store       ResultStore (results, report rows and runs in SQLite)
+    snapshots   list_snapshots, diff_snapshots (run-to-run changes)
+    ...         offline, suggest, duplicates, isbn, similarity, metrics,
+                ratelimit, profiling, workspace, watch, cli
+
+Importing the package loads nothing: each name below is imported from its
+submodule on first use, and heavy dependencies (requests, asyncio, process
+pools, cProfile) only when a code path needs them, so regenerating a report
+never pays for the HTTP stack. Nothing is ever installed on import.
+
+Usage:
+    from doi_verification import parse_bib_entries, load_progress, generate_report
+    entries = parse_bib_entries('references.bib')
+
+    # R, through reticulate
+    dv <- reticulate::import_from_path('doi_verification', path = 'manuscript')
+    entries <- dv$parse_bib_entries('references.bib')
+
+    python -m doi_verification references.bib --report  # same as verify_dois.py
+"""
+
+import importlib
+
+_EXPORTS = {
+    'BibEntry': 'records', 'VerificationResult': 'records', 'ISBNResult': 'records',
+    'is_transient': 'records',
+    'parse_bib_entries': 'parser', 'parse_bib_string': 'parser',
+    'iter_bib_file': 'parser', 'read_bib_entry': 'parser',
+    'IncrementalBibParser': 'parser',
+    'DOICache': 'cache', 'DEFAULT_CACHE_DIR': 'cache',
+    'OfflineIndex': 'offline',
+    'RequestMetrics': 'metrics',
+    'RateController': 'ratelimit', 'RetryPolicy': 'ratelimit',
+    'CROSSREF_API': 'verifier', 'validate_doi_format': 'verifier', 'clean_doi': 'verifier',
+    'doi_key': 'verifier', 'verify_doi_crossref': 'verifier', 'verify_batch': 'verifier',
+    'fetch_crossref_batch': 'verifier', 'verify_entries_async': 'verifier',
+    'result_status': 'verifier',
+    'score_titles': 'similarity',
+    'TITLE_SCORERS': 'similarity', 'DEFAULT_TITLE_SCORER': 'similarity',
+    'TitleIndex': 'suggest',
+    'find_duplicates': 'duplicates',
+    'normalize_isbn': 'isbn', 'isbn_status': 'isbn', 'lookup_book': 'isbn',
+    'OpenLibrary': 'isbn', 'GoogleBooks': 'isbn', 'verify_isbns_async': 'isbn',
+    'load_progress': 'progress', 'save_progress': 'progress', 'plan_resume': 'progress',
+    'ProgressJournal': 'progress',
+    'plan_revalidation': 'revalidate',
+    'ResultStore': 'store', 'STORE_FILE': 'store',
+    'list_snapshots': 'snapshots', 'diff_snapshots': 'snapshots',
+    'generate_report': 'report', 'iter_report_rows': 'report',
+    'REPORT_WRITERS': 'report', 'write_duplicates_csv': 'report',
+    'discover_bib_files': 'workspace',
+    'FileWatcher': 'watch',
+    'PROFILER': 'profiling',
+    'main': 'cli',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
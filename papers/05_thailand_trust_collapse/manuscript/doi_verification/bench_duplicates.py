@@ -0,0 +1,167 @@
+"""
+Duplicate detection benchmark on synthetic libraries.
+=====================================================
+Builds libraries of random titles (Zipf-distributed words, stopwords,
+subtitles) and injects duplicates of a share of the entries: a swapped
+letter, the subtitle dropped or added, upper-case and extra spaces, or the
+same DOI in another case. Times ``find_duplicates`` with cold caches and
+reports the injected pairs it clusters, the clustered pairs nobody injected,
+and the candidate pairs blocking left to score, against every pair a
+brute-force scan would score. Up to ``--brute-max`` entries the brute-force
+scan is run too, to check blocking loses none of its near-duplicates.
+
+    python -m doi_verification.bench_duplicates
+    python -m doi_verification.bench_duplicates --sizes 2088 --brute-max 2088
+"""
+
+import random
+import argparse
+import itertools
+import time
+
+from .records import BibEntry
+from .verifier import doi_key
+from .similarity import normalize_title, title_tokens
+from .suggest import title_ngrams
+from .duplicates import (DUPLICATE_BUCKET_CAP, DUPLICATE_MIN_TOKENS, _duplicate_titles,
+                         blocking_keys, duplicate_similarity, find_duplicates)
+
+DUPLICATE_KINDS = ('typo', 'subtitle', 'markup', 'doi')
+_STOPWORDS = ('the', 'of', 'and', 'in', 'a', 'for')
+
+
+def synthetic_library(n: int, seed: int = 3, dup_share: float = 0.03
+                      ) -> tuple[list[BibEntry], list[tuple[str, str, str]]]:
+    """About ``n`` entries, and the ``(key, duplicate key, kind)`` injected."""
+    rng = random.Random(seed)
+    vocab = [''.join(rng.choice('abcdefghijklmnoprstuvw') for _ in range(rng.randint(3, 11)))
+             for _ in range(8000)]
+    cum_weights = list(itertools.accumulate(1 / (i + 1) ** 0.9 for i in range(len(vocab))))
+    surnames = [f'Name{i}' for i in range(3000)]
+
+    def title() -> str:
+        words = rng.choices(vocab, cum_weights=cum_weights, k=rng.randint(4, 12))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words)), rng.choice(_STOPWORDS))
+        text = ' '.join(words).capitalize()
+        if rng.random() < 0.4:
+            text += ': ' + ' '.join(rng.choices(vocab, cum_weights=cum_weights,
+                                                k=rng.randint(2, 6)))
+        return text
+
+    entries, injected = [], []
+    i = 0
+    while len(entries) < n:
+        text, author, year = title(), rng.choice(surnames), rng.randint(1980, 2025)
+        fields = {'title': text, 'author': f'{author}, J. and Other, B.', 'date': str(year)}
+        if rng.random() < 0.55:
+            fields['doi'] = f'10.{rng.randint(1000, 9999)}/x.{i}'
+        entries.append(BibEntry('ARTICLE', f'k{i}', fields))
+        i += 1
+        if rng.random() >= dup_share:
+            continue
+        kind = rng.choice(DUPLICATE_KINDS)
+        copy = {'title': text, 'author': f'{author}, J.', 'date': str(year - rng.randint(0, 2))}
+        if kind == 'typo':
+            p = rng.randrange(len(text) - 1)
+            copy['title'] = text[:p] + text[p + 1] + text[p] + text[p + 2:]
+        elif kind == 'subtitle':
+            main = text.split(':')[0]
+            long_enough = ':' in text and len(title_tokens(main)) >= DUPLICATE_MIN_TOKENS
+            copy['title'] = main if long_enough else text + ': a preprint'
+        elif kind == 'markup':
+            copy['title'] = text.upper().replace(' ', '  ', 1)
+        elif 'doi' in fields:
+            copy['doi'] = fields['doi'].upper()
+        else:
+            continue
+        entries.append(BibEntry('MISC', f'k{i - 1}dup', copy))
+        injected.append((f'k{i - 1}', f'k{i - 1}dup', kind))
+    return entries, injected
+
+
+def clear_caches():
+    for cached in (normalize_title, title_tokens, title_ngrams, blocking_keys,
+                   _duplicate_titles):
+        cached.cache_clear()
+
+
+def candidate_count(entries: list[BibEntry]) -> int:
+    """Pairs ``find_duplicates`` scores: sharing a block under the size cap."""
+    blocks = {}
+    titled = [entry for entry in entries if entry.fields.get('title')]
+    for i, entry in enumerate(titled):
+        for key in blocking_keys(entry.fields['title']):
+            blocks.setdefault(key, []).append(i)
+    candidates = set()
+    for members in blocks.values():
+        if 1 < len(members) <= DUPLICATE_BUCKET_CAP:
+            candidates.update(itertools.combinations(members, 2))
+    return len(candidates)
+
+
+def clustered_pairs(clusters: list[dict], reason: str = None) -> set[tuple[str, str]]:
+    pairs = set()
+    for cluster in clusters:
+        if reason is None or cluster['reason'] == reason:
+            keys = sorted(entry.key for entry in cluster['entries'])
+            pairs.update(itertools.combinations(keys, 2))
+    return pairs
+
+
+def brute_force_pairs(entries: list[BibEntry]) -> set[tuple[str, str]]:
+    """Every title-duplicate pair, found by scoring all pairs."""
+    pairs = set()
+    titled = [entry for entry in entries if entry.fields.get('title')]
+    for a, b in itertools.combinations(titled, 2):
+        if (a.fields.get('doi') and b.fields.get('doi')
+                and doi_key(a.fields['doi']) == doi_key(b.fields['doi'])):
+            continue
+        if duplicate_similarity(a, b) is not None:
+            pairs.add(tuple(sorted((a.key, b.key))))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time find_duplicates on synthetic libraries with injected duplicates')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2088, 50_000],
+                        help='Entries per synthetic library (default: 2088 50000)')
+    parser.add_argument('--dup-share', type=float, default=0.03,
+                        help='Share of entries given a duplicate (default: 0.03)')
+    parser.add_argument('--brute-max', type=int, default=0,
+                        help='Largest library also scanned pair by pair (default: 0, none; '
+                             'about 30 s at 2000 entries)')
+    parser.add_argument('--seed', type=int, default=3, help='Random seed (default: 3)')
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'time':>8} {'injected':>9} {'found':>6} {'spurious':>9} "
+          f"{'candidates':>11} {'all pairs':>14}")
+    for n in args.sizes:
+        entries, injected = synthetic_library(n, args.seed, args.dup_share)
+        clear_caches()
+        start = time.perf_counter()
+        clusters = find_duplicates(entries)
+        elapsed = time.perf_counter() - start
+        pairs = clustered_pairs(clusters)
+        truth = {tuple(sorted((a, b))) for a, b, _ in injected}
+        print(f"{len(entries):8d} {elapsed:7.2f}s {len(truth):9d} {len(truth & pairs):6d} "
+              f"{len(pairs - truth):9d} {candidate_count(entries):11d} "
+              f"{len(entries) * (len(entries) - 1) // 2:14d}")
+        by_kind = {kind: [0, 0] for kind in DUPLICATE_KINDS}
+        for a, b, kind in injected:
+            by_kind[kind][0] += 1
+            by_kind[kind][1] += tuple(sorted((a, b))) in pairs
+        print('         ' + ', '.join(f'{kind} {found}/{total}'
+                                      for kind, (total, found) in by_kind.items()))
+        if n <= args.brute_max:
+            start = time.perf_counter()
+            brute = brute_force_pairs(entries)
+            elapsed = time.perf_counter() - start
+            found = len(brute & clustered_pairs(clusters, 'title'))
+            print(f"         brute force: {len(brute)} title pairs in {elapsed:.1f}s, "
+                  f"blocking found {found}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Parser benchmark: ``parse_bib_entries`` against the old regex parser.
+=====================================================================
+Writes synthetic bib files of increasing size (about 400 bytes per entry,
+with nested braces, numeric years and long abstracts, like a Paperpile
+export) and times both parsers on each. The tokenizer's time per entry
+should stay flat as the file grows; the old parser, which re-searched
+``content[i:]`` for every entry, grows with the file, so it is only timed
+up to ``--legacy-max`` entries.
+
+    python -m doi_verification.bench_parser
+    python -m doi_verification.bench_parser --sizes 2000 10000 --legacy-max 10000
+"""
+
+import re
+import os
+import random
+import argparse
+import tempfile
+import time
+
+from .parser import parse_bib_entries
+
+_WORDS = ('Trust', 'democracy', 'in', '{Thailand}', 'the', 'of', 'Asian', '{COVID-19}',
+          'legitimacy', 'survey', 'institutions', 'political', 'change')
+
+
+def synthetic_bib(n: int, seed: int = 0) -> str:
+    """``n`` entries in the subset of BibTeX the old parser understood.
+
+    Values are braced (with nested braces) or bare numbers; no ``@string``
+    macros, quotes or ``#``, so both parsers can be compared field by field.
+    """
+    rng = random.Random(seed)
+    entries = []
+    for i in range(n):
+        title = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(4, 14)))
+        date = f'{rng.randint(1990, 2025)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}'
+        fields = [f'  title = {{{title}}}',
+                  '  author = {Smith, {J.} and Doe, A.}',
+                  f'  date = {{{date}}}',
+                  f"  journal = {{Journal of {rng.choice(['Democracy', 'Politics'])}}}"]
+        if rng.random() < 0.55:
+            fields.append(f'  doi = {{10.{rng.randint(1000, 9999)}/abc.{i}}}')
+        if rng.random() < 0.3:
+            fields.append(f'  isbn = {{978{rng.randint(1000000000, 9999999999)}}}')
+        abstract = 'Long abstract text with {nested {braces}} and more. ' * rng.randint(1, 5)
+        fields.append(f'  abstract = {{{abstract}}}')
+        fields.append(f'  year = {rng.randint(1990, 2025)}')
+        entry_type = rng.choice(('article', 'book', 'inbook', 'incollection', 'misc'))
+        entries.append(f'@{entry_type}{{Key{i}-{rng.randint(10, 99)},\n'
+                       + ',\n'.join(fields) + '\n}\n')
+    return '\n'.join(entries)
+
+
+def legacy_parse_bib_entries(bib_path: str) -> list[dict]:
+    """The regex parser ``parse_bib_entries`` replaced, kept as the baseline."""
+    with open(bib_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    entries = []
+    i = 0
+    while i < len(content):
+        match = re.search(r'@(\w+)\s*\{', content[i:])
+        if not match:
+            break
+
+        entry_type = match.group(1).upper()
+        key_start = i + match.end()
+
+        comma_pos = content.find(',', key_start)
+        if comma_pos == -1:
+            i = key_start
+            continue
+        cite_key = content[key_start:comma_pos].strip()
+
+        brace_depth = 1
+        j = comma_pos + 1
+        while j < len(content) and brace_depth > 0:
+            if content[j] == '{':
+                brace_depth += 1
+            elif content[j] == '}':
+                brace_depth -= 1
+            j += 1
+
+        entry_body = content[comma_pos + 1:j - 1]
+        i = j
+
+        fields = {}
+        field_pattern = re.compile(
+            r'(\w+)\s*=\s*(?:\{((?:[^{}]|\{[^{}]*\})*)\}|(\d+))',
+            re.DOTALL
+        )
+        for fm in field_pattern.finditer(entry_body):
+            field_name = fm.group(1).lower()
+            field_value = fm.group(2) if fm.group(2) is not None else fm.group(3)
+            field_value = re.sub(r'\s+', ' ', field_value).strip()
+            field_value = field_value.replace('{', '').replace('}', '')
+            fields[field_name] = field_value
+
+        entries.append({
+            'type': entry_type,
+            'key': cite_key,
+            'fields': fields
+        })
+
+    return entries
+
+
+def time_parser(parse, path: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    entries = parse(path)
+    return time.perf_counter() - start, len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time parse_bib_entries against the old regex parser on synthetic bib files')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 25_000, 50_000, 100_000],
+                        help='Entries per synthetic file (default: 10000 25000 50000 100000)')
+    parser.add_argument('--legacy-max', type=int, default=25_000,
+                        help='Largest file the old parser is timed on (default: 25000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    print(f"{'entries':>9} {'MB':>6} {'tokenizer':>10} {'us/entry':>9} "
+          f"{'regex':>9} {'us/entry':>9}")
+    with tempfile.TemporaryDirectory(prefix='doi-parser-') as workdir:
+        for n in args.sizes:
+            path = os.path.join(workdir, f'synthetic_{n}.bib')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(synthetic_bib(n, args.seed))
+            size = os.path.getsize(path) / 1e6
+            new, count = time_parser(parse_bib_entries, path)
+            line = f"{n:9d} {size:6.1f} {new:9.2f}s {new / count * 1e6:9.1f}"
+            if n <= args.legacy_max:
+                old, _ = time_parser(legacy_parse_bib_entries, path)
+                line += f" {old:8.2f}s {old / count * 1e6:9.1f}"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
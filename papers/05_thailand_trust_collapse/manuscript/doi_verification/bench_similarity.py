@@ -0,0 +1,115 @@
+"""
+Title scorer benchmark and threshold calibration.
+=================================================
+Reads the bib/CrossRef title pairs of a results CSV and, for every
+``--title-scorer``, times scoring them all (cold, then with the title
+caches warm) and counts the pairs flagged at its
+``TITLE_MISMATCH_THRESHOLDS`` cutoff, and how many of the pairs the
+``sequence`` scorer flags it flags too. The original ``similarity()``
+(regexes and SequenceMatcher on every call) is timed alongside.
+
+    python -m doi_verification.bench_similarity ../../../doi-check/doi_verification_results.csv
+    python -m doi_verification.bench_similarity results.csv --sweep 0.3 0.35 0.4 0.5
+    python -m doi_verification.bench_similarity results.csv --show token_set
+"""
+
+import re
+import csv
+import argparse
+import statistics
+import time
+from difflib import SequenceMatcher
+
+from .similarity import (TITLE_MISMATCH_THRESHOLDS, TITLE_SCORERS, _legacy_title,
+                         normalize_title, title_tokens)
+
+
+def original_similarity(a: str, b: str) -> float:
+    """``similarity()`` as it was before the scorers were added, for timing."""
+    if not a or not b:
+        return 0.0
+    a_clean = re.sub(r'[^a-z0-9\s]', '', a.lower())
+    b_clean = re.sub(r'[^a-z0-9\s]', '', b.lower())
+    return SequenceMatcher(None, a_clean, b_clean).ratio()
+
+
+def read_title_pairs(csv_path: str) -> list[tuple[str, str, str]]:
+    """``(cite_key, bib_title, crossref_title)`` for rows that have both titles."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return [(row['cite_key'], row['bib_title'], row['crossref_title'])
+                for row in csv.DictReader(f) if row['bib_title'] and row['crossref_title']]
+
+
+def clear_title_caches():
+    for cached in (normalize_title, title_tokens, _legacy_title):
+        cached.cache_clear()
+
+
+def time_scorer(score, pairs, repeat: int) -> tuple[float, float, list[float]]:
+    """Cold and median warm seconds to score every pair, and the scores."""
+    clear_title_caches()
+    start = time.perf_counter()
+    scores = [score(a, b) for _, a, b in pairs]
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, a, b in pairs:
+            score(a, b)
+        warm.append(time.perf_counter() - start)
+    return cold, statistics.median(warm), scores
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time the title scorers and count the mismatches each one flags')
+    parser.add_argument('results_csv',
+                        help='doi_verification_results.csv with bib and CrossRef titles')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Warm runs per scorer; the median is reported (default: 5)')
+    parser.add_argument('--sweep', type=float, nargs='+', default=None,
+                        help='Also count the pairs each scorer flags at these cutoffs')
+    parser.add_argument('--show', choices=sorted(TITLE_SCORERS), default=None,
+                        help="List the pairs this scorer flags that 'sequence' does not, "
+                             'and the other way round')
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+
+    pairs = read_title_pairs(args.results_csv)
+    print(f"{len(pairs)} title pairs from {args.results_csv}\n")
+    cold, warm, _ = time_scorer(original_similarity, pairs, args.repeat)
+    print(f"{'scorer':12s} {'cold':>9} {'warm':>9} {'cutoff':>7} {'flagged':>8} "
+          f"{'of sequence':>12}")
+    print(f"{'original':12s} {cold * 1e3:7.1f}ms {warm * 1e3:7.1f}ms")
+
+    scores, timings = {}, {}
+    for name, score in TITLE_SCORERS.items():
+        cold, warm, scores[name] = time_scorer(score, pairs, args.repeat)
+        timings[name] = cold, warm
+    cutoff = TITLE_MISMATCH_THRESHOLDS
+    flagged = {name: {i for i, s in enumerate(values) if s < cutoff[name]}
+               for name, values in scores.items()}
+    baseline = flagged['sequence']
+    for name, (cold, warm) in timings.items():
+        print(f"{name:12s} {cold * 1e3:7.1f}ms {warm * 1e3:7.1f}ms {cutoff[name]:7.2f} "
+              f"{len(flagged[name]):8d} {len(flagged[name] & baseline):6d}/{len(baseline)}")
+
+    if args.sweep:
+        print(f"\n{'cutoff':>7} " + ' '.join(f'{name:>12s}' for name in scores))
+        for value in args.sweep:
+            print(f"{value:7.2f} " + ' '.join(
+                f"{sum(s < value for s in values):12d}" for values in scores.values()))
+
+    if args.show:
+        for label, keys in ((f'{args.show} only', flagged[args.show] - baseline),
+                            ('sequence only', baseline - flagged[args.show])):
+            print(f"\n{label} ({len(keys)}):")
+            for i in sorted(keys, key=lambda i: scores[args.show][i]):
+                key, bib_title, crossref_title = pairs[i]
+                print(f"  {scores[args.show][i]:.2f} {scores['sequence'][i]:.2f} {key}: "
+                      f"{bib_title[:60]} | {crossref_title[:50]}")
+
+
+if __name__ == '__main__':
+    main()
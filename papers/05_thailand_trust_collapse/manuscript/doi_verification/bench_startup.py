@@ -0,0 +1,107 @@
+"""
+Startup benchmark: ``python -X importtime`` for ``verify_dois.py --report``.
+=============================================================================
+Runs ``--report`` on a bib file several times in a fresh interpreter and
+prints the median import time, the median wall time and the heaviest
+imports at any depth. The saved progress is copied to a scratch directory
+first, so the real reports are left alone and no request is made.
+
+Pass an older copy of the script with ``--script`` to compare:
+
+    git show HEAD~1:./verify_dois.py > /tmp/verify_dois_old.py
+    python -m doi_verification.bench_startup references.bib \\
+        --script /tmp/verify_dois_old.py --script verify_dois.py
+"""
+
+import re
+import os
+import sys
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+from .progress import PROGRESS_FILE, journal_path_for
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'verify_dois.py')
+_IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)')
+
+
+def parse_importtime(stderr: str) -> tuple[int, dict[str, int]]:
+    """Total import microseconds and each module's cumulative time.
+
+    The total sums the top-level imports, whose cumulative times include
+    everything they pulled in.
+    """
+    total, modules = 0, {}
+    for line in stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if m:
+            modules[m.group(4)] = int(m.group(2))
+            if len(m.group(3)) == 1:
+                total += int(m.group(2))
+    return total, modules
+
+
+def time_report(script: str, bib_path: str,
+                workdir: str) -> tuple[float, int, dict[str, int]]:
+    """Wall seconds and import times of one ``--report`` run."""
+    cmd = [sys.executable, '-X', 'importtime', script, bib_path, '--report',
+           '--output-dir', workdir, '--cache-dir', os.path.join(workdir, 'cache')]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(f"Error: {script} --report failed:\n{proc.stdout}{proc.stderr}")
+    return (wall, *parse_importtime(proc.stderr))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure verify_dois.py --report startup with python -X importtime')
+    parser.add_argument('bibfile', help='Bib file whose saved progress the report is built from')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='Where the progress file lives (default: the bib file\'s directory)')
+    parser.add_argument('--script', action='append', default=None,
+                        help='Script to time; repeat to compare versions '
+                             '(default: the verify_dois.py next to this package)')
+    parser.add_argument('--runs', type=int, default=15,
+                        help='Runs per script; medians are reported (default: 15)')
+    parser.add_argument('--top', type=int, default=8,
+                        help='Heaviest imports to list (default: 8)')
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error('--runs must be at least 1')
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.bibfile))
+    progress_path = os.path.join(output_dir, PROGRESS_FILE)
+    if not os.path.exists(progress_path):
+        print(f"Error: No saved progress at {progress_path}; run a verification first")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory(prefix='doi-startup-') as workdir:
+        for path in (progress_path, journal_path_for(progress_path)):
+            if os.path.exists(path):
+                shutil.copy(path, workdir)
+        for script in args.script or [SCRIPT]:
+            runs = [time_report(script, args.bibfile, workdir) for _ in range(args.runs)]
+            walls = [wall for wall, _, _ in runs]
+            imports = [total for _, total, _ in runs]
+            print(f"{script}")
+            print(f"  imports: {statistics.median(imports) / 1e3:7.1f} ms   "
+                  f"--report wall: {statistics.median(walls) * 1e3:7.1f} ms   "
+                  f"(median of {args.runs})")
+            modules = {}
+            for _, _, times in runs:
+                for name, micros in times.items():
+                    modules.setdefault(name, []).append(micros)
+            heaviest = sorted(modules.items(), key=lambda item: -statistics.median(item[1]))
+            for name, times in heaviest[:args.top]:
+                print(f"    {name:28s} {statistics.median(times) / 1e3:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""The on-disk CrossRef metadata cache shared by every bib file."""
+
+import json
+import time
+import os
+import sqlite3
+import threading
+import zlib
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'verify_dois')
+
+
+class DOICache:
+    """On-disk CrossRef metadata cache shared by every bib file.
+
+    One SQLite file keyed by cleaned DOI (lower-cased; DOIs are
+    case-insensitive) holding the raw CrossRef ``message``, the HTTP status,
+    the fetch time and any ETag/Last-Modified validators. 200s and 404s are
+    cached; transient errors are not. Records older than ``ttl_days`` are
+    revalidated with a conditional request. Safe to share across threads.
+
+    The ISBN stage keeps its book lookups here too, under
+    ``<source>:isbn:<ISBN-13>`` keys, which cannot clash with a DOI.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_days: float = 30):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'crossref.sqlite3')
+        self.ttl = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS works ('
+            ' doi TEXT PRIMARY KEY, status INTEGER NOT NULL, message BLOB,'
+            ' fetched_at REAL NOT NULL, etag TEXT, last_modified TEXT)')
+        self._conn.commit()
+
+    def _get(self, doi: str) -> dict | None:
+        row = self._conn.execute(
+            'SELECT status, message, fetched_at, etag, last_modified FROM works WHERE doi = ?',
+            (doi.lower(),)).fetchone()
+        if row is None:
+            return None
+        status, message, fetched_at, etag, last_modified = row
+        return {
+            'status': status,
+            'message': json.loads(zlib.decompress(message)) if message is not None else None,
+            'fetched_at': fetched_at,
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+
+    def iter_works(self):
+        """Yield ``(doi, message)`` for every cached work with metadata."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doi, message FROM works WHERE doi LIKE '10.%'"
+                ' AND status = 200 AND message IS NOT NULL').fetchall()
+        for doi, message in rows:
+            yield doi, json.loads(zlib.decompress(message))
+
+    def work(self, doi: str) -> dict | None:
+        """The cached CrossRef metadata for ``doi``, without counting a hit."""
+        with self._lock:
+            record = self._get(doi)
+        return record['message'] if record and record['status'] == 200 else None
+
+    def is_fresh(self, doi: str) -> bool:
+        """True if ``doi`` can be answered without touching the network."""
+        with self._lock:
+            row = self._conn.execute('SELECT fetched_at FROM works WHERE doi = ?',
+                                     (doi.lower(),)).fetchone()
+        return row is not None and time.time() - row[0] < self.ttl
+
+    def lookup(self, doi: str) -> tuple[dict | None, bool]:
+        """Return ``(record, fresh)`` and count the hit or miss."""
+        with self._lock:
+            record = self._get(doi)
+            fresh = record is not None and time.time() - record['fetched_at'] < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return record, fresh
+
+    def put(self, doi: str, status: int, message: dict | None,
+            etag: str = None, last_modified: str = None):
+        blob = zlib.compress(json.dumps(message).encode()) if message is not None else None
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO works VALUES (?, ?, ?, ?, ?, ?)',
+                (doi.lower(), status, blob, time.time(), etag, last_modified))
+            self._conn.commit()
+
+    def touch(self, doi: str):
+        """Mark a record as just revalidated (HTTP 304)."""
+        with self._lock:
+            self._conn.execute('UPDATE works SET fetched_at = ? WHERE doi = ?',
+                               (time.time(), doi.lower()))
+            self._conn.commit()
+            self.revalidated += 1
+
+    def expire(self, doi: str):
+        """Make the next lookup of ``doi`` revalidate, whatever its age."""
+        with self._lock:
+            self._conn.execute('UPDATE works SET fetched_at = 0 WHERE doi = ?', (doi.lower(),))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,1166 @@
+"""The ``verify_dois.py`` command line."""
+
+import heapq
+import itertools
+import time
+import sys
+import os
+import argparse
+import contextlib
+import csv
+import json
+import sqlite3
+from dataclasses import replace
+from datetime import datetime
+
+from .profiling import PROFILER, profiled
+from .records import BibEntry, ISBNResult, VerificationResult
+from .parser import IncrementalBibParser, parse_bib_entries
+from .cache import DEFAULT_CACHE_DIR, DOICache
+from .offline import OfflineIndex
+from .metrics import RequestMetrics, format_duration
+from .ratelimit import RateController, RetryPolicy
+from .verifier import (CROSSREF_API, clean_doi, doi_key, result_status, verify_batch,
+                       verify_doi_crossref, verify_entries_async)
+from .similarity import DEFAULT_TITLE_SCORER, TITLE_SCORERS
+from .suggest import TitleIndex
+from .isbn import (BookSource, GOOGLE_BOOKS_API, GoogleBooks, ISBN_KEY_PREFIX,
+                   OPEN_LIBRARY_API, OpenLibrary, is_isbn_key, isbn_key, isbn_progress_key,
+                   isbn_status, normalize_isbn, verify_isbns_async)
+from .progress import (PROGRESS_FILE, ProgressJournal, entry_fingerprint, is_store_path,
+                       journal_path_for, load_progress, plan_resume)
+from .report import DEFAULT_REPORT_FORMATS, REPORT_WRITERS, generate_report, print_report_paths
+from .workspace import discover_bib_files, workspace_output_dirs
+from .watch import FileWatcher
+from .revalidate import plan_revalidation
+from .snapshots import (DIFF_CHANGES, SNAPSHOT_DIR, Snapshot, diff_snapshots, is_broken,
+                        list_snapshots)
+from .store import REPORT_COLUMN_NAMES, SINCE_RUNS, STORE_FILE, ResultStore
+
+
+def open_cache(args) -> DOICache | None:
+    if args.no_cache or args.offline:
+        return None
+    return DOICache(args.cache_dir, ttl_days=args.cache_ttl)
+
+
+def build_suggester(args) -> TitleIndex | None:
+    """Title index over the cached CrossRef works, for DOI suggestions."""
+    if args.no_suggestions or args.no_cache:
+        return None
+    cache = DOICache(args.cache_dir, ttl_days=args.cache_ttl)
+    try:
+        index = TitleIndex.from_cache(cache, args.title_scorer)
+    finally:
+        cache.close()
+    return index if len(index) else None
+
+
+def open_offline(args) -> OfflineIndex | None:
+    if not args.offline:
+        return None
+    if not os.path.exists(args.offline):
+        print(f"Error: Offline snapshot not found: {args.offline}")
+        sys.exit(1)
+    offline = OfflineIndex.open(args.offline, args.cache_dir)
+    print(f"  Offline: {offline.count} works in {offline.path}")
+    return offline
+
+
+def print_estimate(args, to_check: list[BibEntry], cache: DOICache | None, rate: float):
+    to_fetch = len(to_check)
+    if cache:
+        to_fetch -= sum(cache.is_fresh(clean_doi(e.fields['doi'])) for e in to_check)
+        print(f"  Cached (fresh):    {len(to_check) - to_fetch}")
+    to_fetch = -(-to_fetch // args.batch_size)
+
+    est_minutes = (to_fetch / rate) / 60
+    pace = f"{rate:g} req/s to start, adapting to CrossRef's limits"
+    if args.concurrency > 1:
+        pace += f", {args.concurrency} in flight"
+    est_hours = est_minutes / 60
+    if est_hours > 1:
+        print(f"\n  Estimated time: ~{est_hours:.1f} hours at {pace}")
+    else:
+        print(f"\n  Estimated time: ~{est_minutes:.0f} minutes at {pace}")
+    
+    if args.email:
+        print(f"  Using polite pool with: {args.email}")
+    else:
+        print("  Tip: Use --email your@uni.edu for CrossRef's polite pool (faster)")
+
+
+@profiled('verify')
+def run_verification(args, to_check: list[BibEntry], on_result, cache: DOICache | None,
+                     limiter: RateController, metrics: RequestMetrics,
+                     offline: OfflineIndex | None = None):
+    """Verify ``to_check`` with the engine the CLI options select."""
+    if offline:
+        # Local lookups: no pacing, retries or worker threads needed.
+        for entry in to_check:
+            on_result(entry, verify_doi_crossref(entry.fields['doi'], offline=offline))
+        return
+
+    retry = RetryPolicy(max_attempts=args.max_attempts)
+    if args.concurrency > 1:
+        import asyncio
+
+        asyncio.run(verify_entries_async(
+            to_check, on_result, email=args.email, concurrency=args.concurrency,
+            api_url=args.api_url, cache=cache, batch_size=args.batch_size,
+            limiter=limiter, retry=retry, metrics=metrics))
+        return
+
+    import requests
+
+    session = requests.Session()
+    backlog = []  # (due, seq, tries, entry) heap of transient failures
+    seq = itertools.count()
+
+    def verify_single(entry: BibEntry, tries: int = 1):
+        result = verify_doi_crossref(entry.fields['doi'], email=args.email,
+                                     session=session, api_url=args.api_url,
+                                     cache=cache, limiter=limiter, metrics=metrics)
+        on_result(entry, result)
+        if retry.should_retry(result, tries):
+            heapq.heappush(backlog, (time.monotonic() + retry.delay(tries),
+                                     next(seq), tries + 1, entry))
+
+    def retry_due(block: bool = False):
+        # Between main-pass lookups only retries whose backoff has passed run;
+        # at the end, wait for the rest.
+        while backlog and (block or backlog[0][0] <= time.monotonic()):
+            due, _, tries, entry = heapq.heappop(backlog)
+            pause = max(0.0, due - time.monotonic())
+            metrics.record_backoff(pause)
+            time.sleep(pause)
+            verify_single(entry, tries)
+
+    if args.batch_size > 1:
+        for start in range(0, len(to_check), args.batch_size):
+            done_pairs, leftover = verify_batch(
+                to_check[start:start + args.batch_size], email=args.email,
+                session=session, api_url=args.api_url, cache=cache, limiter=limiter,
+                metrics=metrics)
+            for entry, result in done_pairs:
+                on_result(entry, result)
+            for entry in leftover:
+                verify_single(entry)
+            retry_due()
+    else:
+        for entry in to_check:
+            verify_single(entry)
+            retry_due()
+    retry_due(block=True)
+
+
+def isbn_enabled(args) -> bool:
+    return not (args.no_isbn or args.offline)
+
+
+def new_book_sources(args) -> list[BookSource]:
+    return [OpenLibrary(args.openlibrary_url, args.isbn_rate),
+            GoogleBooks(args.google_books_url, args.isbn_rate)]
+
+
+def print_isbn_estimate(args, to_check: list[BibEntry], cache: DOICache | None,
+                        sources: list[BookSource]):
+    isbns = [isbn for isbn, _ in (normalize_isbn(e.fields['isbn']) for e in to_check) if isbn]
+    if cache:
+        isbns = [isbn for isbn in isbns
+                 if not all(cache.is_fresh(f'{source.name}:isbn:{isbn}') for source in sources)]
+    print(f"\n  ISBN lookups:      {len(isbns)} ({len(to_check) - len(isbns)} invalid or cached)")
+    print(f"  Estimated time: ~{format_duration(len(isbns) / args.isbn_rate)} at "
+          f"{args.isbn_rate:g} req/s per source to start, all sources at once")
+
+
+@profiled('isbn')
+def run_isbn_verification(args, to_check: list[BibEntry], on_result, cache: DOICache | None,
+                          sources: list[BookSource], metrics: RequestMetrics):
+    """Check the ISBNs of ``to_check`` on every book source."""
+    import asyncio
+
+    asyncio.run(verify_isbns_async(
+        to_check, on_result, sources, email=args.email, concurrency=args.concurrency,
+        cache=cache, retry=RetryPolicy(max_attempts=args.max_attempts), metrics=metrics))
+
+
+def print_isbn_rates(sources: list[BookSource]):
+    for source in sources:
+        print(f"  {source.label}: finished at {source.limiter.rate:.2f} req/s, "
+              f"{source.limiter.throttled} throttled responses retried")
+
+
+def new_rate_controller(args, rate: float) -> RateController:
+    return RateController(rate, max_rate=args.max_rate)
+
+
+def print_rate(limiter: RateController):
+    advertised = f"{limiter.advertised:g} req/s" if limiter.advertised else 'none seen'
+    print(f"\n  Rate: finished at {limiter.rate:.2f} req/s (CrossRef limit: {advertised}), "
+          f"{limiter.throttled} throttled responses retried")
+
+
+def revalidation_queue(args, entries_with_doi: list[BibEntry],
+                       progress: dict[str, VerificationResult],
+                       to_check: list[BibEntry]) -> list[BibEntry]:
+    """The saved results ``--revalidate`` re-checks this run, most urgent first."""
+    if not args.revalidate:
+        return []
+    revalidate, counts = plan_revalidation(entries_with_doi, progress, args.revalidate,
+                                           exclude=to_check, title_scorer=args.title_scorer)
+    due = sum(tier['due'] for tier in counts.values())
+    print(f"  Revalidate: {len(revalidate)} of {due} due ("
+          + ', '.join(f"{name} {tier['picked']}/{tier['due']}"
+                      for name, tier in counts.items()) + ')')
+    return revalidate
+
+
+def expire_cached(cache: DOICache | None, entries: list[BibEntry]):
+    """Make the lookups of ``entries`` revalidate their cache records."""
+    if cache:
+        for entry in entries:
+            cache.expire(clean_doi(entry.fields['doi']))
+
+
+def print_still_failing(results):
+    failing = sum(result.retryable for result in results)
+    if failing:
+        print(f"\n  ↻ {failing} entries still failing transiently; "
+              f"run again with --resume to retry them")
+
+
+def progress_rate(metrics: RequestMetrics, remaining: int) -> str:
+    """Rolling throughput and ETA for the progress lines."""
+    rate = metrics.rolling_rate()
+    if not rate:
+        return ''
+    text = f", {rate:.1f}/s"
+    if remaining:
+        text += f", ETA {format_duration(remaining / rate)}"
+    return text
+
+
+def write_metrics(metrics: RequestMetrics, output_dir: str, cache: DOICache | None):
+    json_path, prom_path, data = metrics.write(output_dir, cache)
+    latency, split = data['latency_seconds'], data['time_split_seconds']
+    if data['requests']:
+        print(f"\n  Requests: {data['requests']} in {format_duration(data['elapsed_seconds'])} "
+              f"({data['requests_per_second']:.2f}/s), latency p50 {latency['p50']:.2f}s "
+              f"p95 {latency['p95']:.2f}s p99 {latency['p99']:.2f}s, "
+              f"429 rate {data['rate_429']:.1%}")
+    if 'cache' in data:
+        print(f"  Cache hit rate: {data['cache']['hit_rate']:.1%}")
+    print(f"  Time: {split['crossref']:.1f}s waiting on CrossRef, "
+          f"{split['rate_limit_wait']:.1f}s rate-limit pacing, "
+          f"{split['retry_backoff']:.1f}s retry backoff, {split['local']:.1f}s local")
+    print(f"  Metrics: {json_path}, {prom_path}")
+
+
+def close_cache(cache: DOICache | None):
+    if cache:
+        print(f"\n  Cache: {cache.hits} hits, {cache.misses} misses, "
+              f"{cache.revalidated} revalidated ({cache.path})")
+        cache.close()
+
+
+def last_written(*paths: str) -> int:
+    return max((os.stat(path).st_mtime_ns for path in paths if os.path.exists(path)),
+               default=0)
+
+
+def store_in_use(store_path: str, json_path: str) -> bool:
+    """Whether the store holds results written no earlier than the JSON progress."""
+    if not os.path.exists(store_path):
+        return False
+    # Read the times first: closing the store checkpoints its WAL file.
+    newer = (last_written(store_path, store_path + '-wal')
+             >= last_written(json_path, journal_path_for(json_path)))
+    store = ResultStore(store_path)
+    try:
+        return newer and len(store.results()) > 0
+    finally:
+        store.close()
+
+
+def progress_path_for(args, output_dir: str) -> str:
+    """The JSON progress file, or with ``--store sqlite`` the results store.
+
+    Without ``--store``, a directory keeps using whichever of the two was
+    written last, so after a ``--store sqlite`` run the store is read even
+    though the JSON progress it was migrated from is still there.
+    """
+    store_path = os.path.join(output_dir, STORE_FILE)
+    json_path = os.path.join(output_dir, PROGRESS_FILE)
+    if args.store is None:
+        use_store = store_in_use(store_path, json_path)
+    else:
+        use_store = args.store == 'sqlite'
+    return store_path if use_store else json_path
+
+
+def formats_for(formats: list[str], progress_path: str) -> list[str]:
+    """The report formats, plus the store's report rows when results live there."""
+    if is_store_path(progress_path) and 'sqlite' not in formats:
+        return [*formats, 'sqlite']
+    return formats
+
+
+def run_bibfile(args, formats: list[str], rate: float):
+    if not os.path.exists(args.bibfile):
+        print(f"Error: File not found: {args.bibfile}")
+        sys.exit(1)
+    
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.bibfile))
+    os.makedirs(output_dir, exist_ok=True)
+    
+    progress_path = progress_path_for(args, output_dir)
+    formats = formats_for(formats, progress_path)
+    
+    print(f"Parsing {args.bibfile}...")
+    entries = parse_bib_entries(args.bibfile, args.jobs)
+    entries_with_doi = [e for e in entries if e.fields.get('doi')]
+    entries_with_isbn = [e for e in entries if e.fields.get('isbn')]
+    
+    print(f"  Total entries:     {len(entries)}")
+    print(f"  Entries with DOI:  {len(entries_with_doi)}")
+    print(f"  Entries w/o DOI:   {len(entries) - len(entries_with_doi)}")
+    if entries_with_isbn:
+        print(f"  Entries with ISBN: {len(entries_with_isbn)}")
+    
+    store = progress = None
+    if args.report and is_store_path(progress_path) and os.path.exists(progress_path):
+        # The report reads each result straight from the store.
+        store = ResultStore(progress_path)
+        progress = store.results() or None
+    if progress is None:
+        progress = load_progress(progress_path) if (args.resume or args.report) else {}
+    
+    if args.report:
+        try:
+            print(f"\nRegenerating report from {len(progress)} saved results...")
+            print_report_paths(generate_report(entries, progress, output_dir,
+                                               title_scorer=args.title_scorer,
+                                               formats=formats,
+                                               suggester=build_suggester(args),
+                                               jobs=args.jobs))
+        finally:
+            if store:
+                store.close()
+        return
+    
+    to_check, counts = plan_resume(entries_with_doi, progress)
+    isbn_to_check, isbn_counts = (plan_resume(entries_with_isbn, progress, 'isbn')
+                                  if isbn_enabled(args) else ([], None))
+    
+    if args.resume:
+        print(f"\n  Resume: {counts['new']} new, {counts['changed']} changed, "
+              f"{counts['retry']} to retry, {counts['unchanged']} unchanged, "
+              f"{counts['removed']} removed")
+        if isbn_counts and entries_with_isbn:
+            print(f"  ISBNs:  {isbn_counts['new']} new, {isbn_counts['changed']} changed, "
+                  f"{isbn_counts['retry']} to retry, {isbn_counts['unchanged']} unchanged, "
+                  f"{isbn_counts['removed']} removed")
+    revalidate = revalidation_queue(args, entries_with_doi, progress, to_check)
+    to_check += revalidate
+    already_done = counts['unchanged'] - len(revalidate)
+    print(f"  Remaining:         {len(to_check)}")
+    if isbn_counts and entries_with_isbn:
+        print(f"  ISBNs remaining:   {len(isbn_to_check)}")
+    
+    if not to_check and not isbn_to_check:
+        if progress or is_store_path(progress_path):
+            # Keeps pruning and fingerprints, and logs the run in the store's history.
+            ProgressJournal(progress_path, progress).close()
+        print("\nAll DOIs already verified! Generating report...")
+        print_report_paths(generate_report(entries, progress, output_dir,
+                                           title_scorer=args.title_scorer,
+                                           formats=formats,
+                                           suggester=build_suggester(args),
+                                           jobs=args.jobs))
+        return
+    
+    cache = open_cache(args)
+    expire_cached(cache, revalidate)
+    offline = open_offline(args) if to_check else None
+    sources = new_book_sources(args)
+    if to_check and not offline:
+        print_estimate(args, to_check, cache, rate)
+    if isbn_to_check:
+        print_isbn_estimate(args, isbn_to_check, cache, sources)
+    
+    print(f"\n  Progress saved to: {progress_path}")
+    print(f"  You can stop anytime (Ctrl+C) and resume with --resume\n")
+    
+    total = len(entries_with_doi)
+    done = already_done
+
+    journal = ProgressJournal(progress_path, progress, compact_every=args.compact_every)
+    limiter = new_rate_controller(args, rate)
+    metrics = RequestMetrics()
+    seen = set()
+
+    def record(entry: BibEntry, result: VerificationResult):
+        nonlocal done
+        start = time.perf_counter()
+        result.fingerprint = entry_fingerprint(entry)
+        journal.record(entry.key, result)
+        if entry.key in seen:
+            position = f"[retry {result.attempts}]"
+        else:
+            seen.add(entry.key)
+            done += 1
+            position = (f"[{done}/{total}] ({done / total * 100:.1f}%"
+                        f"{progress_rate(metrics, total - done)})")
+        print(f"  {position} {entry.key}: "
+              f"{clean_doi(entry.fields['doi'])[:60]} {result_status(result)}")
+        metrics.record_result(result, time.perf_counter() - start)
+
+    isbn_total = len(entries_with_isbn)
+    isbn_done = isbn_counts['unchanged'] if isbn_counts else 0
+
+    def record_isbn(entry: BibEntry, result: ISBNResult):
+        nonlocal isbn_done
+        start = time.perf_counter()
+        result.fingerprint = entry_fingerprint(entry)
+        journal.record(isbn_progress_key(entry.key), result)
+        if isbn_progress_key(entry.key) in seen:
+            position = f"[retry {result.attempts}]"
+        else:
+            seen.add(isbn_progress_key(entry.key))
+            isbn_done += 1
+            position = (f"[ISBN {isbn_done}/{isbn_total}] ({isbn_done / isbn_total * 100:.1f}%"
+                        f"{progress_rate(metrics, isbn_total - isbn_done)})")
+        print(f"  {position} {entry.key}: "
+              f"{(result.isbn or entry.fields['isbn'])[:60]} {isbn_status(result)}")
+        metrics.record_result(result, time.perf_counter() - start)
+
+    try:
+        if to_check:
+            run_verification(args, to_check, record, cache, limiter, metrics, offline)
+        if isbn_to_check:
+            print()
+            run_isbn_verification(args, isbn_to_check, record_isbn, cache, sources, metrics)
+    except KeyboardInterrupt:
+        print(f"\n\n  Interrupted! Progress saved ({len(progress)} results).")
+        print(f"  Resume with: python verify_dois.py {args.bibfile} --resume\n")
+    finally:
+        journal.close()
+        if offline:
+            offline.close()
+        elif to_check:
+            print_rate(limiter)
+        if isbn_to_check:
+            print_isbn_rates(sources)
+        write_metrics(metrics, output_dir, cache)
+        close_cache(cache)
+    print_still_failing(progress.values())
+    
+    print("\nGenerating report...")
+    print_report_paths(generate_report(entries, progress, output_dir,
+                                       title_scorer=args.title_scorer,
+                                       formats=formats,
+                                       suggester=build_suggester(args),
+                                       jobs=args.jobs))
+    print("Done!")
+
+
+def run_watch(args, formats: list[str], rate: float):
+    """Verify the bib, then keep watching it; each new export costs only its changes.
+
+    The first pass resumes from saved progress like ``--resume``. After
+    that every change is parsed incrementally (``IncrementalBibParser``) and
+    diffed against the last parse by cite key and fingerprint; only added
+    and changed entries, plus transient failures, are verified before the
+    reports are rewritten. Title scores, duplicate checks and suggestions of
+    unchanged entries are reused, and the suggestion index is extended with
+    the works looked up instead of being rebuilt.
+    """
+    if not os.path.exists(args.bibfile):
+        print(f"Error: File not found: {args.bibfile}")
+        sys.exit(1)
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.bibfile))
+    os.makedirs(output_dir, exist_ok=True)
+    progress_path = progress_path_for(args, output_dir)
+    formats = formats_for(formats, progress_path)
+
+    watcher = FileWatcher(args.bibfile, args.watch_interval)
+    bib_parser = IncrementalBibParser()
+    print(f"Parsing {args.bibfile}...")
+    entries = bib_parser.parse(args.bibfile)
+    progress = load_progress(progress_path)
+    entries_with_doi = [e for e in entries if e.fields.get('doi')]
+    to_check, _ = plan_resume(entries_with_doi, progress)
+    isbn_to_check = (plan_resume([e for e in entries if e.fields.get('isbn')], progress,
+                                 'isbn')[0] if isbn_enabled(args) else [])
+    revalidate = revalidation_queue(args, entries_with_doi, progress, to_check)
+    to_check += revalidate
+    print(f"  {len(entries)} entries; {len(to_check)} DOIs and {len(isbn_to_check)} "
+          f"ISBNs to check")
+
+    journal = ProgressJournal(progress_path, progress, compact_every=args.compact_every)
+    cache = open_cache(args)
+    expire_cached(cache, revalidate)
+    offline = open_offline(args)
+    sources = new_book_sources(args)
+    limiter = new_rate_controller(args, rate)
+    metrics = RequestMetrics()
+    if to_check and not offline:
+        print_estimate(args, to_check, cache, rate)
+    suggester = None
+    scores = {}
+    looked_up = []
+
+    def record(entry: BibEntry, result: VerificationResult):
+        start = time.perf_counter()
+        result.fingerprint = entry_fingerprint(entry)
+        journal.record(entry.key, result)
+        looked_up.append(result)
+        print(f"  {entry.key}: {clean_doi(entry.fields['doi'])[:60]} {result_status(result)}")
+        metrics.record_result(result, time.perf_counter() - start)
+
+    def record_isbn(entry: BibEntry, result: ISBNResult):
+        start = time.perf_counter()
+        result.fingerprint = entry_fingerprint(entry)
+        journal.record(isbn_progress_key(entry.key), result)
+        print(f"  {entry.key}: {(result.isbn or entry.fields['isbn'])[:60]} "
+              f"{isbn_status(result)}")
+        metrics.record_result(result, time.perf_counter() - start)
+
+    def update(entries: list[BibEntry], to_check: list[BibEntry],
+               isbn_to_check: list[BibEntry]) -> dict:
+        nonlocal suggester
+        if to_check:
+            run_verification(args, to_check, record, cache, limiter, metrics, offline)
+        if isbn_to_check:
+            run_isbn_verification(args, isbn_to_check, record_isbn, cache, sources, metrics)
+        if suggester is None:
+            suggester = build_suggester(args) or TitleIndex(args.title_scorer)
+        elif cache:
+            for result in looked_up:
+                work = cache.work(result.cleaned_doi) if result.resolves else None
+                if work:
+                    suggester.add_work(result.cleaned_doi, work)
+        looked_up.clear()
+        suggestions = None if args.no_suggestions or args.no_cache else suggester
+        return generate_report(entries, progress, output_dir, title_scorer=args.title_scorer,
+                               formats=formats, suggester=suggestions, jobs=args.jobs,
+                               scores=scores)
+
+    try:
+        print_report_paths(update(entries, to_check, isbn_to_check))
+        previous = {e.key: entry_fingerprint(e) for e in entries}
+        print(f"\nWatching {args.bibfile} ({watcher.mode}); Ctrl+C to stop")
+        while True:
+            watcher.wait()
+            changed_at = time.perf_counter()
+            parsed = bib_parser.parse(args.bibfile)
+            if parsed == entries:
+                continue
+            entries = parsed
+            current = {e.key: entry_fingerprint(e) for e in entries}
+            changed = [e for e in entries if previous.get(e.key) != current[e.key]]
+            removed = previous.keys() - current.keys()
+            added = sum(e.key not in previous for e in changed)
+            previous = current
+            for key in removed:
+                progress.pop(key, None)
+                progress.pop(isbn_progress_key(key), None)
+            for entry in changed:
+                if not entry.fields.get('doi'):
+                    progress.pop(entry.key, None)
+                if not entry.fields.get('isbn'):
+                    progress.pop(isbn_progress_key(entry.key), None)
+            to_check, _ = plan_resume([e for e in changed if e.fields.get('doi')], progress,
+                                      prune=False)
+            isbn_to_check = (plan_resume([e for e in changed if e.fields.get('isbn')],
+                                         progress, 'isbn', prune=False)[0]
+                             if isbn_enabled(args) else [])
+            # Transient failures get another try with every new export.
+            queued = {e.key for e in to_check}
+            to_check += [e for e in entries if e.key not in queued and e.fields.get('doi')
+                         and getattr(progress.get(e.key), 'retryable', False)]
+            queued = {e.key for e in isbn_to_check}
+            isbn_to_check += [e for e in entries if isbn_enabled(args) and e.key not in queued
+                              and e.fields.get('isbn') and getattr(
+                                  progress.get(isbn_progress_key(e.key)), 'retryable', False)]
+            print(f"\n[{datetime.now():%H:%M:%S}] {args.bibfile} changed: {added} added, "
+                  f"{len(changed) - added} changed, {len(removed)} removed "
+                  f"({bib_parser.parsed} of {bib_parser.total} pieces parsed); "
+                  f"{len(to_check)} DOIs and {len(isbn_to_check)} ISBNs to check")
+            update(entries, to_check, isbn_to_check)
+            print(f"  Reports updated {time.perf_counter() - changed_at:.2f}s after the "
+                  f"change settled")
+    except KeyboardInterrupt:
+        print("\n\n  Stopped watching.")
+    finally:
+        watcher.close()
+        journal.close()
+        if offline:
+            offline.close()
+        write_metrics(metrics, output_dir, cache)
+        close_cache(cache)
+
+
+def run_workspace(args, formats: list[str], rate: float):
+    """Verify every bib in the workspace, looking each distinct DOI up once."""
+    bib_paths = discover_bib_files(args.workspace)
+    if not bib_paths:
+        print(f"Error: No .bib files found under {args.workspace}")
+        sys.exit(1)
+    output_dirs = workspace_output_dirs(bib_paths)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"Parsing {len(bib_paths)} bib files...")
+    with PROFILER.span('parse'), \
+            ProcessPoolExecutor(max_workers=min(len(bib_paths), os.cpu_count() or 1)) as pool:
+        parsed = dict(zip(bib_paths, pool.map(parse_bib_entries, bib_paths)))
+
+    papers = {}
+    for path, entries in parsed.items():
+        os.makedirs(output_dirs[path], exist_ok=True)
+        progress_path = progress_path_for(args, output_dirs[path])
+        progress = load_progress(progress_path) if (args.resume or args.report) else {}
+        entries_with_doi = [e for e in entries if e.fields.get('doi')]
+        entries_with_isbn = [e for e in entries if e.fields.get('isbn')]
+        to_check, counts = ([], None) if args.report else plan_resume(entries_with_doi, progress)
+        isbn_to_check = (plan_resume(entries_with_isbn, progress, 'isbn')[0]
+                         if counts and isbn_enabled(args) else [])
+        papers[path] = {'entries': entries, 'progress': progress, 'to_check': to_check,
+                        'isbn_to_check': isbn_to_check,
+                        'progress_path': progress_path, 'with_doi': len(entries_with_doi)}
+        print(f"  {path}: {len(entries)} entries, {len(entries_with_doi)} with DOI"
+              + (f", {len(to_check)} to check" if counts else '')
+              + (f"; {len(isbn_to_check)} of {len(entries_with_isbn)} ISBNs to check"
+                 if counts and isbn_enabled(args) and entries_with_isbn else ''))
+
+    if not args.report:
+        # Results already saved for any paper can answer the same DOI elsewhere.
+        known = {}
+        for paper in papers.values():
+            checked = {e.key for e in paper['to_check']}
+            for key, result in paper['progress'].items():
+                if key not in checked and not is_isbn_key(key):
+                    known.setdefault(doi_key(result.original_doi), result)
+
+        groups = {}
+        for path, paper in papers.items():
+            for entry in paper['to_check']:
+                groups.setdefault(doi_key(entry.fields['doi']), []).append((path, entry))
+        pending = [members[0][1] for key, members in groups.items() if key not in known]
+        lookups = sum(len(paper['to_check']) for paper in papers.values())
+        print(f"\n  Entries to check:  {lookups}")
+        print(f"  Distinct DOIs:     {len(groups)} ({len(groups) - len(pending)} already "
+              f"verified in another paper)")
+        print(f"  Network lookups:   {len(pending)} (de-duplication saves {lookups - len(pending)})")
+
+        # Opening a journal snapshots the pruned, fingerprinted progress, so
+        # every paper gets one even when it has nothing left to check.
+        journals = {path: ProgressJournal(paper['progress_path'], paper['progress'],
+                                          compact_every=args.compact_every)
+                    for path, paper in papers.items()}
+
+        def fan_out(key: str, result: VerificationResult):
+            for path, entry in groups[key]:
+                journals[path].record(entry.key, replace(
+                    result, original_doi=entry.fields['doi'],
+                    fingerprint=entry_fingerprint(entry)))
+
+        for key in groups:
+            if key in known:
+                fan_out(key, known[key])
+
+        done = 0
+        seen = set()
+
+        def record(entry: BibEntry, result: VerificationResult):
+            nonlocal done
+            start = time.perf_counter()
+            key = doi_key(entry.fields['doi'])
+            fan_out(key, result)
+            if key in seen:
+                position = '[retry]'
+            else:
+                seen.add(key)
+                done += 1
+                position = f"[{done}/{len(pending)}{progress_rate(metrics, len(pending) - done)}]"
+            print(f"  {position} {clean_doi(entry.fields['doi'])[:60]} "
+                  f"({len(groups[key])} entries) {result_status(result)}")
+            metrics.record_result(result, time.perf_counter() - start)
+
+        # ISBNs are shared the same way; the cache already spares repeat
+        # lookups across runs, so only this run's duplicates are folded.
+        isbn_groups = {}
+        for path, paper in papers.items():
+            for entry in paper['isbn_to_check']:
+                isbn_groups.setdefault(isbn_key(entry.fields['isbn']), []).append((path, entry))
+        isbn_pending = [members[0][1] for members in isbn_groups.values()]
+        isbn_done = 0
+
+        def record_isbn(entry: BibEntry, result: ISBNResult):
+            nonlocal isbn_done
+            start = time.perf_counter()
+            key = isbn_key(entry.fields['isbn'])
+            for path, member in isbn_groups[key]:
+                journals[path].record(isbn_progress_key(member.key), replace(
+                    result, original_isbn=member.fields['isbn'],
+                    fingerprint=entry_fingerprint(member)))
+            if ISBN_KEY_PREFIX + key in seen:
+                position = '[retry]'
+            else:
+                seen.add(ISBN_KEY_PREFIX + key)
+                isbn_done += 1
+                position = (f"[ISBN {isbn_done}/{len(isbn_pending)}"
+                            f"{progress_rate(metrics, len(isbn_pending) - isbn_done)}]")
+            print(f"  {position} {(result.isbn or key)[:60]} "
+                  f"({len(isbn_groups[key])} entries) {isbn_status(result)}")
+            metrics.record_result(result, time.perf_counter() - start)
+
+        cache = open_cache(args) if pending or isbn_pending else None
+        offline = open_offline(args) if pending else None
+        limiter = new_rate_controller(args, rate)
+        sources = new_book_sources(args)
+        metrics = RequestMetrics()
+        if pending and not offline:
+            print_estimate(args, pending, cache, rate)
+        if isbn_pending:
+            print_isbn_estimate(args, isbn_pending, cache, sources)
+        try:
+            if pending:
+                print()
+                run_verification(args, pending, record, cache, limiter, metrics, offline)
+            if isbn_pending:
+                print()
+                run_isbn_verification(args, isbn_pending, record_isbn, cache, sources,
+                                      metrics)
+        except KeyboardInterrupt:
+            print(f"\n\n  Interrupted! Progress saved ({done} of {len(pending)} DOIs verified).")
+            print("  Resume with: python verify_dois.py --workspace "
+                  f"{args.workspace} --resume\n")
+        finally:
+            for journal in journals.values():
+                journal.close()
+            if offline:
+                offline.close()
+            elif pending:
+                print_rate(limiter)
+            if isbn_pending:
+                print_isbn_rates(sources)
+            if pending or isbn_pending:
+                write_metrics(metrics, args.workspace, cache)
+            close_cache(cache)
+        print_still_failing(result for paper in papers.values()
+                            for result in paper['progress'].values())
+
+    print("\nGenerating reports...")
+    suggester = build_suggester(args)
+    for path, paper in papers.items():
+        print(f"\n  {path}")
+        print_report_paths(generate_report(paper['entries'], paper['progress'],
+                                           output_dirs[path],
+                                           title_scorer=args.title_scorer,
+                                           formats=formats_for(formats, paper['progress_path']),
+                                           suggester=suggester, jobs=args.jobs))
+    print("Done!")
+
+
+QUERY_COLUMNS = ('cite_key', 'entry_type', 'doi', 'category', 'status_code',
+                 'title_similarity', 'bib_date', 'crossref_year')
+QUERY_CATEGORIES = ('valid', 'not_found', 'invalid_format', 'retryable', 'errors', 'no_doi')
+
+
+def print_table(columns: list[str], rows: list[tuple], width: int = 40):
+    cells = [[('' if value is None else str(value))[:width] for value in row] for row in rows]
+    widths = [max([len(name)] + [len(row[i]) for row in cells]) for i, name in enumerate(columns)]
+    print('  '.join(name.ljust(w) for name, w in zip(columns, widths)).rstrip())
+    print('  '.join('-' * w for w in widths))
+    for row in cells:
+        print('  '.join(value.ljust(w) for value, w in zip(row, widths)).rstrip())
+
+
+def write_rows(columns: list[str], rows: list[tuple], fmt: str, output: str | None,
+               summary: str):
+    """Print (or write to ``output``) rows as a table, CSV or JSON, then ``summary``.
+
+    The summary goes to stderr when CSV or JSON is printed, so the output
+    can be piped.
+    """
+    out = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+    try:
+        if fmt == 'csv':
+            writer = csv.writer(out)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        elif fmt == 'json':
+            json.dump([dict(zip(columns, row)) for row in rows], out, ensure_ascii=False,
+                      indent=1)
+            out.write('\n')
+        elif output:
+            with contextlib.redirect_stdout(out):
+                print_table(columns, rows)
+        else:
+            print_table(columns, rows)
+    finally:
+        if output:
+            out.close()
+    if output:
+        print(f"{summary} -> {output}")
+    else:
+        print(summary, file=sys.stderr if fmt != 'table' else sys.stdout)
+
+
+def run_query(argv: list[str]):
+    """``verify_dois.py query``: filter the report rows kept in the results store."""
+    parser = argparse.ArgumentParser(
+        prog='verify_dois.py query',
+        description='Filter the results of the last report from the SQLite store '
+                    f'({STORE_FILE}, written with --store sqlite or --formats ...,sqlite). '
+                    'Filters combine with AND.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python verify_dois.py query --entry-type inbook --title-below 0.5
+  python verify_dois.py query --status 404 --runs 2 --format csv --output 404s.csv
+  python verify_dois.py query manuscript/ --year-mismatch --columns all --format json
+  python verify_dois.py query --where "crossref_type = 'posted-content'"
+        """)
+    parser.add_argument('store', nargs='?', default='.',
+                        help=f'The store, or the output directory holding {STORE_FILE} '
+                             '(default: .)')
+    parser.add_argument('--key', type=str, help='Cite key')
+    parser.add_argument('--doi', type=str, help='DOI (any case, URL prefixes allowed)')
+    parser.add_argument('--category', choices=QUERY_CATEGORIES, help='Result category')
+    parser.add_argument('--status', type=int, help='HTTP status of the CrossRef lookup')
+    parser.add_argument('--entry-type', type=str, help='Bib entry type, e.g. inbook')
+    parser.add_argument('--title-below', type=float, metavar='SIMILARITY',
+                        help='Title similarity below this value')
+    parser.add_argument('--title-mismatch', action='store_true', help='Title mismatches only')
+    parser.add_argument('--year-mismatch', action='store_true', help='Year mismatches only')
+    parser.add_argument('--runs', type=int, metavar='N',
+                        help='Results verified during the last N runs')
+    parser.add_argument('--where', type=str, action='append', default=[],
+                        help='Any SQL condition on the report columns (repeatable)')
+    parser.add_argument('--columns', type=str, default=','.join(QUERY_COLUMNS),
+                        help=f"Comma-separated columns, or 'all' (default: {','.join(QUERY_COLUMNS)})")
+    parser.add_argument('--order-by', type=str, default='cite_key',
+                        help='Column to sort by (default: cite_key)')
+    parser.add_argument('--desc', action='store_true', help='Sort descending')
+    parser.add_argument('--limit', type=int, help='Return at most N rows')
+    parser.add_argument('--format', choices=('table', 'csv', 'json'), default='table',
+                        help='Output format (default: table)')
+    parser.add_argument('--output', type=str, help='Write to this file instead of stdout')
+    args = parser.parse_args(argv)
+    if args.runs is not None and args.runs < 1:
+        parser.error('--runs must be at least 1')
+
+    path = os.path.join(args.store, STORE_FILE) if os.path.isdir(args.store) else args.store
+    if not os.path.exists(path):
+        print(f"Error: No results store at {path}; write one with --store sqlite "
+              f"or --formats ...,sqlite")
+        sys.exit(1)
+    columns = (list(REPORT_COLUMN_NAMES) if args.columns == 'all'
+               else [name.strip() for name in args.columns.split(',') if name.strip()])
+
+    where = [(condition, ()) for condition in args.where]
+    for value, condition in ((args.key, 'cite_key = ?'), (args.category, 'category = ?'),
+                             (args.status, 'status_code = ?'),
+                             (args.entry_type, 'entry_type = ?'),
+                             (args.title_below, 'title_similarity < ?')):
+        if value is not None:
+            where.append((condition, (value,)))
+    if args.doi:
+        where.append(('doi = ?', (clean_doi(args.doi),)))
+    if args.title_mismatch:
+        where.append(('title_mismatch', ()))
+    if args.year_mismatch:
+        where.append(('year_mismatch', ()))
+    if args.runs:
+        where.append((SINCE_RUNS, (args.runs - 1,)))
+
+    store = ResultStore(path)
+    start = time.perf_counter()
+    try:
+        rows = store.query(where, columns, args.order_by, args.desc, args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    except sqlite3.Error as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        store.close()
+    elapsed = (time.perf_counter() - start) * 1000
+    write_rows(columns, rows, args.format, args.output,
+               f"{len(rows)} rows in {elapsed:.1f} ms")
+
+
+def pick_snapshot(parser, snapshots: list[Snapshot], run: int) -> Snapshot:
+    """A snapshot by run ID, or counting back from the latest when negative."""
+    if run < 0:
+        if -run > len(snapshots):
+            parser.error(f"only {len(snapshots)} run(s) saved")
+        return snapshots[run]
+    for snapshot in snapshots:
+        if snapshot.run_id == run:
+            return snapshot
+    parser.error(f"no snapshot of run {run}; see --list")
+
+
+def run_diff(argv: list[str]):
+    """``verify_dois.py diff``: what changed between two verification runs."""
+    parser = argparse.ArgumentParser(
+        prog='verify_dois.py diff',
+        description='Compare the result snapshots of two verification runs (kept in '
+                    f'{SNAPSHOT_DIR}/ next to the reports) and list the entries that '
+                    'were newly broken, fixed, changed state or DOI, added or removed.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+RUN is a run ID from --list, or counts back from the latest run (-1 is the
+latest, -2 the one before).
+
+Examples:
+  python verify_dois.py diff                     # previous run vs latest
+  python verify_dois.py diff --list
+  python verify_dois.py diff --from 12 --to 15 --only broken,fixed
+  python verify_dois.py diff manuscript/ --format csv --output changes.csv
+        """)
+    parser.add_argument('output_dir', nargs='?', default='.',
+                        help='Directory with the reports (default: .)')
+    parser.add_argument('--from', dest='old', type=int, default=-2, metavar='RUN',
+                        help='Older run (default: -2)')
+    parser.add_argument('--to', dest='new', type=int, default=-1, metavar='RUN',
+                        help='Newer run (default: -1)')
+    parser.add_argument('--list', action='store_true',
+                        help='List the saved runs with their broken entry counts')
+    parser.add_argument('--only', type=str, default=None,
+                        help=f"Comma-separated changes to show ({','.join(DIFF_CHANGES)})")
+    parser.add_argument('--format', choices=('table', 'csv', 'json'), default='table',
+                        help='Output format (default: table)')
+    parser.add_argument('--output', type=str, help='Write to this file instead of stdout')
+    args = parser.parse_args(argv)
+    only = DIFF_CHANGES
+    if args.only:
+        only = [change.strip() for change in args.only.split(',') if change.strip()]
+        unknown = [change for change in only if change not in DIFF_CHANGES]
+        if unknown:
+            parser.error(f"unknown change(s): {', '.join(unknown)}")
+
+    snapshots = list_snapshots(args.output_dir)
+    snapshot_dir = os.path.join(args.output_dir, SNAPSHOT_DIR)
+    if args.list:
+        # One snapshot is read at a time, however many runs are kept.
+        rows = []
+        for snapshot in snapshots:
+            total = broken = 0
+            for _, _, state, _, _ in snapshot.rows():
+                total += 1
+                broken += is_broken(state)
+            rows.append((snapshot.run_id, f"{snapshot.created:%Y-%m-%d %H:%M:%S}",
+                         total, broken))
+        write_rows(['run', 'created', 'entries', 'broken'], rows, args.format, args.output,
+                   f"{len(rows)} runs in {snapshot_dir}")
+        return
+    if len(snapshots) < 2:
+        print(f"Error: Need two saved runs to compare, found {len(snapshots)} in {snapshot_dir}")
+        sys.exit(1)
+    old = pick_snapshot(parser, snapshots, args.old)
+    new = pick_snapshot(parser, snapshots, args.new)
+
+    start = time.perf_counter()
+    changes = diff_snapshots(old, new)
+    elapsed = (time.perf_counter() - start) * 1000
+    counts = {change: 0 for change in DIFF_CHANGES}
+    for change in changes:
+        counts[change['change']] += 1
+    columns = ['change', 'cite_key', 'old_state', 'new_state', 'old_doi', 'doi', 'detail']
+    rows = [tuple(change[name] for name in columns) for change in changes
+            if change['change'] in only]
+    write_rows(columns, rows, args.format, args.output,
+               f"Run {old.run_id} ({old.created:%Y-%m-%d %H:%M}) -> run {new.run_id} "
+               f"({new.created:%Y-%m-%d %H:%M}): "
+               + ', '.join(f"{counts[change]} {change}" for change in DIFF_CHANGES)
+               + f" in {elapsed:.1f} ms")
+
+
+def main():
+    if sys.argv[1:2] == ['query']:
+        run_query(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['diff']:
+        run_diff(sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(
+        description='Verify DOIs in a .bib file against CrossRef API',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python verify_dois.py references.bib
+  python verify_dois.py references.bib --delay 3 --email you@university.edu
+  python verify_dois.py references.bib --resume
+  python verify_dois.py references.bib --concurrency 8 --rate 5 --email you@university.edu
+  python verify_dois.py references.bib --batch-size 40 --email you@university.edu
+  python verify_dois.py references.bib --report
+  python verify_dois.py --workspace . --resume --email you@university.edu
+  python verify_dois.py references.bib --resume --store sqlite
+  python verify_dois.py query --status 404 --runs 2   # see: verify_dois.py query --help
+  python verify_dois.py diff --only broken,fixed      # see: verify_dois.py diff --help
+        """
+    )
+    parser.add_argument('bibfile', nargs='?', help='Path to .bib file')
+    parser.add_argument('--workspace', type=str, default=None, metavar='ROOT',
+                        help='Verify every .bib in ROOT and ROOT/papers/*, each DOI once; '
+                             'reports go next to each bib')
+    parser.add_argument('--delay', type=float, default=2.0,
+                        help='Starting seconds between API requests; the pace then '
+                             'adapts to CrossRef\'s rate-limit headers and 429s (default: 2.0)')
+    parser.add_argument('--email', type=str, default=None,
+                        help='Email for CrossRef polite pool (faster rate limits)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume from last saved progress')
+    parser.add_argument('--report', action='store_true',
+                        help='Only regenerate report from existing progress (no API calls)')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='Output directory for reports (default: same as bib file)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Max in-flight API requests; >1 enables async mode (default: 1)')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Starting requests per second (default: 1/delay)')
+    parser.add_argument('--max-rate', type=float, default=None,
+                        help='Never exceed this many requests per second, even if '
+                             'CrossRef allows more (default: CrossRef\'s advertised limit)')
+    parser.add_argument('--max-attempts', type=int, default=4,
+                        help='Tries per DOI and run for timeouts, connection errors, 429 '
+                             'and 5xx, with jittered exponential backoff (default: 4)')
+    parser.add_argument('--profile', nargs='?', const='spans', choices=('spans', 'full'),
+                        default=None,
+                        help='Time each stage (parse, verify, report, ...) and print a '
+                             'table; "full" also writes a cProfile dump and a '
+                             'flame-graph collapsed-stack file next to the reports')
+    parser.add_argument('--revalidate', type=int, default=0, metavar='N',
+                        help='With --resume (or --watch), also re-check up to N saved '
+                             'results that are due: failures and mismatches first, then '
+                             'recent online-first works, then the oldest (default: 0, off)')
+    parser.add_argument('--compact-every', type=int, default=200,
+                        help='Fold the progress journal into the snapshot every N results '
+                             '(default: 200; 0 = only on exit)')
+    parser.add_argument('--title-scorer', choices=sorted(TITLE_SCORERS),
+                        default=DEFAULT_TITLE_SCORER,
+                        help=f'Title similarity scorer (default: {DEFAULT_TITLE_SCORER})')
+    parser.add_argument('--formats', type=str, default=','.join(DEFAULT_REPORT_FORMATS),
+                        help='Comma-separated report outputs: text, csv, jsonl, parquet, '
+                             'sqlite '
+                             f"(default: {','.join(DEFAULT_REPORT_FORMATS)})")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='DOIs per CrossRef filter query; >1 enables batch mode (default: 1)')
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                        help=f'Shared CrossRef metadata cache (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-ttl', type=float, default=30,
+                        help='Days before a cached record is revalidated (default: 30)')
+    parser.add_argument('--offline', type=str, default=None, metavar='DUMP',
+                        help='Verify against a local CrossRef metadata dump (a .json.gz / '
+                             '.jsonl.gz file or a directory of them) instead of the API; '
+                             'its index is built in --cache-dir on first use. A prebuilt '
+                             '.sqlite3 index also works')
+    parser.add_argument('--no-suggestions', action='store_true',
+                        help='Do not suggest DOIs (from titles in the cache) for entries '
+                             'whose DOI was not found or points to another title')
+    parser.add_argument('--no-isbn', action='store_true',
+                        help='Skip the ISBN stage (checksums plus Open Library and '
+                             'Google Books lookups for entries with an isbn field)')
+    parser.add_argument('--isbn-rate', type=float, default=1.0,
+                        help='Starting requests per second to each book source; each '
+                             'adapts on its own like the CrossRef pace (default: 1.0)')
+    parser.add_argument('--openlibrary-url', type=str, default=OPEN_LIBRARY_API,
+                        help=f'Open Library base URL (default: {OPEN_LIBRARY_API})')
+    parser.add_argument('--google-books-url', type=str, default=GOOGLE_BOOKS_API,
+                        help=f'Google Books API base URL (default: {GOOGLE_BOOKS_API})')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Worker processes for the CPU-bound work on large libraries: '
+                             'parsing the bib in entry-aligned pieces and scoring titles '
+                             'in batches; output is the same as with one (default: 1; '
+                             '0 = one per CPU)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running after the first pass and, whenever the bib '
+                             'changes (e.g. a new Paperpile export), verify only the '
+                             'added or changed entries and update the reports')
+    parser.add_argument('--watch-interval', type=float, default=5.0,
+                        help='Seconds between checks of the bib when inotify is not '
+                             'available, e.g. on macOS (default: 5)')
+    parser.add_argument('--store', choices=('json', 'sqlite'), default=None,
+                        help='Keep saved results in the JSON progress file and journal, '
+                             f'or in {STORE_FILE} with run history and the report rows '
+                             "for 'verify_dois.py query' (default: json, or sqlite "
+                             'where the store already holds the saved results)')
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help=f'Do not keep a snapshot of this run in {SNAPSHOT_DIR}/ '
+                             "(for 'verify_dois.py diff')")
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always query CrossRef; do not read or write the cache')
+    parser.add_argument('--api-url', type=str, default=CROSSREF_API,
+                        help=f'CrossRef API base URL (default: {CROSSREF_API})')
+    
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    if args.batch_size < 1:
+        parser.error('--batch-size must be at least 1')
+    if args.max_attempts < 1:
+        parser.error('--max-attempts must be at least 1')
+    if args.jobs < 0:
+        parser.error('--jobs must not be negative')
+    if args.watch_interval <= 0:
+        parser.error('--watch-interval must be positive')
+    if args.revalidate < 0:
+        parser.error('--revalidate must not be negative')
+    args.jobs = args.jobs or os.cpu_count() or 1
+    for name in ('rate', 'max_rate', 'isbn_rate'):
+        if getattr(args, name) is not None and getattr(args, name) <= 0:
+            parser.error(f"--{name.replace('_', '-')} must be positive")
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in REPORT_WRITERS]
+    if unknown:
+        parser.error(f"unknown report format(s): {', '.join(unknown)}")
+    if not (args.report or args.no_snapshot) and 'snapshot' not in formats:
+        formats.append('snapshot')
+    if 'parquet' in formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Error: --formats parquet needs pyarrow (pip install pyarrow)")
+            sys.exit(1)
+    if not (args.report or args.offline):
+        try:
+            import requests  # noqa: F401
+        except ImportError:
+            print("Error: checking DOIs online needs requests (pip install requests)")
+            sys.exit(1)
+    # --delay 0 means "as fast as allowed": start high and let CrossRef's
+    # headers and 429s set the pace.
+    rate = args.rate or (1 / args.delay if args.delay > 0 else 50.0)
+
+    if args.watch and (args.workspace or args.report):
+        parser.error('--watch takes a single bibfile and cannot be combined with --report')
+    if args.revalidate and (args.workspace or args.report or not (args.resume or args.watch)):
+        parser.error('--revalidate re-checks saved results of a single bibfile and needs '
+                     '--resume or --watch')
+    if args.workspace:
+        if args.bibfile or args.output_dir:
+            parser.error('--workspace replaces the bibfile and --output-dir arguments')
+        run, profile_dir = run_workspace, args.workspace
+    elif args.bibfile:
+        run = run_watch if args.watch else run_bibfile
+        profile_dir = args.output_dir or os.path.dirname(os.path.abspath(args.bibfile))
+    else:
+        parser.error('a bibfile or --workspace is required')
+
+    if args.profile:
+        PROFILER.enable(full=args.profile == 'full')
+    try:
+        run(args, formats, rate)
+    finally:
+        if args.profile:
+            paths = PROFILER.finish(profile_dir)
+            PROFILER.print_table()
+            for path in paths:
+                print(f"  Profile: {path}")
+
@@ -0,0 +1,204 @@
+"""Duplicate entry detection: shared DOIs and near-identical titles."""
+
+import re
+import itertools
+import random
+import zlib
+from functools import lru_cache
+
+from .profiling import profiled
+from .records import BibEntry
+from .verifier import doi_key
+from .similarity import levenshtein_ratio, normalize_title, title_tokens
+from .suggest import bib_author_families, title_ngrams
+
+DUPLICATE_STOPWORDS = frozenset(
+    'a an and as at by for from in into of on or the to with'.split())
+MINHASH_BANDS = 8
+MINHASH_ROWS = 5
+DUPLICATE_MIN_RATIO = 0.9     # Levenshtein ratio of two titles of one work
+DUPLICATE_MIN_TOKENS = 4      # shorter title needed to trust a subset match
+DUPLICATE_BUCKET_CAP = 100    # larger blocks are too generic to compare pairwise
+_MERSENNE_61 = (1 << 61) - 1
+# Title words that tell volumes, waves and editions apart: numbers and
+# roman numerals.
+_TITLE_NUMBER = re.compile(r'^(?:\w*\d\w*|[ivx]{2,5})$')
+
+
+class MinHasher:
+    """MinHash signatures of word sets, for LSH blocking.
+
+    Each distinct word is hashed under all ``num_perm`` permutations once and
+    the vector kept; a signature is then the element-wise minimum over a
+    title's word vectors. Seeded, so signatures are the same on every run.
+    """
+
+    def __init__(self, num_perm: int = MINHASH_BANDS * MINHASH_ROWS, seed: int = 1):
+        rng = random.Random(seed)
+        self._params = [(rng.randrange(1, _MERSENNE_61), rng.randrange(_MERSENNE_61))
+                        for _ in range(num_perm)]
+        self._words = {}
+
+    def _word(self, word: str) -> list[int]:
+        vector = self._words.get(word)
+        if vector is None:
+            x = zlib.crc32(word.encode('utf-8'))
+            vector = self._words[word] = [(a * x + b) % _MERSENNE_61 for a, b in self._params]
+        return vector
+
+    def signature(self, words) -> tuple:
+        vectors = [self._word(word) for word in words]
+        return tuple(map(min, *vectors)) if len(vectors) > 1 else tuple(vectors[0])
+
+
+_MINHASHER = MinHasher()
+
+
+def main_title(title: str) -> str:
+    """Normalized title up to the first colon, i.e. without the subtitle."""
+    return normalize_title(title.split(':', 1)[0])
+
+
+def _near_identical(a: str, b: str) -> bool:
+    """``levenshtein_ratio(a, b) >= DUPLICATE_MIN_RATIO``, with cheap rejections.
+
+    The ratio allows ``budget`` edits. Each edit changes the length by at most
+    one and removes at most three distinct trigrams, so pairs that differ more
+    in length or share too few trigrams are rejected without running the
+    edit distance.
+    """
+    norm_a, norm_b = normalize_title(a), normalize_title(b)
+    budget = int((1 - DUPLICATE_MIN_RATIO) * max(len(norm_a), len(norm_b)))
+    if abs(len(norm_a) - len(norm_b)) > budget:
+        return False
+    grams_a, grams_b = title_ngrams(a), title_ngrams(b)
+    if len(grams_a & grams_b) < max(len(grams_a), len(grams_b)) - 3 * budget:
+        return False
+    return levenshtein_ratio(a, b) >= DUPLICATE_MIN_RATIO
+
+
+@lru_cache(maxsize=None)
+def _duplicate_titles(title_a: str, title_b: str) -> float | None:
+    words_a, words_b = title_tokens(title_a), title_tokens(title_b)
+    if {w for w in words_a if _TITLE_NUMBER.match(w)} != \
+            {w for w in words_b if _TITLE_NUMBER.match(w)}:
+        return None
+    subset = min(len(words_a), len(words_b)) >= DUPLICATE_MIN_TOKENS and \
+        (words_a <= words_b or words_b <= words_a)
+    if not subset and not _near_identical(title_a, title_b):
+        return None
+    return levenshtein_ratio(title_a, title_b)
+
+
+def duplicate_similarity(a: BibEntry, b: BibEntry) -> float | None:
+    """Title similarity of two entries that look like the same work, else ``None``.
+
+    Titles must be nearly identical (Levenshtein ratio of at least
+    ``DUPLICATE_MIN_RATIO``), or one title's words must contain all of the
+    other's, at least ``DUPLICATE_MIN_TOKENS`` of them (a preprint that lost
+    its subtitle). Entries whose first authors differ, or whose titles
+    carry different numbers ("Wave 3" and "Wave 4", "Part II"), are never
+    duplicates. The title verdict is cached per pair of titles.
+    """
+    score = _duplicate_titles(*sorted((a.fields['title'], b.fields['title'])))
+    if score is None:
+        return None
+    authors_a = bib_author_families(a.fields.get('author'))
+    authors_b = bib_author_families(b.fields.get('author'))
+    if authors_a and authors_b and authors_a[0] != authors_b[0]:
+        return None
+    return score
+
+
+@lru_cache(maxsize=None)
+def blocking_keys(title: str) -> tuple:
+    """The blocks ``find_duplicates`` files a title under (see there).
+
+    Cached, so a re-run over a mostly unchanged library only works out the
+    keys of new titles.
+    """
+    keys = set()
+    words = title_tokens(title) - DUPLICATE_STOPWORDS
+    if len(words) >= 2:
+        signature = _MINHASHER.signature(words)
+        keys.update((band, signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+                    for band in range(MINHASH_BANDS))
+    sequence = normalize_title(title).split()
+    if len(sequence) >= DUPLICATE_MIN_TOKENS:
+        keys.update(' '.join(sequence[:j] + sequence[j + 1:]) for j in range(len(sequence)))
+        keys.add(''.join(sequence))
+    main = main_title(title)
+    if main.count(' ') + 1 >= DUPLICATE_MIN_TOKENS:
+        keys.add(main + ' :')
+    return tuple(keys)
+
+
+@profiled('duplicates')
+def find_duplicates(entries: list[BibEntry]) -> list[dict]:
+    """Clusters of entries that share a DOI or look like the same work.
+
+    Comparing every pair is quadratic, so candidate pairs come from blocks
+    of entries that agree on some key, and only those are scored with
+    ``duplicate_similarity``:
+
+    - the title words (minus stopwords) agree on all ``MINHASH_ROWS``
+      MinHash values of one of ``MINHASH_BANDS`` bands (most shared words);
+    - the normalized titles are equal once one word is dropped from each
+      (a typo), or once their spaces are (words split or joined);
+    - the titles are equal up to the subtitle.
+
+    Linked pairs are merged into clusters. Pairs citing the same DOI are
+    left to the DOI clusters. Each cluster is a dict with ``reason``
+    (``'doi'`` or ``'title'``), the shared ``doi``, the lowest linking
+    ``similarity`` and the ``entries`` in bib order, DOI clusters first.
+    """
+    clusters = []
+    by_doi = {}
+    for entry in entries:
+        if entry.fields.get('doi'):
+            by_doi.setdefault(doi_key(entry.fields['doi']), []).append(entry)
+    for doi, members in by_doi.items():
+        if len(members) > 1:
+            clusters.append({'reason': 'doi', 'doi': doi, 'similarity': None,
+                             'entries': members})
+
+    titled = [entry for entry in entries if entry.fields.get('title')]
+    dois = [doi_key(entry.fields['doi']) if entry.fields.get('doi') else None
+            for entry in titled]
+    blocks = {}
+    for i, entry in enumerate(titled):
+        for key in blocking_keys(entry.fields['title']):
+            blocks.setdefault(key, []).append(i)
+
+    candidates = set()
+    for members in blocks.values():
+        if 1 < len(members) <= DUPLICATE_BUCKET_CAP:
+            candidates.update(itertools.combinations(members, 2))
+
+    parent = list(range(len(titled)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    lowest = {}
+    for i, j in candidates:
+        if dois[i] is not None and dois[i] == dois[j]:
+            continue
+        score = duplicate_similarity(titled[i], titled[j])
+        if score is None:
+            continue
+        ri, rj = root(i), root(j)
+        low = min(score, lowest.pop(ri, 1.0), lowest.pop(rj, 1.0))
+        parent[max(ri, rj)] = min(ri, rj)
+        lowest[min(ri, rj)] = low
+
+    groups = {}
+    for i in range(len(titled)):
+        if root(i) in lowest:
+            groups.setdefault(root(i), []).append(titled[i])
+    clusters.extend({'reason': 'title', 'doi': None, 'similarity': lowest[r],
+                     'entries': members} for r, members in sorted(groups.items()))
+    return clusters
@@ -0,0 +1,276 @@
+"""ISBN verification: local checksums, then Open Library and Google Books."""
+
+import re
+import threading
+
+from .records import BibEntry, ISBNResult
+from .cache import DOICache
+from .metrics import RequestMetrics
+from .ratelimit import RateController, RetryPolicy, paced_get
+from .suggest import bib_year
+
+OPEN_LIBRARY_API = 'https://openlibrary.org'
+GOOGLE_BOOKS_API = 'https://www.googleapis.com/books/v1'
+ISBN_KEY_PREFIX = 'isbn '  # cite keys cannot contain spaces
+_ISBN_SEPARATORS = re.compile(r'[,;/]|\s+and\s+', re.IGNORECASE)
+_ISBN_LABEL = re.compile(r'^\s*ISBN(?:-?1[03])?:?', re.IGNORECASE)
+_ISBN_NOISE = re.compile(r'[\s\-‐-―]')
+_ISBN10 = re.compile(r'^\d{9}[\dX]$')
+_ISBN13 = re.compile(r'^97[89]\d{10}$')
+
+
+def isbn_progress_key(key: str) -> str:
+    """Where an entry's ISBN result lives in the progress store."""
+    return ISBN_KEY_PREFIX + key
+
+
+def is_isbn_key(key: str) -> bool:
+    return key.startswith(ISBN_KEY_PREFIX)
+
+
+def _isbn13_check_digit(first12: str) -> str:
+    total = sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(first12))
+    return str(-total % 10)
+
+
+def normalize_isbn(value: str) -> tuple[str | None, str | None]:
+    """``(isbn13, error)`` for a bib ``isbn`` field.
+
+    The field may list several ISBNs (print and e-book, say); the first one
+    that passes its ISBN-10 or ISBN-13 checksum is returned as ISBN-13.
+    Otherwise ``isbn13`` is ``None`` and ``error`` tells a bad checksum from
+    something that is not an ISBN at all.
+    """
+    shaped = []
+    for part in _ISBN_SEPARATORS.split(value):
+        isbn = _ISBN_NOISE.sub('', _ISBN_LABEL.sub('', part)).upper()
+        if _ISBN10.match(isbn):
+            total = sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(isbn))
+            if total % 11 == 0:
+                core = '978' + isbn[:9]
+                return core + _isbn13_check_digit(core), None
+        elif _ISBN13.match(isbn):
+            if _isbn13_check_digit(isbn[:12]) == isbn[12]:
+                return isbn, None
+        else:
+            continue
+        shaped.append(isbn)
+    return None, 'Invalid ISBN checksum' if shaped else 'Invalid ISBN format'
+
+
+def isbn_key(value: str) -> str:
+    """De-duplication key for a bib ``isbn`` field."""
+    isbn, _ = normalize_isbn(value)
+    return isbn or _ISBN_NOISE.sub('', value).upper()
+
+
+def new_isbn_result(value: str) -> ISBNResult:
+    isbn, error = normalize_isbn(value)
+    return ISBNResult(value, isbn, format_valid=isbn is not None, error=error)
+
+
+def book_record(title: str | None, subtitle: str | None, date: str | None,
+                dois: list[str] | None = None) -> dict:
+    """The part of a book source's answer we keep: title, year and DOI."""
+    if title and subtitle:
+        title = f'{title}: {subtitle}'
+    year = bib_year(date)
+    return {'title': title or None, 'year': str(year) if year else None,
+            'doi': dois[0] if dois else None}
+
+
+class BookSource:
+    """A book metadata service paced by its own ``RateController``.
+
+    Subclasses say how to ask for an ISBN-13 and how to reduce the answer to
+    a ``book_record`` (``None`` when the service has no such book).
+    """
+
+    name = ''
+    label = ''
+
+    def __init__(self, api_url: str, rate: float = 1.0, max_rate: float = None):
+        self.api_url = api_url.rstrip('/')
+        self.limiter = RateController(rate, max_rate=max_rate)
+
+    def request(self, isbn: str) -> tuple[str, dict]:
+        raise NotImplementedError
+
+    def parse(self, data: dict, isbn: str) -> dict | None:
+        raise NotImplementedError
+
+
+class OpenLibrary(BookSource):
+    name = 'openlibrary'
+    label = 'Open Library'
+
+    def request(self, isbn: str) -> tuple[str, dict]:
+        return f'{self.api_url}/api/books', {'bibkeys': f'ISBN:{isbn}', 'format': 'json',
+                                              'jscmd': 'data'}
+
+    def parse(self, data: dict, isbn: str) -> dict | None:
+        book = data.get(f'ISBN:{isbn}')
+        if not book:
+            return None
+        return book_record(book.get('title'), book.get('subtitle'), book.get('publish_date'),
+                           (book.get('identifiers') or {}).get('doi'))
+
+
+class GoogleBooks(BookSource):
+    name = 'googlebooks'
+    label = 'Google Books'
+
+    def request(self, isbn: str) -> tuple[str, dict]:
+        return f'{self.api_url}/volumes', {'q': f'isbn:{isbn}'}
+
+    def parse(self, data: dict, isbn: str) -> dict | None:
+        items = data.get('items') or []
+        if not items:
+            return None
+        info = items[0].get('volumeInfo') or {}
+        return book_record(info.get('title'), info.get('subtitle'), info.get('publishedDate'))
+
+
+def lookup_book(source: BookSource, isbn: str, email: str = None,
+                session: 'requests.Session' = None, cache: DOICache = None,
+                metrics: RequestMetrics = None) -> tuple[int | None, dict | None, str | None]:
+    """Ask ``source`` about an ISBN-13 (or answer from ``cache``).
+
+    Returns ``(status, book, error)``: 200 with the ``book_record``, 404 if
+    the source has no such book, otherwise the HTTP status (``None`` if the
+    request raised) and an error message. Answers are cached like CrossRef
+    ones; failures are not.
+    """
+    import requests
+
+    s = session or requests.Session()
+    cache_key = f'{source.name}:isbn:{isbn}'
+    record, fresh = cache.lookup(cache_key) if cache else (None, False)
+    if fresh:
+        return record['status'], record['message'], None
+
+    url, params = source.request(isbn)
+    headers = {'Accept': 'application/json'}
+    if email:
+        headers['User-Agent'] = f'DOI-Verifier/1.0 (mailto:{email})'
+    try:
+        resp = paced_get(s, url, source.limiter, metrics, params=params, headers=headers,
+                         timeout=30)
+    except requests.exceptions.Timeout:
+        return None, None, 'Request timeout'
+    except requests.exceptions.ConnectionError:
+        return None, None, 'Connection error'
+    except requests.exceptions.RequestException as e:
+        return None, None, f'Request failed: {e}'
+    if resp.status_code not in (200, 404):
+        return resp.status_code, None, f'HTTP {resp.status_code}'
+    # Decoded apart from the request: requests' JSONDecodeError is also a
+    # RequestException, which would make a captcha page look like a dropped
+    # connection and be retried on every run.
+    try:
+        book = source.parse(resp.json(), isbn) if resp.status_code == 200 else None
+    except (ValueError, AttributeError, TypeError):
+        return resp.status_code, None, 'Unreadable response'
+
+    status = 200 if book else 404
+    if cache:
+        cache.put(cache_key, status, book)
+    return status, book, None
+
+
+def apply_book_lookups(result: ISBNResult, sources: list[BookSource], answers: list[tuple]):
+    """Merge the ``lookup_book`` answers of every source into ``result``."""
+    result.found = {}
+    errors = []
+    for source, (status, book, error) in zip(sources, answers):
+        if error:
+            result.found[source.name] = None
+            errors.append(f'{source.label}: {error}')
+            result.retryable |= status is None or status == 429 or status >= 500
+            continue
+        result.found[source.name] = status == 200
+        if book:
+            result.title = result.title or book['title']
+            result.year = result.year or book['year']
+            result.doi = result.doi or book['doi']
+    result.error = '; '.join(errors) or None
+
+
+def isbn_status(result: ISBNResult) -> str:
+    """Short console marker for an ISBN result."""
+    found = result.found or {}
+    if not result.format_valid:
+        return f'⚠ {result.error}'
+    elif any(found.values()):
+        status = '✓ ' + ', '.join(name for name, hit in found.items() if hit)
+        return status + (f' (↻ {result.error})' if result.retryable else '')
+    elif result.retryable:
+        return f'↻ {result.error} (will retry)'
+    elif result.error:
+        return f'⚠ {result.error}'
+    return '✗ NOT FOUND'
+
+
+async def verify_isbns_async(entries: list[BibEntry], on_result, sources: list[BookSource],
+                             email: str = None, concurrency: int = 1,
+                             cache: DOICache = None, retry: RetryPolicy = None,
+                             metrics: RequestMetrics = None):
+    """Check the ``isbn`` field of ``entries`` against every book source.
+
+    Checksums are validated first, so a malformed ISBN never costs a
+    request. Each valid ISBN is then looked up on all ``sources`` at once,
+    each source waiting only on its own limiter, with up to ``concurrency``
+    entries in flight. ``on_result``, ``retry`` and ``metrics`` work as in
+    ``verify_entries_async``.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    retry = retry or RetryPolicy(max_attempts=1)
+    retries = set()
+    pending = iter(entries)
+    local = threading.local()
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency * len(sources),
+                                  thread_name_prefix='isbn')
+
+    def lookup(source: BookSource, isbn: str):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return lookup_book(source, isbn, email=email, session=local.session,
+                           cache=cache, metrics=metrics)
+
+    async def verify_one(entry: BibEntry, tries: int = 1):
+        result = new_isbn_result(entry.fields['isbn'])
+        if result.format_valid:
+            answers = await asyncio.gather(*(
+                loop.run_in_executor(executor, lookup, source, result.isbn)
+                for source in sources))
+            apply_book_lookups(result, sources, answers)
+        on_result(entry, result)
+        if retry.should_retry(result, tries):
+            task = asyncio.create_task(retry_later(entry, tries))
+            retries.add(task)
+            task.add_done_callback(retries.discard)
+
+    async def retry_later(entry: BibEntry, tries: int):
+        delay = retry.delay(tries)
+        if metrics:
+            metrics.record_backoff(delay)
+        await asyncio.sleep(delay)
+        await verify_one(entry, tries + 1)
+
+    async def worker():
+        for entry in pending:
+            await verify_one(entry)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        while retries:
+            await asyncio.gather(*retries)
+    finally:
+        for task in retries:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
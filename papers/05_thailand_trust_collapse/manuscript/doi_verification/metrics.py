@@ -0,0 +1,183 @@
+"""Per-request metrics: latency percentiles, rates and the time split."""
+
+import json
+import time
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from .records import VerificationResult
+from .cache import DOICache
+
+METRICS_JSON = 'doi_verification_metrics.json'
+METRICS_PROM = 'doi_verification_metrics.prom'
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def percentile(sorted_values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class RequestMetrics:
+    """Timings and counters for one run, shared by every worker.
+
+    Each HTTP request records its latency, status (``None`` if it raised),
+    bytes received, throttle-retry index and the time spent waiting on the
+    rate limiter before it was sent. Alongside the network time this splits
+    a slow run into CrossRef, our own pacing and backoff, and local work
+    (the ``on_result`` bookkeeping), and keeps a rolling window of finished
+    lookups for the live throughput and ETA.
+    """
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self.started = time.monotonic()
+        self.latencies = []
+        self.status_counts = {}
+        self.bytes_received = 0
+        self.throttle_retries = 0
+        self.network_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.local_seconds = 0.0
+        self.results = 0
+        self.retried_results = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def record_request(self, latency: float, status: int | None, nbytes: int,
+                       attempt: int, waited: float):
+        with self._lock:
+            self.latencies.append(latency)
+            key = str(status) if status is not None else 'error'
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+            self.bytes_received += nbytes
+            self.throttle_retries += attempt > 0
+            self.network_seconds += latency
+            self.wait_seconds += waited
+
+    def record_backoff(self, seconds: float):
+        with self._lock:
+            self.backoff_seconds += seconds
+
+    def record_result(self, result: 'VerificationResult', local_seconds: float):
+        with self._lock:
+            now = time.monotonic()
+            self.results += 1
+            self.retried_results += result.attempts > 1
+            self.local_seconds += local_seconds
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > self.window:
+                self._recent.popleft()
+
+    def rolling_rate(self) -> float:
+        """Lookups finished per second over the last ``window`` seconds."""
+        with self._lock:
+            span = min(self.window, time.monotonic() - self.started)
+            return len(self._recent) / span if span > 0 else 0.0
+
+    def eta(self, remaining: int) -> float | None:
+        rate = self.rolling_rate()
+        return remaining / rate if rate > 0 else None
+
+    def summary(self, cache: 'DOICache' = None) -> dict:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            latencies = sorted(self.latencies)
+            requests_made = len(latencies)
+            data = {
+                'generated': datetime.now().isoformat(timespec='seconds'),
+                'elapsed_seconds': round(elapsed, 3),
+                'requests': requests_made,
+                'requests_per_second': round(requests_made / elapsed, 3) if elapsed else 0.0,
+                'latency_seconds': {
+                    'p50': percentile(latencies, 50),
+                    'p95': percentile(latencies, 95),
+                    'p99': percentile(latencies, 99),
+                    'mean': sum(latencies) / requests_made if requests_made else None,
+                    'max': latencies[-1] if latencies else None,
+                },
+                'latency_buckets': {str(le): sum(1 for x in latencies if x <= le)
+                                    for le in LATENCY_BUCKETS},
+                'status_counts': dict(self.status_counts),
+                'bytes_received': self.bytes_received,
+                'throttle_retries': self.throttle_retries,
+                'rate_429': (self.status_counts.get('429', 0) / requests_made
+                             if requests_made else 0.0),
+                'results': self.results,
+                'retried_results': self.retried_results,
+                'time_split_seconds': {
+                    'crossref': round(self.network_seconds, 3),
+                    'rate_limit_wait': round(self.wait_seconds, 3),
+                    'retry_backoff': round(self.backoff_seconds, 3),
+                    'local': round(self.local_seconds, 3),
+                },
+            }
+        if cache:
+            lookups = cache.hits + cache.misses
+            data['cache'] = {'hits': cache.hits, 'misses': cache.misses,
+                             'revalidated': cache.revalidated,
+                             'hit_rate': cache.hits / lookups if lookups else 0.0}
+        return data
+
+    def write(self, output_dir: str, cache: 'DOICache' = None) -> tuple[str, str, dict]:
+        """Write the JSON and Prometheus textfile metrics; returns both paths
+        and the summary."""
+        data = self.summary(cache)
+        json_path = os.path.join(output_dir, METRICS_JSON)
+        with open(json_path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+
+        prefix = 'doi_verify'
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, float]]):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            lines.extend(f'{prefix}_{name}{labels} {value:g}' for labels, value in samples)
+
+        latency = data['latency_seconds']
+        metric('request_duration_seconds', 'histogram', 'CrossRef request latency.',
+               [(f'_bucket{{le="{le}"}}', n) for le, n in data['latency_buckets'].items()]
+               + [('_bucket{le="+Inf"}', data['requests']),
+                  ('_sum', self.network_seconds), ('_count', data['requests'])])
+        metric('request_duration_quantile_seconds', 'gauge', 'CrossRef request latency percentiles.',
+               [(f'{{quantile="{q}"}}', latency[p]) for q, p in
+                (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')) if latency[p] is not None])
+        metric('requests_total', 'counter', 'CrossRef requests by HTTP status.',
+               [(f'{{status="{status}"}}', n) for status, n in sorted(data['status_counts'].items())])
+        metric('response_bytes_total', 'counter', 'Response bytes received.',
+               [('', data['bytes_received'])])
+        metric('requests_per_second', 'gauge', 'Mean request rate over the run.',
+               [('', data['requests_per_second'])])
+        metric('throttled_ratio', 'gauge', 'Share of requests answered with 429.',
+               [('', data['rate_429'])])
+        metric('results_total', 'counter', 'DOI lookups finished (every attempt).',
+               [('', data['results'])])
+        metric('time_seconds_total', 'counter', 'Where the run spent its time.',
+               [(f'{{part="{part}"}}', seconds)
+                for part, seconds in data['time_split_seconds'].items()])
+        if 'cache' in data:
+            metric('cache_hit_ratio', 'gauge', 'Share of cache lookups that were fresh hits.',
+                   [('', data['cache']['hit_rate'])])
+        prom_path = os.path.join(output_dir, METRICS_PROM)
+        # Written then renamed, as node_exporter's textfile collector expects.
+        with open(prom_path + '.tmp', 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(prom_path + '.tmp', prom_path)
+        return json_path, prom_path, data
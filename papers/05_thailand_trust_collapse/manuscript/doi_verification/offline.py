@@ -0,0 +1,204 @@
+"""Offline verification against a local CrossRef metadata dump."""
+
+import re
+import json
+import gzip
+import hashlib
+import time
+import sys
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+
+from .records import VerificationResult
+from .cache import DEFAULT_CACHE_DIR
+from .verifier import apply_crossref_work, doi_key
+
+_DUMP_ITEMS = re.compile(r'"items"\s*:\s*\[')
+_DUMP_SEPARATOR = re.compile(r'[\s,]*')
+DUMP_SUFFIXES = ('.json.gz', '.jsonl.gz', '.json', '.jsonl')
+# Bumped whenever the index tables change, so older indexes are rebuilt.
+INDEX_VERSION = '2'
+
+
+def _iter_json_items(f, chunk_size: int = 1 << 20):
+    """Stream the objects of the first ``"items": [...]`` array in ``f``.
+
+    Only the current chunk and the work being decoded are held in memory,
+    so a single multi-gigabyte dump file is fine.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        buf += chunk
+        m = _DUMP_ITEMS.search(buf)
+        if m:
+            buf, pos = buf[m.end():], 0
+            break
+        buf = buf[-32:]  # the key may straddle two chunks
+
+    while True:
+        pos = _DUMP_SEPARATOR.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            if pos == len(buf):
+                raise json.JSONDecodeError('need more data', buf, pos)
+            item, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                if buf[pos:].strip():
+                    raise
+                return
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        yield item
+
+
+def dump_files(source: str) -> list[str]:
+    """The dump files under ``source`` (a file, or a directory of them)."""
+    if os.path.isfile(source):
+        return [source]
+    return sorted(str(p) for p in Path(source).rglob('*')
+                  if p.is_file() and p.name.endswith(DUMP_SUFFIXES))
+
+
+def iter_dump_works(source: str):
+    """Yield every CrossRef work in a metadata dump.
+
+    Accepts the public data file layout (``{"items": [...]}`` per
+    ``.json.gz``) and one-work-per-line ``.jsonl(.gz)``, gzipped or not.
+    """
+    for path in dump_files(source):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            if path.endswith(('.jsonl', '.jsonl.gz')):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from _iter_json_items(f)
+
+
+def dump_signature(source: str) -> str:
+    """Changes whenever a dump file is added, removed or rewritten."""
+    h = hashlib.sha1()
+    for path in dump_files(source):
+        st = os.stat(path)
+        h.update(f'{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}\n'.encode())
+    return h.hexdigest()
+
+
+class OfflineIndex:
+    """Read-only DOI -> (title, year, type, online-first) index of a CrossRef dump.
+
+    A SQLite file keyed by case-folded DOI (``WITHOUT ROWID``, work types
+    stored once in a side table). The fields are derived with
+    ``apply_crossref_work`` at build time, so results match online mode.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True,
+                                     check_same_thread=False)
+        self.count = int(self._meta('count') or 0)
+
+    def _meta(self, key: str) -> str | None:
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def build(source: str, path: str, batch_size: int = 10_000) -> int:
+        """Stream ``source`` into a new index at ``path``; returns the work count."""
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        conn.executescript(
+            'PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;'
+            'CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);'
+            'CREATE TABLE types (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);'
+            'CREATE TABLE works (doi TEXT PRIMARY KEY, title TEXT, year TEXT,'
+            ' type INTEGER NOT NULL, online_first INTEGER NOT NULL) WITHOUT ROWID;')
+        types = {}
+        batch = []
+        for work in iter_dump_works(source):
+            doi = work.get('DOI')
+            if not doi:
+                continue
+            result = VerificationResult(doi, doi)
+            apply_crossref_work(result, work)
+            type_id = types.get(result.crossref_type)
+            if type_id is None:
+                type_id = types[result.crossref_type] = len(types) + 1
+                conn.execute('INSERT INTO types VALUES (?, ?)', (type_id, result.crossref_type))
+            batch.append((doi_key(doi), result.crossref_title, result.crossref_year, type_id,
+                          result.online_first))
+            if len(batch) >= batch_size:
+                conn.executemany('INSERT OR REPLACE INTO works VALUES (?, ?, ?, ?, ?)', batch)
+                batch.clear()
+        conn.executemany('INSERT OR REPLACE INTO works VALUES (?, ?, ?, ?, ?)', batch)
+        count = conn.execute('SELECT COUNT(*) FROM works').fetchone()[0]
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('source', os.path.abspath(source)), ('signature', dump_signature(source)),
+            ('count', str(count)), ('version', INDEX_VERSION),
+            ('built_at', datetime.now().isoformat(timespec='seconds'))])
+        conn.commit()
+        conn.close()
+        os.replace(tmp_path, path)
+        return count
+
+    @classmethod
+    def open(cls, source: str, cache_dir: str = DEFAULT_CACHE_DIR) -> 'OfflineIndex':
+        """Open ``source`` if it is an index, else the index for that dump,
+        (re)building it first when missing or out of date."""
+        if source.endswith('.sqlite3'):
+            return cls(source)
+        index_dir = os.path.join(cache_dir, 'offline')
+        os.makedirs(index_dir, exist_ok=True)
+        name = os.path.basename(os.path.normpath(source)).split('.')[0]
+        digest = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()[:8]
+        path = os.path.join(index_dir, f'{name}-{digest}.sqlite3')
+        if os.path.exists(path):
+            index = cls(path)
+            if (index._meta('version') == INDEX_VERSION
+                    and index._meta('signature') == dump_signature(source)):
+                return index
+            index.close()
+        print(f"Building offline index from {source}...")
+        start = time.perf_counter()
+        count = cls.build(source, path)
+        print(f"  {count} works indexed in {time.perf_counter() - start:.1f}s ({path})")
+        return cls(path)
+
+    def lookup(self, doi: str) -> tuple[str | None, str | None, str, int] | None:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT w.title, w.year, t.name, w.online_first FROM works w'
+                ' JOIN types t ON t.id = w.type WHERE w.doi = ?', (doi_key(doi),)).fetchone()
+
+    def apply(self, result: VerificationResult) -> VerificationResult:
+        """Fill ``result`` as an online lookup would; a DOI missing from the
+        snapshot is reported like a CrossRef 404."""
+        row = self.lookup(result.cleaned_doi)
+        if row is None:
+            result.status_code = 404
+            result.error = 'DOI not found (404)'
+            return result
+        result.status_code = 200
+        result.resolves = True
+        result.crossref_title, result.crossref_year, crossref_type, online_first = row
+        result.crossref_type = sys.intern(crossref_type)
+        result.online_first = bool(online_first)
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
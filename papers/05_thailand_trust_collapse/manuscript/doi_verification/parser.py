@@ -0,0 +1,343 @@
+"""BibTeX/BibLaTeX parsing: a single forward pass over bytes or an mmap."""
+
+import re
+import mmap
+import hashlib
+import itertools
+import sys
+import os
+
+from .profiling import profiled
+from .records import BibEntry
+
+# BibTeX's predefined month macros (``month = jan``).
+BIB_MONTH_MACROS = {
+    name[:3]: name.capitalize()
+    for name in ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+                 'august', 'september', 'october', 'november', 'december')
+}
+
+# The tokenizer works on UTF-8 bytes so the same code can run over an mmap
+# of the file; offsets are byte offsets.
+_BIB_AT = re.compile(rb'@\s*(\w+)\s*([{(])')
+_BIB_SPACE = re.compile(rb'\s*')
+_BIB_KEY = re.compile(rb'[^\s,{}()]*')
+_BIB_NAME = re.compile(rb'[^\s"#%\'(),={}]+')
+_BIB_BRACE = re.compile(rb'[{}]')
+_BIB_QUOTE_OR_BRACE = re.compile(rb'["{}]')
+_WHITESPACE_RUN = re.compile(r'\s+')
+
+
+class _BibSyntaxError(ValueError):
+    pass
+
+
+def _skip_space(buf, pos: int) -> int:
+    return _BIB_SPACE.match(buf, pos).end()
+
+
+def _at(buf, pos: int, token: bytes) -> bool:
+    return buf[pos:pos + len(token)] == token
+
+
+def _text(buf, start: int, end: int) -> str:
+    return bytes(buf[start:end]).decode('utf-8', errors='replace')
+
+
+def _scan_braced(buf, pos: int) -> int:
+    """Return the offset just past the '}' that closes the '{' at ``pos``."""
+    depth = 0
+    while True:
+        m = _BIB_BRACE.search(buf, pos)
+        if m is None:
+            raise _BibSyntaxError('unbalanced braces')
+        pos = m.end()
+        depth += 1 if m.group() == b'{' else -1
+        if depth == 0:
+            return pos
+
+
+def _scan_quoted(buf, pos: int) -> int:
+    """Return the offset just past the '"' that closes the '"' at ``pos``."""
+    depth = 0
+    pos += 1
+    while True:
+        m = _BIB_QUOTE_OR_BRACE.search(buf, pos)
+        if m is None:
+            raise _BibSyntaxError('unterminated quoted value')
+        pos = m.end()
+        c = m.group()
+        if c == b'{':
+            depth += 1
+        elif c == b'}':
+            depth -= 1
+        elif depth == 0:
+            return pos
+
+
+def _parse_value(buf, pos: int, macros: dict) -> tuple[str, int]:
+    """Parse a (possibly ``#``-concatenated) field value starting at ``pos``."""
+    pieces = []
+    while True:
+        pos = _skip_space(buf, pos)
+        if _at(buf, pos, b'{'):
+            end = _scan_braced(buf, pos)
+            pieces.append(_text(buf, pos + 1, end - 1))
+        elif _at(buf, pos, b'"'):
+            end = _scan_quoted(buf, pos)
+            pieces.append(_text(buf, pos + 1, end - 1))
+        else:
+            m = _BIB_NAME.match(buf, pos)
+            if m is None:
+                raise _BibSyntaxError(f'expected a value at offset {pos}')
+            token = m.group().decode('utf-8', errors='replace')
+            pieces.append(token if token.isdigit() else macros.get(token.lower(), token))
+            end = m.end()
+        pos = _skip_space(buf, end)
+        if not _at(buf, pos, b'#'):
+            return ''.join(pieces), pos
+        pos += 1
+
+
+def _normalize_field(value: str) -> str:
+    value = _WHITESPACE_RUN.sub(' ', value).strip()
+    return value.replace('{', '').replace('}', '')
+
+
+def _parse_assignment(buf, pos: int, macros: dict) -> tuple[str, str, int]:
+    """Parse one ``name = value`` pair starting at ``pos``."""
+    m = _BIB_NAME.match(buf, pos)
+    if m is None:
+        raise _BibSyntaxError(f'expected a field name at offset {pos}')
+    pos = _skip_space(buf, m.end())
+    if not _at(buf, pos, b'='):
+        raise _BibSyntaxError(f"expected '=' at offset {pos}")
+    value, pos = _parse_value(buf, pos + 1, macros)
+    return m.group().decode('utf-8', errors='replace').lower(), value, pos
+
+
+def _expect(buf, pos: int, close: bytes) -> int:
+    pos = _skip_space(buf, pos)
+    if not _at(buf, pos, close):
+        raise _BibSyntaxError(f"expected {close!r} at offset {pos}")
+    return pos + 1
+
+
+def iter_bib_buffer(buf, macros: dict = None, start: int = 0, end: int = None,
+                    errors: list = None):
+    """Yield entries from BibTeX source in a single forward pass.
+
+    ``buf`` is UTF-8 ``bytes`` or any buffer the ``re`` module can scan, such
+    as an ``mmap``. Every scan works on offsets into it (no rest-of-file
+    slicing), so the cost is linear in the size of the input and only one
+    entry's text is materialized at a time. Handles nested braces, quoted
+    values, ``@string`` macros and ``#`` concatenation; ``@comment`` and
+    ``@preamble`` blocks are skipped. A malformed entry is dropped and parsing
+    resumes at the next ``@``.
+
+    Each entry records the byte ``offset`` of its ``@`` so it can be re-read
+    later with ``read_bib_entry``. ``@string`` definitions are collected into
+    ``macros`` when a dict is passed in. With an ``end`` offset, scanning
+    stops at the first block starting at or after it; the generator returns
+    the offset where scanning stopped. The offsets of dropped blocks are
+    appended to ``errors`` when a list is passed in.
+    """
+    if macros is None:
+        macros = {}
+    for name, value in BIB_MONTH_MACROS.items():
+        macros.setdefault(name, value)
+    pos = start
+    while True:
+        m = _BIB_AT.search(buf, pos)
+        if m is None or (end is not None and m.start() >= end):
+            return pos
+        kind = m.group(1).decode('ascii', errors='replace').lower()
+        close = b'}' if m.group(2) == b'{' else b')'
+        pos = m.end()
+        try:
+            if kind == 'comment':
+                if close == b'}':
+                    pos = _scan_braced(buf, m.end() - 1)
+            elif kind == 'preamble':
+                _, pos = _parse_value(buf, pos, macros)
+                pos = _expect(buf, pos, close)
+            elif kind == 'string':
+                name, value, pos = _parse_assignment(buf, _skip_space(buf, pos), macros)
+                macros[name] = value
+                pos = _expect(buf, pos, close)
+            else:
+                km = _BIB_KEY.match(buf, _skip_space(buf, pos))
+                fields = {}
+                pos = _skip_space(buf, km.end())
+                while _at(buf, pos, b','):
+                    pos = _skip_space(buf, pos + 1)
+                    if _at(buf, pos, close):
+                        break
+                    name, value, pos = _parse_assignment(buf, pos, macros)
+                    fields[sys.intern(name)] = _normalize_field(value)
+                pos = _expect(buf, pos, close)
+                yield BibEntry(sys.intern(kind.upper()),
+                               km.group().decode('utf-8', errors='replace'),
+                               fields, m.start())
+        except _BibSyntaxError:
+            if errors is not None:
+                errors.append(m.start())
+            pos = m.end()
+
+
+def parse_bib_string(content: str) -> list[BibEntry]:
+    """Parse BibTeX source text; see ``iter_bib_buffer``."""
+    return list(iter_bib_buffer(content.encode('utf-8')))
+
+
+def iter_bib_file(bib_path: str, macros: dict = None):
+    """Lazily yield the entries of a .bib file from a read-only mmap.
+
+    Parsing happens as the generator is consumed, so callers can start work
+    on the first entry straight away, and the file is never read into one
+    string: peak memory is the entries kept by the caller, not the file size.
+    """
+    with open(bib_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield from iter_bib_buffer(buf, macros)
+
+
+def read_bib_entry(bib_path: str, offset: int, macros: dict = None) -> BibEntry | None:
+    """Re-read the single entry starting at byte ``offset``.
+
+    Pass the ``macros`` collected by ``iter_bib_file`` if the entry uses
+    ``@string`` abbreviations defined earlier in the file.
+    """
+    with open(bib_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        macros = dict(macros) if macros else None
+        return next(iter_bib_buffer(buf, macros, start=offset), None)
+
+
+# Files are only cut into pieces of at least this many bytes; below that,
+# starting worker processes costs more than the parse.
+PARALLEL_PARSE_MIN_CHUNK = 1 << 18
+# A block starting at the beginning of a line: where a file may be cut.
+_BIB_LINE_AT = re.compile(rb'^[ \t]*(?=@\s*\w+\s*[{(])', re.MULTILINE)
+_BIB_STRING = re.compile(rb'@\s*string\s*[{(]', re.IGNORECASE)
+
+
+def bib_chunks(bib_path: str, jobs: int) -> list[tuple[int, int]]:
+    """Byte ranges ``[start, end)`` to parse ``bib_path`` in ``jobs`` processes.
+
+    Cuts fall on a line-leading ``@``, a few pieces per worker so an uneven
+    piece does not hold up the rest. Returns a single range when the file is
+    too small to be worth splitting or defines ``@string`` macros, which
+    entries further down depend on.
+    """
+    with open(bib_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        pieces = min(jobs * 4, size // PARALLEL_PARSE_MIN_CHUNK)
+        if pieces < 2:
+            return [(0, size)]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if _BIB_STRING.search(buf):
+                return [(0, size)]
+            bounds = [0]
+            for i in range(1, pieces):
+                m = _BIB_LINE_AT.search(buf, max(size * i // pieces, bounds[-1] + 1))
+                if m is None:
+                    break
+                bounds.append(m.end())
+    return list(zip(bounds, bounds[1:] + [size]))
+
+
+def _scan_range(buf, start: int, end: int, errors: list = None) -> tuple[list[BibEntry], int]:
+    """The entries starting in ``[start, end)`` and the offset where scanning stopped."""
+    entries = []
+    scan = iter_bib_buffer(buf, start=start, end=end, errors=errors)
+    while True:
+        try:
+            entries.append(next(scan))
+        except StopIteration as stop:
+            return entries, stop.value
+
+
+def parse_bib_chunk(bib_path: str, start: int, end: int) -> tuple[list[BibEntry], int]:
+    """Parse the entries starting in ``[start, end)`` of ``bib_path``.
+
+    Also returns the offset where scanning stopped, past ``end`` if the last
+    entry runs over it.
+    """
+    with open(bib_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        return _scan_range(buf, start, end)
+
+
+@profiled('parse')
+def parse_bib_entries(bib_path: str, jobs: int = 1) -> list[BibEntry]:
+    """Parse a .bib file and extract entries with their fields.
+
+    With ``jobs`` > 1 a large file is cut at entry starts (``bib_chunks``)
+    and the pieces are parsed in a process pool. The entries and their order
+    are the same as a serial parse: should a cut land inside an entry (a
+    value with a line starting with ``@``), the file is parsed serially.
+    """
+    if jobs > 1:
+        chunks = bib_chunks(bib_path, jobs)
+        if len(chunks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+                parts = list(pool.map(parse_bib_chunk, itertools.repeat(bib_path),
+                                      *zip(*chunks)))
+            if all(stop <= start for (_, stop), (start, _) in zip(parts, chunks[1:])):
+                return [entry for entries, _ in parts for entry in entries]
+    return list(iter_bib_file(bib_path))
+
+
+class IncrementalBibParser:
+    """Re-parses only the parts of a .bib file that changed since the last call.
+
+    The file is cut before every line-leading ``@`` and each piece is hashed;
+    a piece already seen in the previous parse reuses its entries, so a new
+    export costs one hash pass over the file plus a parse of the pieces that
+    differ. A piece is only parsed on its own if it parses cleanly (nothing
+    dropped, no entry running past its end), which keeps the result that of
+    ``parse_bib_entries``; otherwise, and for files with ``@string`` macros,
+    the whole file is parsed.
+    """
+
+    def __init__(self):
+        self._pieces = {}  # digest -> entries, offsets relative to the piece
+        self.parsed = 0    # pieces the last call had to parse
+        self.total = 0     # pieces in the file at the last call
+
+    def parse(self, bib_path: str) -> list[BibEntry]:
+        with open(bib_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self._pieces, self.parsed, self.total = {}, 0, 0
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                entries = None if _BIB_STRING.search(buf) else self._parse_pieces(buf)
+                if entries is None:
+                    self._pieces, self.parsed, self.total = {}, 1, 1
+                    entries = list(iter_bib_buffer(buf))
+        return entries
+
+    def _parse_pieces(self, buf) -> list[BibEntry] | None:
+        bounds = sorted({0, len(buf), *(m.end() for m in _BIB_LINE_AT.finditer(buf))})
+        pieces, entries, parsed = {}, [], 0
+        for start, end in zip(bounds, bounds[1:]):
+            digest = hashlib.blake2b(buf[start:end], digest_size=16).digest()
+            known = pieces.get(digest)
+            if known is None:
+                known = self._pieces.get(digest)
+            if known is None:
+                errors = []
+                found, stop = _scan_range(buf, start, end, errors)
+                if errors or stop > end:
+                    return None
+                known = [BibEntry(e.type, e.key, e.fields, e.offset - start) for e in found]
+                parsed += 1
+            pieces[digest] = known
+            entries.extend(BibEntry(e.type, e.key, e.fields, start + e.offset) for e in known)
+        self._pieces, self.parsed, self.total = pieces, parsed, len(bounds) - 1
+        return entries
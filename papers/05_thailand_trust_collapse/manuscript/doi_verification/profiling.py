@@ -0,0 +1,150 @@
+"""Stage timing for ``--profile``: spans, a sampling stack profiler and cProfile."""
+
+import time
+import sys
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+PROFILE_STATS = 'doi_verification_profile.pstats'
+PROFILE_STACKS = 'doi_verification_profile.collapsed'
+
+
+class StackSampler:
+    """Wall-clock sampler writing flame-graph collapsed stacks.
+
+    Every ``interval`` seconds it records the stack of every other thread,
+    rooted at the current profiling stage and the thread name, so waiting
+    (network, pacing, I/O) shows up next to CPU work. The output is the
+    ``frame;frame;frame count`` format of ``flamegraph.pl`` and speedscope.
+    """
+
+    def __init__(self, stages: list[str], interval: float = 0.005):
+        self.stages = stages
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            root = self.stages[:] or ['(no stage)']
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                self.counts[';'.join(root + [names.get(ident, str(ident))] + stack[::-1])] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class StageProfiler:
+    """Timing spans for the stages of a run (``--profile``).
+
+    Spans nest (``report/rows``) and accumulate wall and process CPU time
+    per path, so the end-of-run table shows whether a stage is CPU-bound
+    (CPU close to wall) or waiting on I/O or the network. Disabled, a span
+    is a shared no-op context. With ``full=True`` the run is also recorded
+    by cProfile and by a ``StackSampler`` for flame graphs.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self._stack = []
+        self._cprofile = None
+        self._sampler = None
+
+    def enable(self, full: bool = False):
+        self.enabled = True
+        if full:
+            self._sampler = StackSampler(self._stack)
+            self._sampler.start()
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def span(self, name: str):
+        return self._span(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _span(self, name: str):
+        self._stack.append(name)
+        # Registered on entry so the table lists parents before children.
+        stage = self.stages.setdefault('/'.join(self._stack), [0, 0.0, 0.0])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            stage[0] += 1
+            stage[1] += time.perf_counter() - wall
+            stage[2] += time.process_time() - cpu
+            self._stack.pop()
+
+    def iterate(self, name: str, iterable):
+        """Yield from ``iterable``, timing each step under ``name``."""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self._span(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def finish(self, output_dir: str) -> list[str]:
+        """Stop the profilers and write their dumps; returns the paths."""
+        paths = []
+        if self._cprofile or self._sampler:
+            os.makedirs(output_dir, exist_ok=True)
+        if self._cprofile:
+            self._cprofile.disable()
+            paths.append(os.path.join(output_dir, PROFILE_STATS))
+            self._cprofile.dump_stats(paths[-1])
+        if self._sampler:
+            self._sampler.stop()
+            paths.append(os.path.join(output_dir, PROFILE_STACKS))
+            self._sampler.write(paths[-1])
+        return paths
+
+    def print_table(self):
+        print(f"\n  {'Stage':<24} {'calls':>7} {'wall s':>9} {'CPU s':>9} {'CPU/wall':>9}")
+        for path, (calls, wall, cpu) in self.stages.items():
+            label = '  ' * path.count('/') + path.rsplit('/', 1)[-1]
+            share = f"{cpu / wall:.0%}" if wall > 0 else '-'
+            print(f"  {label:<24} {calls:>7} {wall:>9.3f} {cpu:>9.3f} {share:>9}")
+
+
+PROFILER = StageProfiler()
+
+
+def profiled(stage: str):
+    """Run the decorated function inside a ``PROFILER`` span."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with PROFILER.span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,239 @@
+"""Saved progress: snapshot, write-ahead journal (or SQLite store) and resume planning."""
+
+import json
+import hashlib
+import os
+import time
+
+from .profiling import profiled
+from .records import BibEntry, ISBNResult, VerificationResult
+from .isbn import is_isbn_key, isbn_progress_key
+
+PROGRESS_FILE = 'doi_verification_progress.json'
+
+
+def is_store_path(progress_path: str) -> bool:
+    """Progress kept in a ``ResultStore`` rather than the JSON snapshot and journal."""
+    return progress_path.endswith('.sqlite3')
+
+
+def journal_path_for(progress_path: str) -> str:
+    """Append-only journal that sits next to the progress snapshot."""
+    root, _ = os.path.splitext(progress_path)
+    return root + '.journal.jsonl'
+
+
+def result_from_json(key: str, data: dict) -> VerificationResult | ISBNResult:
+    """Progress records are DOI results, except under ISBN keys."""
+    if is_isbn_key(key):
+        return ISBNResult.from_json(data)
+    return VerificationResult.from_json(data)
+
+
+@profiled('load_progress')
+def load_progress(progress_path: str) -> dict[str, VerificationResult]:
+    """Load the progress snapshot, then replay any journaled results on top.
+
+    A torn final journal line (crash mid-write) is ignored, so at most the
+    last record is lost.
+
+    A ``.sqlite3`` path is read from the ``ResultStore`` instead; while the
+    store has no results yet, the JSON progress next to it is loaded, so
+    switching to ``--store sqlite`` carries the saved results over.
+    """
+    if is_store_path(progress_path):
+        from .store import ResultStore
+
+        store = ResultStore(progress_path)
+        try:
+            progress = store.load()
+        finally:
+            store.close()
+        json_path = os.path.join(os.path.dirname(progress_path), PROGRESS_FILE)
+        return progress or load_progress(json_path)
+
+    progress = {}
+    if os.path.exists(progress_path):
+        with open(progress_path, 'r') as f:
+            progress = {key: result_from_json(key, data)
+                        for key, data in json.load(f).items()}
+
+    journal_path = journal_path_for(progress_path)
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                progress[record['key']] = result_from_json(record['key'], record['result'])
+    return progress
+
+
+@profiled('save_progress')
+def save_progress(progress_path: str, progress: dict[str, VerificationResult]):
+    """Atomically write a full snapshot and empty the journal it supersedes.
+
+    The snapshot is one compact result per line, which keeps it small and
+    still line-diffable. A ``.sqlite3`` path replaces the store's results.
+    """
+    if is_store_path(progress_path):
+        from .store import ResultStore
+
+        store = ResultStore(progress_path)
+        try:
+            store.save(progress)
+        finally:
+            store.close()
+        return
+
+    tmp_path = progress_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write('{\n')
+        f.write(',\n'.join(
+            f'{json.dumps(key)}: {json.dumps(result.to_json(), separators=(",", ":"))}'
+            for key, result in progress.items()))
+        f.write('\n}\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, progress_path)
+    # Truncating after the replace is safe: if we crash in between, replaying
+    # the old journal over the new snapshot just rewrites the same results.
+    open(journal_path_for(progress_path), 'w').close()
+
+
+FINGERPRINT_FIELDS = ('doi', 'title', 'date', 'year', 'isbn')
+
+
+def entry_fingerprint(entry: BibEntry) -> str:
+    """Short hash of the bib fields that affect verification."""
+    fields = entry.fields
+    payload = '\x1f'.join(fields.get(name, '') for name in FINGERPRINT_FIELDS)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+@profiled('plan_resume')
+def plan_resume(entries_with_doi: list[BibEntry], progress: dict[str, VerificationResult],
+                field: str = 'doi', prune: bool = True) -> tuple[list[BibEntry], dict]:
+    """Decide which entries a resumed run has to verify.
+
+    New cite keys, entries whose fingerprint no longer matches the saved
+    result and saved transient failures are returned for checking; results
+    for cite keys that are gone from the bib (or lost their DOI) are pruned
+    from ``progress`` in place.
+    Results saved before fingerprints existed are kept if their DOI still
+    matches, and stamped with the current fingerprint.
+
+    ``field='isbn'`` plans the ISBN stage the same way, over the results
+    stored under ``isbn_progress_key``; each stage leaves the other's alone.
+    With ``prune=False`` only the given entries are planned (watch mode
+    passes the ones an export changed) and nothing is removed.
+    """
+    isbn_stage = field == 'isbn'
+    progress_key = isbn_progress_key if isbn_stage else str
+    counts = {'new': 0, 'changed': 0, 'retry': 0, 'unchanged': 0, 'removed': 0}
+    to_check = []
+    for entry in entries_with_doi:
+        saved = progress.get(progress_key(entry.key))
+        fingerprint = entry_fingerprint(entry)
+        if saved is None:
+            counts['new'] += 1
+            to_check.append(entry)
+        elif (saved.fingerprint or fingerprint) != fingerprint or \
+                getattr(saved, f'original_{field}') != entry.fields[field]:
+            counts['changed'] += 1
+            to_check.append(entry)
+        elif saved.retryable:
+            counts['retry'] += 1
+            to_check.append(entry)
+        else:
+            saved.fingerprint = fingerprint
+            counts['unchanged'] += 1
+    if not prune:
+        return to_check, counts
+
+    current = {progress_key(e.key) for e in entries_with_doi}
+    for key in [k for k in progress if is_isbn_key(k) == isbn_stage and k not in current]:
+        del progress[key]
+        counts['removed'] += 1
+    return to_check, counts
+
+
+ERROR_HISTORY_LIMIT = 5
+
+
+def carry_over(previous: VerificationResult | None, result: VerificationResult):
+    """Continue the attempt count and error history of a retried DOI or ISBN."""
+    if previous is None or previous is result or not previous.retryable \
+            or previous.lookup_id != result.lookup_id:
+        return
+    result.attempts = previous.attempts + 1
+    history = (previous.error_history or []) + [previous.error or 'Unknown']
+    result.error_history = history[-ERROR_HISTORY_LIMIT:]
+
+
+class ProgressJournal:
+    """Write-ahead journal for per-DOI results.
+
+    Each result is one appended JSON line instead of a rewrite of the whole
+    progress file; the journal is folded into the snapshot every
+    ``compact_every`` records and on ``close()``. A result replacing a
+    transient failure for the same DOI inherits its attempt count and error
+    history. DOI results not answered from the cache are stamped as
+    verified now.
+
+    With a ``.sqlite3`` progress path each result is committed to the
+    ``ResultStore`` as it arrives, so there is nothing to compact, and the
+    run (start, end, results recorded) goes into its run history.
+    """
+
+    def __init__(self, progress_path: str, progress: dict[str, VerificationResult],
+                 compact_every: int = 200):
+        self.progress_path = progress_path
+        self.progress = progress
+        self.compact_every = compact_every
+        self.recorded = 0
+        self._pending = 0
+        save_progress(progress_path, progress)
+        if is_store_path(progress_path):
+            from .store import ResultStore
+
+            self._store = ResultStore(progress_path)
+            self._run_id = self._store.start_run()
+            self._file = None
+        else:
+            self._store = None
+            self._file = open(journal_path_for(progress_path), 'a', encoding='utf-8')
+
+    def record(self, key: str, result: VerificationResult):
+        if isinstance(result, VerificationResult) and result.verified_at is None:
+            result.verified_at = round(time.time())
+        carry_over(self.progress.get(key), result)
+        self.progress[key] = result
+        self.recorded += 1
+        if self._store:
+            self._store.put(key, result)
+            return
+        self._file.write(json.dumps({'key': key, 'result': result.to_json()},
+                                    separators=(',', ':')) + '\n')
+        self._file.flush()
+        self._pending += 1
+        if self.compact_every and self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        if self._store:
+            return
+        self._file.close()
+        save_progress(self.progress_path, self.progress)
+        self._file = open(journal_path_for(self.progress_path), 'a', encoding='utf-8')
+        self._pending = 0
+
+    def close(self):
+        if self._store:
+            self._store.finish_run(self._run_id, self.recorded)
+            self._store.close()
+            return
+        if self._pending:
+            self.compact()
+        self._file.close()
@@ -0,0 +1,168 @@
+"""Adaptive request pacing and retry policy for CrossRef and the book sources."""
+
+import re
+import random
+import time
+import threading
+from datetime import datetime
+
+from .records import VerificationResult
+from .metrics import RequestMetrics
+
+MAX_THROTTLE_RETRIES = 5
+_INTERVAL = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$')
+_INTERVAL_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, None: 1}
+
+
+def parse_rate_limit(headers) -> float | None:
+    """Requests per second allowed by ``X-Rate-Limit-Limit``/``-Interval``."""
+    limit, interval = headers.get('X-Rate-Limit-Limit'), headers.get('X-Rate-Limit-Interval')
+    m = _INTERVAL.match(interval or '1s')
+    try:
+        limit = float(limit)
+    except (TypeError, ValueError):
+        return None
+    seconds = float(m.group(1)) * _INTERVAL_UNITS[m.group(2)] if m else 0
+    return limit / seconds if limit > 0 and seconds > 0 else None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        return None
+    return max(0.0, (when - datetime.now(when.tzinfo)).total_seconds())
+
+
+class RateController:
+    """Adaptive request pacing shared by every CrossRef call (AIMD).
+
+    Requests are spaced ``1/rate`` seconds apart. Every response that is not
+    a 429 raises the rate additively, by about ``increase`` req/s per second
+    of traffic, up to the limit CrossRef advertises in its
+    ``X-Rate-Limit-*`` headers (and ``max_rate``, if set). A 429 halves the
+    rate, once per burst of rejections, and holds every caller back until
+    its ``Retry-After`` has passed. Thread-safe: ``wait()`` is called from
+    the worker threads of the concurrent engine as well as the main loop.
+    """
+
+    def __init__(self, rate: float, max_rate: float = None, increase: float = 1.0,
+                 decrease: float = 0.5, min_rate: float = 0.05):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.max_rate = max_rate
+        self.advertised = None
+        self.increase = increase
+        self.decrease = decrease
+        self.min_rate = min_rate
+        self.rate = min(rate, max_rate) if max_rate else rate
+        self.throttled = 0
+        self._last_sent = float('-inf')
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ceiling(self) -> float:
+        limits = [r for r in (self.max_rate, self.advertised) if r]
+        return min(limits) if limits else float('inf')
+
+    def wait(self) -> float:
+        """Block until this caller may send; returns the send time.
+
+        The slot is re-checked rather than reserved up front, so callers
+        already waiting benefit as soon as the rate goes up.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                slot = max(self._last_sent + 1 / self.rate, self._paused_until)
+                if slot <= now:
+                    self._last_sent = now
+                    return now
+            time.sleep(min(slot - now, 0.1))
+
+    def observe(self, resp: 'requests.Response', sent: float) -> bool:
+        """Adapt to a response sent at ``sent``; ``True`` if it was a 429."""
+        with self._lock:
+            advertised = parse_rate_limit(resp.headers)
+            if advertised:
+                self.advertised = advertised
+            if resp.status_code != 429:
+                # ~``increase`` req/s per second of traffic, but never more
+                # than doubling on one response while the rate is still low.
+                step = min(self.increase / self.rate, self.rate)
+                self.rate = min(self.ceiling, self.rate + step)
+                return False
+            self.throttled += 1
+            # Requests already in flight when we backed off report the same
+            # overload; only the first of them should cut the rate.
+            if sent >= self._last_decrease:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = time.monotonic()
+            pause = parse_retry_after(resp.headers.get('Retry-After'))
+            resume = time.monotonic() + (pause if pause is not None else 1 / self.rate)
+            self._paused_until = max(self._paused_until, resume)
+            return True
+
+
+def paced_get(session: 'requests.Session', url: str, limiter: RateController = None,
+              metrics: RequestMetrics = None, **kwargs) -> 'requests.Response':
+    """``session.get`` paced by ``limiter``, retrying while CrossRef answers 429.
+
+    Without a limiter this is a plain single request. Every request sent is
+    recorded in ``metrics``, if given.
+    """
+    import requests
+
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        queued = time.monotonic()
+        sent = limiter.wait() if limiter else queued
+        start = time.perf_counter()
+        try:
+            resp = session.get(url, **kwargs)
+        except requests.exceptions.RequestException:
+            if metrics:
+                metrics.record_request(time.perf_counter() - start, None, 0, attempt,
+                                       sent - queued)
+            raise
+        if metrics:
+            metrics.record_request(time.perf_counter() - start, resp.status_code,
+                                   len(resp.content), attempt, sent - queued)
+        if not (limiter and limiter.observe(resp, sent)):
+            break
+    return resp
+
+
+# ── Retries ──────────────────────────────────────────────────────────────────
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient lookup failures.
+
+    A DOI gets up to ``max_attempts`` tries per run; after failed try ``n``
+    the next one waits a random ``0..min(cap, base * 2**(n-1))`` seconds, so
+    DOIs that failed together do not all come back at once.
+    """
+
+    def __init__(self, max_attempts: int = 4, base: float = 2.0, cap: float = 120.0,
+                 rng: random.Random = None):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self._rng = rng or random.Random()
+
+    def should_retry(self, result: 'VerificationResult', tries: int) -> bool:
+        return result.retryable and tries < self.max_attempts
+
+    def delay(self, tries: int) -> float:
+        return self._rng.uniform(0, min(self.cap, self.base * 2 ** (tries - 1)))
@@ -0,0 +1,158 @@
+"""The records passed between stages: bib entries and DOI/ISBN results."""
+
+import sys
+from dataclasses import MISSING, dataclass, fields as dataclass_fields
+
+
+@dataclass(slots=True)
+class BibEntry:
+    """One parsed bib entry. Field names are interned; ``offset`` is the byte
+    offset of the entry's ``@`` in the source file."""
+    type: str
+    key: str
+    fields: dict[str, str]
+    offset: int = -1
+
+
+@dataclass(slots=True)
+class VerificationResult:
+    """Outcome of checking one DOI.
+
+    ``to_json`` writes the compact form kept in the progress files: default
+    values are omitted, and so is ``original_doi`` when it equals
+    ``cleaned_doi`` (the usual case). ``from_json`` reads both that and the
+    older full dicts; keys it does not know are kept in ``extra``.
+
+    ``retryable`` marks transient failures (timeouts, connection errors,
+    429, 5xx) that a later attempt may fix, as opposed to final answers such
+    as a 404 or a malformed DOI. ``attempts`` counts the tries so far and
+    ``error_history`` keeps the errors of the earlier ones.
+
+    ``verified_at`` is when the answer was last fetched from CrossRef (Unix
+    seconds), and ``online_first`` marks works CrossRef lists with an online
+    but no print date yet; both drive ``--revalidate``.
+    """
+    original_doi: str
+    cleaned_doi: str
+    format_valid: bool = True
+    resolves: bool = False
+    status_code: int | None = None
+    crossref_title: str | None = None
+    crossref_year: str | None = None
+    crossref_type: str | None = None
+    error: str | None = None
+    fingerprint: str | None = None
+    retryable: bool = False
+    attempts: int = 1
+    error_history: list[str] | None = None
+    online_first: bool = False
+    verified_at: int | None = None
+    extra: dict | None = None
+
+    @property
+    def lookup_id(self) -> str:
+        return self.cleaned_doi
+
+    def to_dict(self) -> dict:
+        """Full, uncompressed form (every field, ``extra`` merged in)."""
+        data = {name: getattr(self, name) for name in _RESULT_FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_json(self) -> dict:
+        data = {}
+        for name in _RESULT_FIELDS:
+            value = getattr(self, name)
+            if value != _RESULT_DEFAULTS.get(name, _REQUIRED):
+                data[name] = value
+        if data.get('original_doi') == self.cleaned_doi:
+            del data['original_doi']
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'VerificationResult':
+        known = {}
+        extra = {}
+        for name, value in data.items():
+            if name in _RESULT_FIELD_SET:
+                known[name] = value
+            elif value not in (None, [], {}, ''):
+                extra[name] = value
+        known.setdefault('original_doi', known.get('cleaned_doi'))
+        if known.get('crossref_type'):
+            known['crossref_type'] = sys.intern(known['crossref_type'])
+        result = cls(**known, extra=extra or None)
+        if 'retryable' not in data:
+            # Saved before failures were classified.
+            result.retryable = is_transient(result)
+        return result
+
+
+_REQUIRED = object()
+_RESULT_FIELDS = [f.name for f in dataclass_fields(VerificationResult) if f.name != 'extra']
+_RESULT_FIELD_SET = frozenset(_RESULT_FIELDS)
+_RESULT_DEFAULTS = {f.name: f.default for f in dataclass_fields(VerificationResult)
+                    if f.default is not MISSING}
+
+
+@dataclass(slots=True)
+class ISBNResult:
+    """Outcome of checking one entry's ISBN against the book sources.
+
+    ``isbn`` is the first listed ISBN that passes its checksum, as ISBN-13
+    (``None`` if none does; ``error`` says why). ``found`` maps each source
+    name to whether it knows the book, or ``None`` if its lookup failed;
+    ``title``, ``year`` and ``doi`` come from the sources that found it.
+    Serialized and retried like ``VerificationResult``.
+    """
+    original_isbn: str
+    isbn: str | None = None
+    format_valid: bool = True
+    found: dict[str, bool | None] | None = None
+    title: str | None = None
+    year: str | None = None
+    doi: str | None = None
+    error: str | None = None
+    fingerprint: str | None = None
+    retryable: bool = False
+    attempts: int = 1
+    error_history: list[str] | None = None
+
+    @property
+    def lookup_id(self) -> str | None:
+        return self.isbn
+
+    def to_json(self) -> dict:
+        return {name: getattr(self, name) for name in _ISBN_FIELDS
+                if getattr(self, name) != _ISBN_DEFAULTS.get(name, _REQUIRED)}
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'ISBNResult':
+        return cls(**{name: value for name, value in data.items() if name in _ISBN_FIELDS})
+
+
+_ISBN_FIELDS = [f.name for f in dataclass_fields(ISBNResult)]
+_ISBN_DEFAULTS = {f.name: f.default for f in dataclass_fields(ISBNResult)
+                  if f.default is not MISSING}
+
+
+TRANSIENT_ERRORS = ('Request timeout', 'Connection error', 'Request failed',
+                    'Unreadable response')
+
+
+def is_transient(result: VerificationResult) -> bool:
+    """Whether a failed lookup is worth trying again later.
+
+    Timeouts, connection errors, 429, 5xx and a 200 whose body could not be
+    read are; a 404, another 4xx or a malformed DOI is a final answer.
+    """
+    if result.resolves or not result.format_valid:
+        return False
+    if result.status_code == 200:
+        return result.error == 'Unreadable response'
+    if result.status_code is not None:
+        return result.status_code == 429 or result.status_code >= 500
+    return bool(result.error) and result.error.startswith(TRANSIENT_ERRORS)
@@ -0,0 +1,582 @@
+"""Report generation: text, CSV, JSON Lines, Parquet and SQLite writers."""
+
+import json
+import csv
+import os
+from datetime import datetime
+
+from .profiling import PROFILER, profiled
+from .records import BibEntry, ISBNResult, VerificationResult
+from .similarity import (DEFAULT_TITLE_SCORER, TITLE_MISMATCH_THRESHOLDS, TITLE_SCORERS,
+                         score_titles_parallel)
+from .suggest import TitleIndex, bib_author_families, bib_year
+from .duplicates import find_duplicates
+from .isbn import GoogleBooks, OpenLibrary, is_isbn_key, isbn_progress_key
+from .snapshots import SnapshotReportWriter
+from .store import STORE_FILE, ResultStore
+
+CSV_COLUMNS = [
+    'cite_key', 'entry_type', 'bib_title', 'bib_date', 'doi',
+    'format_valid', 'resolves', 'status_code',
+    'crossref_title', 'crossref_year', 'title_similarity',
+    'year_match', 'error',
+    'suggested_doi', 'suggested_title', 'suggested_year', 'suggestion_score',
+    'isbn', 'isbn_confirmed', 'isbn_ol_found', 'isbn_gb_found', 'isbn_found_title',
+    'isbn_found_year', 'isbn_title_match', 'isbn_found_doi',
+]
+
+# Row fields of an entry that has an ISBN result but no DOI.
+_NO_DOI_ROW = dict.fromkeys((
+    'doi', 'original_doi', 'format_valid', 'resolves', 'status_code', 'crossref_title',
+    'crossref_year', 'crossref_type', 'title_similarity', 'year_match', 'error',
+    'retryable', 'attempts', 'error_history', 'verified_at', 'suggested_doi',
+    'suggested_title', 'suggested_year', 'suggestion_score',
+))
+_NO_ISBN_ROW = dict.fromkeys((
+    'isbn', 'isbn_confirmed', 'isbn_ol_found', 'isbn_gb_found', 'isbn_found_title',
+    'isbn_found_year', 'isbn_title_match', 'isbn_found_doi', 'isbn_category', 'isbn_error',
+))
+
+
+def isbn_row_fields(result: ISBNResult | None, bib_title: str | None, score,
+                    threshold: float) -> dict:
+    """The ``isbn_*`` report fields for an entry's ISBN result."""
+    if result is None:
+        return _NO_ISBN_ROW
+    found = result.found or {}
+    if not result.format_valid:
+        category = 'invalid'
+    elif any(found.values()):
+        category = 'confirmed'
+    elif result.retryable:
+        category = 'retryable'
+    elif result.error:
+        category = 'errors'
+    else:
+        category = 'not_found'
+    sim = score(bib_title, result.title) if bib_title and result.title else None
+    return {
+        'isbn': result.isbn or result.original_isbn,
+        'isbn_confirmed': category == 'confirmed',
+        'isbn_ol_found': found.get(OpenLibrary.name),
+        'isbn_gb_found': found.get(GoogleBooks.name),
+        'isbn_found_title': result.title,
+        'isbn_found_year': result.year,
+        'isbn_title_match': ('yes' if sim >= threshold else 'no') if sim is not None else None,
+        'isbn_found_doi': result.doi,
+        'isbn_category': category,
+        'isbn_error': result.error,
+    }
+
+
+def report_title_pairs(entries: list[BibEntry],
+                       progress: dict[str, VerificationResult]) -> list[tuple[str, str]]:
+    """The distinct ``(bib_title, found_title)`` pairs a report will score."""
+    pairs = {}
+    for entry in entries:
+        bib_title = entry.fields.get('title')
+        if not bib_title:
+            continue
+        result = progress.get(entry.key) if entry.fields.get('doi') else None
+        if result is not None and result.crossref_title:
+            pairs[bib_title, result.crossref_title] = None
+        result = progress.get(isbn_progress_key(entry.key)) if entry.fields.get('isbn') else None
+        if result is not None and result.title:
+            pairs[bib_title, result.title] = None
+    return list(pairs)
+
+
+def iter_report_rows(entries: list[BibEntry], progress: dict[str, VerificationResult],
+                     summary: dict,
+                     title_scorer: str = DEFAULT_TITLE_SCORER,
+                     suggester: TitleIndex = None,
+                     scores: dict = None):
+    """Classify every checked entry in one pass, yielding one flat row each.
+
+    Entries whose DOI is not yet checked yield nothing, nor do entries with
+    neither a DOI nor a checked ISBN; they are only counted in ``summary``,
+    which is complete once the generator is exhausted. Entries with a checked
+    ISBN also get the ``isbn_*`` fields (``isbn_category`` is one of
+    confirmed, not_found, invalid, retryable or errors).
+    With a ``suggester``, DOIs that were not found, are malformed or point to
+    a different title get candidate DOIs from it (``suggestions``, best
+    first, and the ``suggested_*`` fields for the best one).
+    Title similarities found in ``scores`` (keyed by title pair, as computed
+    up front by ``generate_report``) are not scored again.
+    """
+    score = TITLE_SCORERS[title_scorer]
+    if scores:
+        def score(a: str, b: str, inline=score) -> float:
+            known = scores.get((a, b))
+            return inline(a, b) if known is None else known
+    threshold = TITLE_MISMATCH_THRESHOLDS[title_scorer]
+    counts = dict.fromkeys(('total', 'no_doi', 'valid', 'not_found', 'invalid_format',
+                            'retryable', 'errors', 'title_mismatch', 'year_mismatch',
+                            'suggested', 'isbn_checked', 'isbn_confirmed', 'isbn_not_found',
+                            'isbn_invalid', 'isbn_retryable', 'isbn_errors',
+                            'isbn_title_mismatch'), 0)
+    summary.update(counts, checked=sum(not is_isbn_key(key) for key in progress),
+                   generated=datetime.now())
+
+    for entry in entries:
+        summary['total'] += 1
+        fields = entry.fields
+        isbn_result = progress.get(isbn_progress_key(entry.key)) if fields.get('isbn') else None
+        bib_title = fields.get('title')
+        bib_date = fields.get('date', fields.get('year', ''))
+        isbn_fields = isbn_row_fields(isbn_result, bib_title, score, threshold)
+        if isbn_result is not None:
+            summary['isbn_checked'] += 1
+            summary[f"isbn_{isbn_fields['isbn_category']}"] += 1
+            summary['isbn_title_mismatch'] += isbn_fields['isbn_title_match'] == 'no'
+
+        doi = fields.get('doi', '')
+        if not doi:
+            summary['no_doi'] += 1
+            if isbn_result is not None:
+                yield {'cite_key': entry.key, 'entry_type': entry.type,
+                       'bib_title': bib_title, 'bib_date': bib_date, **_NO_DOI_ROW,
+                       'category': 'no_doi', 'title_mismatch': False,
+                       'year_mismatch': False, 'suggestions': [], **isbn_fields}
+            continue
+        result = progress.get(entry.key)
+        if result is None:
+            continue
+
+        cr_title = result.crossref_title or ''
+        cr_year = result.crossref_year or ''
+        title_sim = score(bib_title, cr_title) if bib_title and cr_title else None
+
+        if not result.format_valid:
+            category = 'invalid_format'
+        elif not result.resolves:
+            if result.status_code == 404:
+                category = 'not_found'
+            else:
+                category = 'retryable' if result.retryable else 'errors'
+        else:
+            category = 'valid'
+        summary[category] += 1
+
+        row = {
+            'cite_key': entry.key,
+            'entry_type': entry.type,
+            'bib_title': bib_title,
+            'bib_date': bib_date,
+            'doi': result.cleaned_doi,
+            'original_doi': result.original_doi,
+            'format_valid': result.format_valid,
+            'resolves': result.resolves,
+            'status_code': result.status_code,
+            'crossref_title': result.crossref_title,
+            'crossref_year': result.crossref_year,
+            'crossref_type': result.crossref_type,
+            'title_similarity': title_sim,
+            'year_match': ('yes' if cr_year in bib_date else ('no' if bib_date else None))
+                          if cr_year else None,
+            'error': result.error,
+            'retryable': result.retryable,
+            'attempts': result.attempts,
+            'error_history': result.error_history,
+            'verified_at': result.verified_at,
+            'category': category,
+            'title_mismatch': category == 'valid' and title_sim is not None
+                              and title_sim < threshold,
+            'year_mismatch': category == 'valid' and bool(bib_date and cr_year)
+                             and cr_year not in bib_date,
+        }
+        suggestions = []
+        if suggester and bib_title and (category in ('not_found', 'invalid_format')
+                                        or row['title_mismatch']):
+            suggestions = suggester.suggest(
+                bib_title, bib_year(bib_date), bib_author_families(fields.get('author')),
+                exclude={result.cleaned_doi.lower()})
+        best = suggestions[0] if suggestions else {}
+        row.update(suggested_doi=best.get('doi'), suggested_title=best.get('title'),
+                   suggested_year=best.get('year'), suggestion_score=best.get('score'),
+                   suggestions=suggestions, **isbn_fields)
+        summary['title_mismatch'] += row['title_mismatch']
+        summary['year_mismatch'] += row['year_mismatch']
+        summary['suggested'] += bool(suggestions)
+        yield row
+
+
+class TextReportWriter:
+    """Human-readable summary; keeps only the flagged rows until ``close``."""
+
+    filename = 'doi_verification_report.txt'
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, self.filename)
+        self.sections = {name: [] for name in
+                         ('not_found', 'invalid_format', 'title_mismatch',
+                          'year_mismatch', 'retryable', 'errors', 'isbn_not_found',
+                          'isbn_invalid', 'isbn_title_mismatch', 'isbn_failed')}
+
+    def write(self, row: dict):
+        if row['category'] in ('not_found', 'invalid_format', 'retryable', 'errors'):
+            self.sections[row['category']].append(row)
+        if row['title_mismatch']:
+            self.sections['title_mismatch'].append(row)
+        if row['year_mismatch']:
+            self.sections['year_mismatch'].append(row)
+        if row['isbn_category'] in ('not_found', 'invalid'):
+            self.sections[f"isbn_{row['isbn_category']}"].append(row)
+        elif row['isbn_category'] in ('retryable', 'errors'):
+            self.sections['isbn_failed'].append(row)
+        if row['isbn_title_match'] == 'no':
+            self.sections['isbn_title_mismatch'].append(row)
+
+    def close(self, summary: dict):
+        def title(row: dict) -> str:
+            return row['bib_title'] if row['bib_title'] is not None else 'N/A'
+
+        with open(self.path, 'w') as f:
+            f.write("DOI VERIFICATION REPORT\n")
+            f.write(f"Generated: {summary['generated'].strftime('%Y-%m-%d %H:%M')}\n")
+            f.write("=" * 70 + "\n\n")
+
+            total_with_doi = summary['total'] - summary['no_doi']
+            checked = summary['checked']
+            f.write(f"Total entries:        {summary['total']}\n")
+            f.write(f"Entries with DOI:     {total_with_doi}\n")
+            f.write(f"Entries without DOI:  {summary['no_doi']}\n")
+            f.write(f"DOIs checked:         {checked}\n")
+            f.write(f"DOIs valid:           {summary['valid']}\n")
+            f.write(f"DOIs not found (404): {summary['not_found']}\n")
+            f.write(f"Invalid DOI format:   {summary['invalid_format']}\n")
+            f.write(f"Retryable failures:   {summary['retryable']}\n")
+            f.write(f"Other errors:         {summary['errors']}\n")
+            f.write(f"Title mismatches:     {summary['title_mismatch']}\n")
+            f.write(f"Year mismatches:      {summary['year_mismatch']}\n")
+            if summary['suggested']:
+                f.write(f"DOI suggestions:      {summary['suggested']}\n")
+            if summary['isbn_checked']:
+                f.write(f"ISBNs checked:        {summary['isbn_checked']}\n")
+                f.write(f"ISBNs confirmed:      {summary['isbn_confirmed']}\n")
+                f.write(f"ISBNs not found:      {summary['isbn_not_found']}\n")
+                f.write(f"Invalid ISBNs:        {summary['isbn_invalid']}\n")
+                f.write(f"ISBN lookup failures: "
+                        f"{summary['isbn_retryable'] + summary['isbn_errors']}\n")
+                f.write(f"ISBN title mismatch:  {summary['isbn_title_mismatch']}\n")
+            shared = [c for c in summary['duplicates'] if c['reason'] == 'doi']
+            similar = [c for c in summary['duplicates'] if c['reason'] == 'title']
+            if shared:
+                f.write(f"Shared DOIs:          {len(shared)} "
+                        f"({sum(len(c['entries']) for c in shared)} entries)\n")
+            if similar:
+                f.write(f"Likely duplicates:    {len(similar)} groups "
+                        f"({sum(len(c['entries']) for c in similar)} entries)\n")
+            f.write("\n")
+
+            if checked < total_with_doi:
+                remaining = total_with_doi - checked
+                f.write(f"⚠ {remaining} DOIs not yet checked (run with --resume to continue)\n\n")
+
+            def suggestion(row: dict, label: str):
+                if row['suggested_doi']:
+                    f.write(f"{label}{row['suggested_doi']} — {row['suggested_title']} "
+                            f"({row['suggested_year'] or 'n.d.'}), "
+                            f"score {row['suggestion_score']:.2f}\n")
+
+            def heading(text: str):
+                f.write("\n" + "─" * 70 + "\n")
+                f.write(text + "\n")
+                f.write("─" * 70 + "\n")
+
+            if self.sections['not_found']:
+                heading("DOIs NOT FOUND (404) — likely typos or incorrect DOIs")
+                for row in self.sections['not_found']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  Title: {title(row)}\n")
+                    f.write(f"  DOI:   {row['doi']}\n")
+                    suggestion(row, '  Suggested: ')
+
+            if self.sections['invalid_format']:
+                heading("INVALID DOI FORMAT")
+                for row in self.sections['invalid_format']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  Title: {title(row)}\n")
+                    f.write(f"  DOI:   {row['original_doi'] or 'N/A'}\n")
+                    suggestion(row, '  Suggested: ')
+
+            if self.sections['title_mismatch']:
+                heading("TITLE MISMATCHES — DOI may point to wrong article")
+                for row in self.sections['title_mismatch']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  Bib title:      {title(row)}\n")
+                    f.write(f"  CrossRef title:  {row['crossref_title']}\n")
+                    f.write(f"  DOI:             {row['doi']}\n")
+                    suggestion(row, '  Suggested DOI:   ')
+
+            if self.sections['year_mismatch']:
+                heading("YEAR MISMATCHES — may indicate wrong edition/version")
+                for row in self.sections['year_mismatch']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  Title:          {title(row)}\n")
+                    f.write(f"  Bib date:       {row['bib_date']}\n")
+                    f.write(f"  CrossRef year:   {row['crossref_year']}\n")
+                    f.write(f"  DOI:             {row['doi']}\n")
+
+            if self.sections['retryable']:
+                heading("RETRYABLE FAILURES — timeouts, connection errors, 429/5xx; "
+                        "rerun with --resume")
+                for row in self.sections['retryable']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  DOI:      {row['doi']}\n")
+                    f.write(f"  Error:    {row['error'] or 'Unknown'}\n")
+                    f.write(f"  Attempts: {row['attempts']}\n")
+                    if row['error_history']:
+                        f.write(f"  Earlier:  {'; '.join(row['error_history'])}\n")
+
+            if self.sections['errors']:
+                heading("OTHER ERRORS — unexpected responses; retrying will not help")
+                for row in self.sections['errors']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  DOI:   {row['doi']}\n")
+                    f.write(f"  Error: {row['error'] or 'Unknown'}\n")
+
+            if self.sections['isbn_not_found']:
+                heading("ISBNs NOT FOUND — in neither Open Library nor Google Books")
+                for row in self.sections['isbn_not_found']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  Title: {title(row)}\n")
+                    f.write(f"  ISBN:  {row['isbn']}\n")
+
+            if self.sections['isbn_invalid']:
+                heading("INVALID ISBNs — wrong length, characters or check digit")
+                for row in self.sections['isbn_invalid']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  Title: {title(row)}\n")
+                    f.write(f"  ISBN:  {row['isbn']}\n")
+                    f.write(f"  Error: {row['isbn_error']}\n")
+
+            if self.sections['isbn_title_mismatch']:
+                heading("ISBN TITLE MISMATCHES — ISBN may belong to another book")
+                for row in self.sections['isbn_title_mismatch']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  Bib title:   {title(row)}\n")
+                    f.write(f"  Book title:  {row['isbn_found_title']}\n")
+                    f.write(f"  ISBN:        {row['isbn']}\n")
+
+            if self.sections['isbn_failed']:
+                heading("ISBN LOOKUP FAILURES — retryable ones are retried with --resume")
+                for row in self.sections['isbn_failed']:
+                    f.write(f"\n  [{row['cite_key']}]\n")
+                    f.write(f"  ISBN:  {row['isbn']}\n")
+                    f.write(f"  Error: {row['isbn_error'] or 'Unknown'}\n")
+
+            def members(cluster: dict):
+                for entry in cluster['entries']:
+                    fields = entry.fields
+                    date = fields.get('date', fields.get('year')) or 'n.d.'
+                    f.write(f"  [{entry.key}] {fields.get('title') or 'N/A'} ({date})\n")
+
+            if shared:
+                heading("ENTRIES SHARING A DOI — one cite key per work is usually enough")
+                for cluster in shared:
+                    f.write(f"\n  DOI: {cluster['doi']}\n")
+                    members(cluster)
+
+            if similar:
+                heading("LIKELY DUPLICATE ENTRIES — same work under several cite keys "
+                        "(preprint/published, editions)")
+                for cluster in similar:
+                    f.write(f"\n  Title similarity: {cluster['similarity']:.2f}\n")
+                    members(cluster)
+
+            f.write("\n" + "=" * 70 + "\n")
+            f.write("End of report\n")
+
+
+class CSVReportWriter:
+    filename = 'doi_verification_results.csv'
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, self.filename)
+        self._file = open(self.path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_COLUMNS)
+
+    def write(self, row: dict):
+        sim = row['title_similarity']
+        self._writer.writerow([
+            row['cite_key'], row['entry_type'], row['bib_title'] or '', row['bib_date'],
+            row['doi'], row['format_valid'], row['resolves'], row['status_code'],
+            row['crossref_title'] or '', row['crossref_year'] or '',
+            round(sim, 2) if sim is not None else '', row['year_match'] or '',
+            row['error'], row['suggested_doi'] or '', row['suggested_title'] or '',
+            row['suggested_year'] or '',
+            round(row['suggestion_score'], 2) if row['suggestion_score'] is not None else '',
+            row['isbn'] or '', row['isbn_confirmed'], row['isbn_ol_found'],
+            row['isbn_gb_found'], row['isbn_found_title'] or '', row['isbn_found_year'] or '',
+            row['isbn_title_match'] or '', row['isbn_found_doi'] or '',
+        ])
+
+    def close(self, summary: dict):
+        self._file.close()
+
+
+class JSONLinesReportWriter:
+    filename = 'doi_verification_results.jsonl'
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, self.filename)
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def write(self, row: dict):
+        self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def close(self, summary: dict):
+        self._file.close()
+
+
+class ParquetReportWriter:
+    """Columnar results for the R/Quarto side (``arrow::read_parquet``).
+
+    Needs ``pyarrow``; rows are flushed in row groups so memory stays bounded.
+    """
+
+    filename = 'doi_verification_results.parquet'
+    row_group_size = 10_000
+
+    def __init__(self, output_dir: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = os.path.join(output_dir, self.filename)
+        string, boolean = pa.string(), pa.bool_()
+        self._schema = pa.schema([
+            ('cite_key', string), ('entry_type', string), ('bib_title', string),
+            ('bib_date', string), ('doi', string), ('original_doi', string),
+            ('format_valid', boolean), ('resolves', boolean), ('status_code', pa.int32()),
+            ('crossref_title', string), ('crossref_year', string), ('crossref_type', string),
+            ('title_similarity', pa.float64()), ('year_match', string), ('error', string),
+            ('retryable', boolean), ('attempts', pa.int32()),
+            ('error_history', pa.list_(string)),
+            ('suggested_doi', string), ('suggested_title', string),
+            ('suggested_year', string), ('suggestion_score', pa.float64()),
+            ('isbn', string), ('isbn_confirmed', boolean), ('isbn_ol_found', boolean),
+            ('isbn_gb_found', boolean), ('isbn_found_title', string),
+            ('isbn_found_year', string), ('isbn_title_match', string),
+            ('isbn_found_doi', string), ('isbn_category', string), ('isbn_error', string),
+            ('category', string), ('title_mismatch', boolean), ('year_mismatch', boolean),
+        ])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._rows = []
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def write(self, row: dict):
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def close(self, summary: dict):
+        self._flush()
+        self._writer.close()
+
+
+class SQLiteReportWriter:
+    """The report rows in the ``ResultStore``, indexed for ``verify_dois.py query``.
+
+    Each report replaces the previous rows in one transaction.
+    """
+
+    filename = STORE_FILE
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, self.filename)
+        self._store = ResultStore(self.path)
+        self._store.begin_report()
+
+    def write(self, row: dict):
+        self._store.add_report_row(row)
+
+    def close(self, summary: dict):
+        self._store.end_report()
+        self._store.close()
+
+
+REPORT_WRITERS = {
+    'text': TextReportWriter,
+    'csv': CSVReportWriter,
+    'jsonl': JSONLinesReportWriter,
+    'parquet': ParquetReportWriter,
+    'sqlite': SQLiteReportWriter,
+    'snapshot': SnapshotReportWriter,
+}
+DEFAULT_REPORT_FORMATS = ('text', 'csv')
+
+
+@profiled('report')
+def generate_report(entries: list[BibEntry], progress: dict[str, VerificationResult],
+                    output_dir: str,
+                    title_scorer: str = DEFAULT_TITLE_SCORER,
+                    formats=DEFAULT_REPORT_FORMATS,
+                    suggester: TitleIndex = None,
+                    jobs: int = 1,
+                    scores: dict = None) -> dict:
+    """Stream the report rows once through every requested writer.
+
+    Returns the written paths keyed by format. With CSV output, the
+    duplicate clusters also go to their own CSV (key ``'duplicates'``).
+    With ``jobs`` > 1 the title pairs are scored up front in a process pool.
+    A ``scores`` dict kept between calls (watch mode) holds the pairs
+    already scored, so only new ones are.
+    """
+    writers = {fmt: REPORT_WRITERS[fmt](output_dir) for fmt in formats}
+    summary = {'duplicates': find_duplicates(entries)}
+    if scores is not None or jobs > 1:
+        with PROFILER.span('score'):
+            scores = {} if scores is None else scores
+            pairs = [pair for pair in report_title_pairs(entries, progress)
+                     if pair not in scores]
+            scores.update(zip(pairs, score_titles_parallel(pairs, title_scorer, jobs)))
+    rows = iter_report_rows(entries, progress, summary, title_scorer, suggester, scores)
+    for row in PROFILER.iterate('rows', rows):
+        with PROFILER.span('write'):
+            for writer in writers.values():
+                writer.write(row)
+    with PROFILER.span('write'):
+        for writer in writers.values():
+            writer.close(summary)
+        paths = {fmt: writer.path for fmt, writer in writers.items()}
+        if 'csv' in writers:
+            paths['duplicates'] = write_duplicates_csv(summary['duplicates'], output_dir)
+    return paths
+
+
+DUPLICATES_CSV = 'doi_verification_duplicates.csv'
+
+
+def write_duplicates_csv(clusters: list[dict], output_dir: str) -> str:
+    """One row per entry of each ``find_duplicates`` cluster."""
+    path = os.path.join(output_dir, DUPLICATES_CSV)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['cluster', 'reason', 'similarity', 'cite_key', 'entry_type',
+                         'bib_title', 'bib_date', 'doi'])
+        for number, cluster in enumerate(clusters, 1):
+            sim = cluster['similarity']
+            for entry in cluster['entries']:
+                fields = entry.fields
+                writer.writerow([number, cluster['reason'],
+                                 round(sim, 2) if sim is not None else '', entry.key,
+                                 entry.type, fields.get('title', ''),
+                                 fields.get('date', fields.get('year', '')),
+                                 fields.get('doi', '')])
+    return path
+
+
+def print_report_paths(paths: dict):
+    labels = {'text': 'Report:', 'csv': 'CSV:', 'jsonl': 'JSONL:', 'parquet': 'Parquet:',
+              'sqlite': 'Store:', 'snapshot': 'Snapshot:', 'duplicates': 'Duplicates:'}
+    width = max((len(labels[fmt]) for fmt in paths), default=0)
+    print()
+    for fmt, path in paths.items():
+        print(f"{labels[fmt]:<{width}} {path}")
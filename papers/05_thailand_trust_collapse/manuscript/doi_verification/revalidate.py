@@ -0,0 +1,87 @@
+"""Re-validation of saved results: a priority queue of what to check again."""
+
+import heapq
+import time
+from datetime import datetime
+
+from .profiling import profiled
+from .records import BibEntry, VerificationResult
+from .similarity import DEFAULT_TITLE_SCORER, TITLE_MISMATCH_THRESHOLDS, TITLE_SCORERS
+
+# Queue tiers, in the order they are served.
+REVALIDATE_FAILED = 0        # 404s, title and year mismatches
+REVALIDATE_ONLINE_FIRST = 1  # recent works that may still gain a print year
+REVALIDATE_STABLE = 2        # everything else, oldest first
+REVALIDATE_TIERS = ('failed or mismatched', 'online-first', 'stable')
+# How long a result in each tier is trusted before it is due again.
+REVALIDATE_AFTER_DAYS = (1, 7, 90)
+RECENT_YEARS = 2  # works this many years old or newer count as recent
+
+
+def revalidation_tier(entry: BibEntry, result: VerificationResult, score, threshold: float,
+                      this_year: int) -> int | None:
+    """The queue tier of a saved DOI result; ``None`` if a re-check cannot change it.
+
+    Malformed DOIs are final and transient failures are retried by
+    ``plan_resume`` anyway. Results saved before ``online_first`` was recorded
+    (no ``verified_at``) count as online-first when they are recent.
+    """
+    if not result.format_valid or result.retryable:
+        return None
+    if not result.resolves:
+        return REVALIDATE_FAILED
+    fields = entry.fields
+    bib_title = fields.get('title')
+    bib_date = fields.get('date', fields.get('year', ''))
+    cr_year = result.crossref_year or ''
+    if bib_date and cr_year and cr_year not in bib_date:
+        return REVALIDATE_FAILED
+    if bib_title and result.crossref_title and score(bib_title, result.crossref_title) < threshold:
+        return REVALIDATE_FAILED
+    recent = cr_year.isdigit() and int(cr_year) >= this_year - RECENT_YEARS
+    if recent and (result.online_first or result.verified_at is None):
+        return REVALIDATE_ONLINE_FIRST
+    return REVALIDATE_STABLE
+
+
+@profiled('plan_revalidation')
+def plan_revalidation(entries_with_doi: list[BibEntry], progress: dict[str, VerificationResult],
+                      budget: int, exclude: list[BibEntry] = (),
+                      title_scorer: str = DEFAULT_TITLE_SCORER,
+                      now: float = None) -> tuple[list[BibEntry], dict]:
+    """Pick up to ``budget`` saved results to verify again, most urgent first.
+
+    A result is due once it is older than its tier's
+    ``REVALIDATE_AFTER_DAYS``. Due results are served failures and mismatches
+    first, then recent online-first works, then stable ones, each tier oldest
+    ``verified_at`` first; a heap of ``budget`` items keeps the pick
+    O(n log budget). Entries in ``exclude`` (already planned by
+    ``plan_resume``) are skipped. Returns the entries and, per tier name, how
+    many were ``due`` and how many were ``picked``.
+    """
+    now = time.time() if now is None else now
+    this_year = datetime.fromtimestamp(now).year
+    score = TITLE_SCORERS[title_scorer]
+    threshold = TITLE_MISMATCH_THRESHOLDS[title_scorer]
+    skip = {entry.key for entry in exclude}
+    due = [0] * len(REVALIDATE_TIERS)
+
+    def candidates():
+        for i, entry in enumerate(entries_with_doi):
+            result = progress.get(entry.key)
+            if result is None or entry.key in skip:
+                continue
+            tier = revalidation_tier(entry, result, score, threshold, this_year)
+            if tier is None:
+                continue
+            verified_at = result.verified_at or 0
+            if now - verified_at < REVALIDATE_AFTER_DAYS[tier] * 86400:
+                continue
+            due[tier] += 1
+            yield tier, verified_at, i, entry
+
+    picked = heapq.nsmallest(budget, candidates()) if budget > 0 else []
+    counts = {name: {'due': due[tier], 'picked': 0} for tier, name in enumerate(REVALIDATE_TIERS)}
+    for tier, _, _, _ in picked:
+        counts[REVALIDATE_TIERS[tier]]['picked'] += 1
+    return [entry for _, _, _, entry in picked], counts
@@ -0,0 +1,154 @@
+"""Per-run result snapshots and the diff between two of them."""
+
+import gzip
+import hashlib
+import os
+import re
+from datetime import datetime
+
+SNAPSHOT_DIR = 'doi_verification_runs'
+SNAPSHOT_COLUMNS = ('cite_key', 'doi', 'state', 'status_code', 'detail')
+_SNAPSHOT_NAME = re.compile(r'run-(\d+)-(\d{8}T\d{6})\.tsv\.gz$')
+
+# Snapshot states that count as fine; the retryable ones are neither fine
+# nor broken, since the next run may settle them either way.
+GOOD_STATES = frozenset(('valid', 'isbn_confirmed'))
+PENDING_STATES = frozenset(('retryable', 'isbn_retryable'))
+DIFF_CHANGES = ('broken', 'fixed', 'changed', 'added', 'removed')
+
+
+def snapshot_state(row: dict) -> str:
+    """One word for where a report row stands, e.g. ``not_found`` or ``year_mismatch``."""
+    if row['category'] == 'no_doi':
+        return f"isbn_{row['isbn_category']}"
+    if row['category'] != 'valid':
+        return row['category']
+    if row['title_mismatch'] and row['year_mismatch']:
+        return 'title_year_mismatch'
+    if row['title_mismatch']:
+        return 'title_mismatch'
+    if row['year_mismatch']:
+        return 'year_mismatch'
+    return 'valid'
+
+
+def is_broken(state: str) -> bool:
+    return state not in GOOD_STATES and state not in PENDING_STATES
+
+
+def _snapshot_detail(row: dict, state: str) -> str:
+    if state in ('title_mismatch', 'title_year_mismatch'):
+        return f"title {row['title_similarity']:.2f}: {row['crossref_title']}"
+    if state == 'year_mismatch':
+        return f"{row['bib_date']} vs CrossRef {row['crossref_year']}"
+    if row['category'] == 'no_doi':
+        return row['isbn_error'] or row['isbn'] or ''
+    return row['error'] or ''
+
+
+class Snapshot:
+    """One saved snapshot: ``run-<id>-<time>.tsv.gz`` in ``SNAPSHOT_DIR``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        m = _SNAPSHOT_NAME.search(os.path.basename(path))
+        self.run_id = int(m.group(1))
+        self.created = datetime.strptime(m.group(2), '%Y%m%dT%H%M%S')
+
+    def rows(self):
+        """Stream ``(cite_key, doi, state, status_code, detail)`` tuples."""
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            next(f)  # column names
+            for line in f:
+                yield tuple(line.rstrip('\n').split('\t'))
+
+    def digest(self) -> str:
+        sha = hashlib.sha1()
+        with gzip.open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+
+def list_snapshots(output_dir: str) -> list[Snapshot]:
+    """The snapshots of an output directory, oldest run first."""
+    directory = os.path.join(output_dir, SNAPSHOT_DIR)
+    if not os.path.isdir(directory):
+        return []
+    snapshots = [Snapshot(os.path.join(directory, name)) for name in os.listdir(directory)
+                 if _SNAPSHOT_NAME.fullmatch(name)]
+    return sorted(snapshots, key=lambda snapshot: snapshot.run_id)
+
+
+class SnapshotReportWriter:
+    """Keeps a compact snapshot of every verification run for ``verify_dois.py diff``.
+
+    One gzipped, tab-separated line per report row with the cite key, DOI
+    and state, numbered after the last run in the directory. A run whose
+    snapshot is identical to the previous one keeps the previous one instead.
+    """
+
+    def __init__(self, output_dir: str):
+        directory = os.path.join(output_dir, SNAPSHOT_DIR)
+        os.makedirs(directory, exist_ok=True)
+        snapshots = list_snapshots(output_dir)
+        self._previous = snapshots[-1] if snapshots else None
+        run_id = self._previous.run_id + 1 if self._previous else 1
+        self.path = os.path.join(
+            directory, f"run-{run_id:06d}-{datetime.now():%Y%m%dT%H%M%S}.tsv.gz")
+        self._file = gzip.open(self.path + '.tmp', 'wt', encoding='utf-8')
+        self._sha = hashlib.sha1()
+        self._write(SNAPSHOT_COLUMNS)
+
+    def _write(self, values):
+        line = '\t'.join(' '.join(str(value).split()) for value in values) + '\n'
+        self._file.write(line)
+        self._sha.update(line.encode('utf-8'))
+
+    def write(self, row: dict):
+        state = snapshot_state(row)
+        self._write((row['cite_key'], row['doi'] or '', state, row['status_code'] or '',
+                     _snapshot_detail(row, state)))
+
+    def close(self, summary: dict):
+        self._file.close()
+        if self._previous and self._previous.digest() == self._sha.hexdigest():
+            os.remove(self.path + '.tmp')
+            self.path = self._previous.path
+        else:
+            os.replace(self.path + '.tmp', self.path)
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> list[dict]:
+    """What changed between two snapshots, as a keyed hash-join.
+
+    Only ``old`` is held in memory (cite key to DOI, state and detail) and
+    ``new`` is streamed against it, so any two runs can be compared however
+    many are kept. Each change is ``broken`` (newly broken, including new
+    entries that are), ``fixed``, ``changed`` (any other change of state or
+    DOI), ``added`` or ``removed``; results are sorted by change, then key.
+    """
+    before = {key: (doi, state, detail) for key, doi, state, _, detail in old.rows()}
+    changes = []
+    for key, doi, state, _, detail in new.rows():
+        previous = before.pop(key, None)
+        if previous is None:
+            change = 'broken' if is_broken(state) else 'added'
+            old_doi = old_state = ''
+        else:
+            old_doi, old_state, _ = previous
+            if (old_doi, old_state) == (doi, state):
+                continue
+            if is_broken(state) and not is_broken(old_state):
+                change = 'broken'
+            elif is_broken(old_state) and state in GOOD_STATES:
+                change = 'fixed'
+            else:
+                change = 'changed'
+        changes.append({'change': change, 'cite_key': key, 'old_state': old_state,
+                        'new_state': state, 'old_doi': old_doi, 'doi': doi, 'detail': detail})
+    for key, (doi, state, detail) in before.items():
+        changes.append({'change': 'removed', 'cite_key': key, 'old_state': state,
+                        'new_state': '', 'old_doi': doi, 'doi': '', 'detail': detail})
+    changes.sort(key=lambda change: (DIFF_CHANGES.index(change['change']), change['cite_key']))
+    return changes
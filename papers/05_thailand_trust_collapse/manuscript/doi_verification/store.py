@@ -0,0 +1,181 @@
+"""SQLite results store: saved results, the latest report rows and run history."""
+
+import json
+import sqlite3
+import time
+from collections.abc import Mapping
+
+from .records import VerificationResult
+from .progress import result_from_json
+
+STORE_FILE = 'doi_verification_results.sqlite3'
+
+# Columns of the ``report`` table: the report row fields, as SQLite types.
+# Lists (``error_history``) are stored as JSON text.
+REPORT_COLUMNS = (
+    ('cite_key', 'TEXT PRIMARY KEY'), ('entry_type', 'TEXT COLLATE NOCASE'),
+    ('bib_title', 'TEXT'), ('bib_date', 'TEXT'), ('doi', 'TEXT COLLATE NOCASE'),
+    ('original_doi', 'TEXT'), ('format_valid', 'INTEGER'), ('resolves', 'INTEGER'),
+    ('status_code', 'INTEGER'), ('crossref_title', 'TEXT'), ('crossref_year', 'TEXT'),
+    ('crossref_type', 'TEXT'), ('title_similarity', 'REAL'), ('year_match', 'TEXT'),
+    ('error', 'TEXT'), ('retryable', 'INTEGER'), ('attempts', 'INTEGER'),
+    ('error_history', 'TEXT'), ('verified_at', 'INTEGER'),
+    ('suggested_doi', 'TEXT'), ('suggested_title', 'TEXT'), ('suggested_year', 'TEXT'),
+    ('suggestion_score', 'REAL'), ('isbn', 'TEXT'), ('isbn_confirmed', 'INTEGER'),
+    ('isbn_ol_found', 'INTEGER'), ('isbn_gb_found', 'INTEGER'), ('isbn_found_title', 'TEXT'),
+    ('isbn_found_year', 'TEXT'), ('isbn_title_match', 'TEXT'), ('isbn_found_doi', 'TEXT'),
+    ('isbn_category', 'TEXT'), ('isbn_error', 'TEXT'), ('category', 'TEXT'),
+    ('title_mismatch', 'INTEGER'), ('year_mismatch', 'INTEGER'),
+)
+REPORT_COLUMN_NAMES = tuple(name for name, _ in REPORT_COLUMNS)
+REPORT_INDEXES = ('doi', 'category', 'status_code', 'entry_type', 'title_mismatch',
+                  'year_mismatch', 'verified_at')
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY, doi TEXT COLLATE NOCASE, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS results_doi ON results (doi);
+CREATE TABLE IF NOT EXISTS report ({', '.join(f'{name} {kind}' for name, kind in REPORT_COLUMNS)});
+{''.join(f'CREATE INDEX IF NOT EXISTS report_{name} ON report ({name});'
+         for name in REPORT_INDEXES)}
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY, started_at INTEGER NOT NULL, finished_at INTEGER,
+    checked INTEGER NOT NULL DEFAULT 0);
+"""
+
+
+class ResultStore:
+    """One SQLite file per output directory, an alternative to the JSON progress.
+
+    ``results`` holds what the progress snapshot and journal hold (one
+    compact JSON result per key, written as each one arrives), ``report``
+    the rows of the latest report with indexes on cite key, DOI, status
+    and the mismatch flags, and ``runs`` one line per verification run. The
+    database is in WAL mode, so a report can read results while a writer
+    replaces the report rows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    # Saved results (the progress)
+
+    def load(self) -> dict[str, VerificationResult]:
+        return {key: result_from_json(key, json.loads(data))
+                for key, data in self._conn.execute('SELECT key, data FROM results')}
+
+    def save(self, progress: dict[str, VerificationResult]):
+        """Replace every saved result in one transaction."""
+        with self._conn:
+            self._conn.execute('DELETE FROM results')
+            self._conn.executemany('INSERT INTO results VALUES (?, ?, ?)',
+                                   (_result_row(key, result) for key, result in progress.items()))
+
+    def put(self, key: str, result: VerificationResult):
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                               _result_row(key, result))
+
+    def results(self) -> 'StoredResults':
+        return StoredResults(self._conn)
+
+    # Report rows
+
+    def begin_report(self):
+        """Start replacing the report rows; they are committed by ``end_report``."""
+        self._conn.execute('DELETE FROM report')
+
+    def add_report_row(self, row: dict):
+        values = [row.get(name) for name in REPORT_COLUMN_NAMES]
+        history = REPORT_COLUMN_NAMES.index('error_history')
+        if values[history] is not None:
+            values[history] = json.dumps(values[history], ensure_ascii=False)
+        self._conn.execute(_INSERT_REPORT_ROW, values)
+
+    def end_report(self):
+        self._conn.commit()
+
+    def query(self, where: list[tuple[str, tuple]] = (), columns=REPORT_COLUMN_NAMES,
+              order_by: str = 'cite_key', descending: bool = False,
+              limit: int = None) -> list[tuple]:
+        """Report rows matching every ``(sql_condition, params)`` in ``where``.
+
+        ``columns`` and ``order_by`` must be report column names; the
+        conditions are the caller's SQL with ``?`` placeholders.
+        """
+        unknown = [name for name in (*columns, order_by) if name not in REPORT_COLUMN_NAMES]
+        if unknown:
+            raise ValueError(f"unknown column(s): {', '.join(unknown)}")
+        sql = f"SELECT {', '.join(columns)} FROM report"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(f'({condition})' for condition, _ in where)
+        sql += f" ORDER BY {order_by}{' DESC' if descending else ''}"
+        params = [param for _, condition_params in where for param in condition_params]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return self._conn.execute(sql, params).fetchall()
+
+    # Run history
+
+    def start_run(self) -> int:
+        with self._conn:
+            return self._conn.execute('INSERT INTO runs (started_at) VALUES (?)',
+                                      (int(time.time()),)).lastrowid
+
+    def finish_run(self, run_id: int, checked: int):
+        with self._conn:
+            self._conn.execute('UPDATE runs SET finished_at = ?, checked = ? WHERE run_id = ?',
+                               (round(time.time()), checked, run_id))
+
+    def runs(self, last: int = None) -> list[tuple]:
+        """``(run_id, started_at, finished_at, checked)``, newest first."""
+        sql = 'SELECT run_id, started_at, finished_at, checked FROM runs ORDER BY run_id DESC'
+        if last is not None:
+            return self._conn.execute(sql + ' LIMIT ?', (last,)).fetchall()
+        return self._conn.execute(sql).fetchall()
+
+    def close(self):
+        self._conn.close()
+
+
+_INSERT_REPORT_ROW = (f"INSERT INTO report ({', '.join(REPORT_COLUMN_NAMES)}) "
+                      f"VALUES ({', '.join('?' * len(REPORT_COLUMN_NAMES))})")
+
+# Condition for ``query``: verified during the last N runs (every verified
+# row if fewer runs are recorded, or none, as in stores written before runs were).
+SINCE_RUNS = ('verified_at >= COALESCE('
+              '(SELECT started_at FROM runs ORDER BY run_id DESC LIMIT 1 OFFSET ?),'
+              ' (SELECT MIN(verified_at) FROM report))')
+
+
+def _result_row(key: str, result: VerificationResult) -> tuple:
+    return (key, getattr(result, 'cleaned_doi', None),
+            json.dumps(result.to_json(), separators=(',', ':')))
+
+
+class StoredResults(Mapping):
+    """A read-only ``progress`` that reads each result from the store on demand.
+
+    Lets ``generate_report`` work straight from the store without loading
+    every result first.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getitem__(self, key: str):
+        row = self._conn.execute('SELECT data FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return result_from_json(key, json.loads(row[0]))
+
+    def __iter__(self):
+        return (key for key, in self._conn.execute('SELECT key FROM results'))
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
@@ -0,0 +1,142 @@
+"""DOI suggestions from a trigram index over the cached CrossRef titles."""
+
+import re
+from collections import Counter
+from functools import lru_cache
+
+from .records import VerificationResult
+from .cache import DOICache
+from .verifier import apply_crossref_work
+from .similarity import DEFAULT_TITLE_SCORER, TITLE_SCORERS, normalize_title
+
+_YEAR = re.compile(r'\b(1[5-9]\d\d|20\d\d)\b')
+SUGGESTION_WEIGHTS = {'title': 0.7, 'year': 0.15, 'author': 0.15}
+
+
+@lru_cache(maxsize=None)
+def title_ngrams(title: str, n: int = 3) -> frozenset:
+    text = f' {normalize_title(title)} '
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def bib_year(date: str | None) -> int | None:
+    m = _YEAR.search(date or '')
+    return int(m.group(1)) if m else None
+
+
+def bib_author_families(author: str | None) -> list[str]:
+    """Normalized family names from a bib ``author`` field, in order."""
+    families = []
+    for name in re.split(r'\s+and\s+', author or ''):
+        name = name.strip()
+        if not name or name.lower() == 'others':
+            continue
+        family = name.split(',')[0] if ',' in name else name.split()[-1]
+        family = normalize_title(family)
+        if family:
+            families.append(family)
+    return families
+
+
+def crossref_author_families(work: dict) -> list[str]:
+    return [normalize_title(a['family']) for a in work.get('author') or [] if a.get('family')]
+
+
+class TitleIndex:
+    """Inverted character-trigram index over CrossRef titles.
+
+    ``suggest`` probes the rarer half of a bib title's trigrams, shortlists
+    the works sharing most of them, then ranks the shortlist by weighted
+    title, year and first-author agreement, renormalised over the signals
+    both sides have. A close match shares most trigrams, so it is found
+    through the rare ones without walking the long posting lists of
+    trigrams like `` th``. Suggestions are memoized until the index grows.
+    """
+
+    def __init__(self, title_scorer: str = DEFAULT_TITLE_SCORER, shortlist: int = 50):
+        self.score_title = TITLE_SCORERS[title_scorer]
+        self.shortlist = shortlist
+        self.works = []  # (doi, title, year, author families)
+        self._dois = set()
+        self._sizes = []
+        self._postings = {}
+        self._memo = {}
+
+    def __len__(self) -> int:
+        return len(self.works)
+
+    def add(self, doi: str, title: str, year: int | None, families: list[str]):
+        grams = title_ngrams(title)
+        if not grams:
+            return
+        work_id = len(self.works)
+        self.works.append((doi, title, year, families))
+        self._dois.add(doi.lower())
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(work_id)
+        self._memo.clear()
+
+    def add_work(self, doi: str, work: dict):
+        """Index a CrossRef ``work`` record, unless its DOI is already in."""
+        doi = work.get('DOI', doi)
+        if doi.lower() in self._dois:
+            return
+        result = VerificationResult(doi, doi)
+        apply_crossref_work(result, work)
+        if result.crossref_title:
+            self.add(doi, result.crossref_title, bib_year(result.crossref_year),
+                     crossref_author_families(work))
+
+    @classmethod
+    def from_cache(cls, cache: DOICache, title_scorer: str = DEFAULT_TITLE_SCORER
+                   ) -> 'TitleIndex':
+        index = cls(title_scorer)
+        for doi, work in cache.iter_works():
+            index.add_work(doi, work)
+        return index
+
+    def _shortlist(self, grams: frozenset) -> list[int]:
+        postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+        shared = Counter()
+        for posting in postings[:max(3, len(postings) // 2)]:
+            shared.update(posting)
+        # Dice coefficient over the probed trigrams, ties broken by work id.
+        dice = sorted(((-2 * n / (len(grams) + self._sizes[work_id]), work_id)
+                       for work_id, n in shared.items()))
+        return [work_id for _, work_id in dice[:self.shortlist]]
+
+    def suggest(self, title: str, year: int | None = None, families: list[str] = (),
+                exclude: set = frozenset(), k: int = 3, min_score: float = 0.5) -> list[dict]:
+        """Top ``k`` works for a bib entry, best first, as
+        ``{'doi', 'title', 'year', 'score'}`` dicts."""
+        memo_key = (title, year, tuple(families), frozenset(exclude), k, min_score)
+        if memo_key not in self._memo:
+            self._memo[memo_key] = self._suggest(title, year, families, exclude, k, min_score)
+        return self._memo[memo_key]
+
+    def _suggest(self, title: str, year: int | None, families: list[str], exclude: set,
+                 k: int, min_score: float) -> list[dict]:
+        grams = title_ngrams(title)
+        if not grams:
+            return []
+        ranked = []
+        for work_id in self._shortlist(grams):
+            doi, work_title, work_year, work_families = self.works[work_id]
+            if doi.lower() in exclude:
+                continue
+            signals = [('title', self.score_title(title, work_title))]
+            if year and work_year:
+                signals.append(('year', 1.0 if year == work_year
+                                else 0.5 if abs(year - work_year) == 1 else 0.0))
+            if families and work_families:
+                signals.append(('author', 1.0 if families[0] in work_families
+                                else 0.5 if set(families) & set(work_families) else 0.0))
+            total = sum(SUGGESTION_WEIGHTS[name] for name, _ in signals)
+            score = sum(SUGGESTION_WEIGHTS[name] * value for name, value in signals) / total
+            if score >= min_score:
+                ranked.append((score, doi, work_title, work_year))
+        ranked.sort(key=lambda r: (-r[0], r[1]))
+        return [{'doi': doi, 'title': work_title,
+                 'year': str(work_year) if work_year else None, 'score': round(score, 4)}
+                for score, doi, work_title, work_year in ranked[:k]]
@@ -0,0 +1,337 @@
+"""DOI verification against CrossRef: single, batch and concurrent lookups."""
+
+import re
+import json
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+from .records import BibEntry, VerificationResult, is_transient
+from .cache import DOICache
+from .metrics import RequestMetrics
+from .ratelimit import RateController, RetryPolicy, paced_get
+
+DOI_PATTERN = re.compile(r'^10\.\d{4,}/.+$')
+CROSSREF_API = 'https://api.crossref.org'
+
+def validate_doi_format(doi: str) -> bool:
+    return bool(DOI_PATTERN.match(doi.strip()))
+
+
+def clean_doi(doi: str) -> str:
+    doi = doi.strip()
+    for prefix in ['https://doi.org/', 'http://doi.org/', 'https://dx.doi.org/', 'http://dx.doi.org/']:
+        if doi.lower().startswith(prefix):
+            doi = doi[len(prefix):]
+    doi = doi.rstrip('.,;')
+    return doi
+
+
+def doi_key(doi: str) -> str:
+    """Lookup and de-duplication key for a DOI: cleaned and case-folded."""
+    return clean_doi(doi).lower()
+
+
+def apply_crossref_work(result: VerificationResult, work: dict):
+    """Copy title, year and type from a CrossRef ``message`` into ``result``."""
+    titles = work.get('title', [])
+    if titles:
+        result.crossref_title = titles[0]
+
+    date_parts = work.get('published-print', work.get('published-online', work.get('issued', {})))
+    if date_parts and 'date-parts' in date_parts:
+        parts = date_parts['date-parts']
+        if parts and parts[0] and parts[0][0]:
+            result.crossref_year = str(parts[0][0])
+
+    result.crossref_type = sys.intern(work.get('type', ''))
+    result.online_first = 'published-online' in work and 'published-print' not in work
+
+
+def new_result(doi: str, clean: str) -> VerificationResult:
+    return VerificationResult(doi, clean, format_valid=validate_doi_format(clean))
+
+
+def _apply_cached(result: VerificationResult, record: dict,
+                  fetched_at: float = None) -> VerificationResult:
+    result.verified_at = round(fetched_at or record['fetched_at'])
+    result.status_code = record['status']
+    if record['status'] == 200:
+        result.resolves = True
+        if record['message'] is not None:
+            apply_crossref_work(result, record['message'])
+    elif record['status'] == 404:
+        result.error = 'DOI not found (404)'
+    return result
+
+
+def verify_doi_crossref(doi: str, email: str = None, session: 'requests.Session' = None,
+                        api_url: str = CROSSREF_API, cache: 'DOICache' = None,
+                        limiter: RateController = None,
+                        metrics: RequestMetrics = None,
+                        offline: 'OfflineIndex' = None) -> VerificationResult:
+    """Look ``doi`` up on CrossRef (or in ``cache``).
+
+    With an ``offline`` index the answer comes from the local snapshot and
+    no request is made.
+
+    With a ``limiter`` the request is paced and throttled (429) responses are
+    retried after their ``Retry-After``; a 429 only ends up in the result
+    once the retries run out.
+    """
+    clean = clean_doi(doi)
+    result = new_result(doi, clean)
+
+    if not result.format_valid:
+        result.error = 'Invalid DOI format'
+        return result
+
+    if offline is not None:
+        return offline.apply(result)
+
+    record, fresh = cache.lookup(clean) if cache else (None, False)
+    if fresh:
+        return _apply_cached(result, record)
+
+    import requests
+
+    s = session or requests.Session()
+    url = f'{api_url.rstrip("/")}/works/{quote(clean, safe="")}'
+    headers = {'Accept': 'application/json'}
+    if email:
+        headers['User-Agent'] = f'DOI-Verifier/1.0 (mailto:{email})'
+    if record:
+        # Stale cache entry: revalidate instead of refetching when we can.
+        if record['etag']:
+            headers['If-None-Match'] = record['etag']
+        if record['last_modified']:
+            headers['If-Modified-Since'] = record['last_modified']
+
+    try:
+        resp = paced_get(s, url, limiter, metrics, headers=headers, timeout=30)
+
+        if resp.status_code == 304 and record:
+            cache.touch(clean)
+            return _apply_cached(result, record, time.time())
+
+        result.status_code = resp.status_code
+
+        if resp.status_code == 200:
+            try:
+                work = resp.json()['message']
+                apply_crossref_work(result, work)
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                # Not a CrossRef work (an HTML error page, a truncated body):
+                # retried later and never cached, or it would pass as a
+                # resolving DOI with nothing to compare for the whole TTL.
+                result.error = 'Unreadable response'
+            else:
+                result.resolves = True
+                if cache:
+                    cache.put(clean, 200, work, etag=resp.headers.get('ETag'),
+                              last_modified=resp.headers.get('Last-Modified'))
+
+        elif resp.status_code == 404:
+            result.error = 'DOI not found (404)'
+            if cache:
+                cache.put(clean, 404, None)
+        elif resp.status_code == 429:
+            result.error = ('Rate limited (429)' if limiter
+                            else 'Rate limited (429) — increase delay')
+        else:
+            result.error = f'HTTP {resp.status_code}'
+
+    except requests.exceptions.Timeout:
+        result.error = 'Request timeout'
+    except requests.exceptions.ConnectionError:
+        result.error = 'Connection error'
+    except requests.exceptions.RequestException as e:
+        result.error = f'Request failed: {e}'
+    except Exception as e:
+        result.error = str(e)
+
+    result.retryable = is_transient(result)
+    return result
+
+
+def fetch_crossref_batch(dois: list[str], email: str = None,
+                         session: 'requests.Session' = None,
+                         api_url: str = CROSSREF_API,
+                         limiter: RateController = None,
+                         metrics: RequestMetrics = None) -> dict | None:
+    """Fetch several works with one ``/works?filter=doi:A,doi:B`` request.
+
+    Returns CrossRef messages keyed by lower-cased DOI, or ``None`` if the
+    request itself failed. DOIs absent from the response are simply missing
+    from the dict; the filter query cannot tell a 404 from anything else.
+    """
+    import requests
+
+    s = session or requests.Session()
+    headers = {'Accept': 'application/json'}
+    if email:
+        headers['User-Agent'] = f'DOI-Verifier/1.0 (mailto:{email})'
+    params = {'filter': ','.join(f'doi:{d}' for d in dois), 'rows': len(dois)}
+    try:
+        resp = paced_get(s, f'{api_url.rstrip("/")}/works', limiter, metrics,
+                         params=params, headers=headers, timeout=60)
+        if resp.status_code != 200:
+            return None
+        items = resp.json().get('message', {}).get('items', [])
+    except (requests.exceptions.RequestException, json.JSONDecodeError, AttributeError):
+        return None
+    return {item['DOI'].lower(): item for item in items if item.get('DOI')}
+
+
+def verify_batch(entries: list[BibEntry], email: str = None,
+                 session: 'requests.Session' = None, api_url: str = CROSSREF_API,
+                 cache: DOICache = None, limiter: RateController = None,
+                 metrics: RequestMetrics = None
+                 ) -> tuple[list[tuple[BibEntry, VerificationResult]], list[BibEntry]]:
+    """Verify a chunk of entries with at most one CrossRef request.
+
+    Returns ``(done, leftover)``: ``done`` pairs each answered entry with its
+    result; ``leftover`` entries were not in the batch response (or the batch
+    request failed) and need a single ``verify_doi_crossref`` lookup, which is
+    what tells a real 404 apart from a filter miss.
+    """
+    done, leftover, batchable = [], [], []
+    for entry in entries:
+        doi = entry.fields['doi']
+        clean = clean_doi(doi)
+        result = new_result(doi, clean)
+        if not result.format_valid:
+            result.error = 'Invalid DOI format'
+            done.append((entry, result))
+            continue
+        record, fresh = cache.lookup(clean) if cache else (None, False)
+        if fresh:
+            done.append((entry, _apply_cached(result, record)))
+        elif ',' in clean:
+            # A comma would split the filter expression.
+            leftover.append(entry)
+        else:
+            batchable.append((entry, result))
+
+    if not batchable:
+        return done, leftover
+    works = fetch_crossref_batch([r.cleaned_doi for _, r in batchable],
+                                 email=email, session=session, api_url=api_url,
+                                 limiter=limiter, metrics=metrics)
+    for entry, result in batchable:
+        work = works.get(result.cleaned_doi.lower()) if works is not None else None
+        if work is None:
+            leftover.append(entry)
+            continue
+        result.status_code = 200
+        result.resolves = True
+        try:
+            apply_crossref_work(result, work)
+        except (KeyError, IndexError):
+            pass
+        if cache:
+            cache.put(result.cleaned_doi, 200, work)
+        done.append((entry, result))
+    return done, leftover
+
+
+def result_status(result: VerificationResult) -> str:
+    """Short console marker for a verification result."""
+    if result.resolves:
+        return '✓'
+    elif result.status_code == 404:
+        return '✗ NOT FOUND'
+    elif not result.format_valid:
+        return '⚠ BAD FORMAT'
+    elif result.retryable:
+        return f"↻ {result.error or 'ERROR'} (will retry)"
+    return f"⚠ {result.error or 'ERROR'}"
+
+
+# ── Concurrent Verification ──────────────────────────────────────────────────
+
+async def verify_entries_async(entries: list[BibEntry], on_result, email: str = None,
+                               concurrency: int = 4, rate: float = 2.0,
+                               api_url: str = CROSSREF_API, cache: DOICache = None,
+                               batch_size: int = 1, limiter: RateController = None,
+                               retry: RetryPolicy = None, metrics: RequestMetrics = None):
+    """Verify ``entries`` with up to ``concurrency`` requests in flight.
+
+    Each lookup is the same blocking ``verify_doi_crossref`` call, run on a
+    worker thread with its own ``requests.Session``, so results are identical
+    to the sequential path. ``on_result(entry, result)`` is called on the event
+    loop as each lookup completes, which is where progress gets saved. All
+    workers share one ``limiter`` (a ``RateController`` starting at ``rate``
+    if none is given), which the threads wait on before each request, so
+    DOIs answered from a fresh ``cache`` record never wait. With
+    ``batch_size > 1`` each worker takes a chunk at a time and sends it
+    as one ``verify_batch`` request, falling back to single lookups for DOIs
+    the batch did not return. Transient failures are retried under ``retry``
+    in their own tasks once their backoff has passed, while the workers move
+    on; ``on_result`` sees every attempt. Requests and backoff are recorded in
+    ``metrics``, if given.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    limiter = limiter or RateController(rate)
+    retry = retry or RetryPolicy(max_attempts=1)
+    retries = set()
+    pending = (entries[i:i + batch_size] for i in range(0, len(entries), batch_size))
+    local = threading.local()
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency,
+                                  thread_name_prefix='crossref')
+
+    def session() -> 'requests.Session':
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    def lookup(doi: str) -> VerificationResult:
+        return verify_doi_crossref(doi, email=email, session=session(),
+                                   api_url=api_url, cache=cache, limiter=limiter,
+                                   metrics=metrics)
+
+    def lookup_batch(chunk: list[BibEntry]):
+        return verify_batch(chunk, email=email, session=session(),
+                            api_url=api_url, cache=cache, limiter=limiter,
+                            metrics=metrics)
+
+    async def verify_one(entry: BibEntry, tries: int = 1):
+        result = await loop.run_in_executor(executor, lookup, entry.fields['doi'])
+        on_result(entry, result)
+        if retry.should_retry(result, tries):
+            task = asyncio.create_task(retry_later(entry, tries))
+            retries.add(task)
+            task.add_done_callback(retries.discard)
+
+    async def retry_later(entry: BibEntry, tries: int):
+        delay = retry.delay(tries)
+        if metrics:
+            metrics.record_backoff(delay)
+        await asyncio.sleep(delay)
+        await verify_one(entry, tries + 1)
+
+    async def worker():
+        for chunk in pending:
+            if len(chunk) == 1:
+                await verify_one(chunk[0])
+                continue
+            done, leftover = await loop.run_in_executor(executor, lookup_batch, chunk)
+            for entry, result in done:
+                on_result(entry, result)
+            for entry in leftover:
+                await verify_one(entry)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        while retries:
+            await asyncio.gather(*retries)
+    finally:
+        for task in retries:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
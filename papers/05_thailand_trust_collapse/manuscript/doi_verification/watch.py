@@ -0,0 +1,91 @@
+"""Watch mode: wait for a new export of the bib file."""
+
+import time
+import sys
+import os
+import select
+
+# inotify(7) events on the export's directory: written, attributes changed
+# (wget -N sets the mtime), closed after writing, renamed into or created.
+_IN_MODIFY, _IN_ATTRIB, _IN_CLOSE_WRITE, _IN_MOVED_TO, _IN_CREATE = 0x2, 0x4, 0x8, 0x80, 0x100
+WATCH_SETTLE = 2.0  # seconds a changed file has to stay unchanged before it is read
+
+
+def _inotify_watch(directory: str) -> int | None:
+    """A non-blocking inotify descriptor watching ``directory``; None off Linux."""
+    if not sys.platform.startswith('linux'):
+        return None
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    mask = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher:
+    """Blocks until a file changes: inotify on Linux, polling its stat elsewhere.
+
+    inotify watches the file's directory, so an export written elsewhere and
+    renamed over the old one is seen as well as one rewritten in place. A
+    change is only reported once the file has kept its inode, size and mtime
+    for ``settle`` seconds, so a download still in progress is not read
+    half-way.
+    """
+
+    def __init__(self, path: str, interval: float = 5.0, settle: float = WATCH_SETTLE):
+        self.path = path
+        self.interval = interval
+        self.settle = settle
+        self._fd = _inotify_watch(os.path.dirname(os.path.abspath(path)))
+        self.mode = 'inotify' if self._fd is not None else f'polling every {interval:g}s'
+        self._seen = self._stat()
+
+    def _stat(self) -> tuple | None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _pause(self):
+        if self._fd is None:
+            time.sleep(self.interval)
+            return
+        select.select([self._fd], [], [])
+        try:
+            while True:
+                os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            pass
+
+    def wait(self):
+        """Return once the file differs from the last time and has settled."""
+        while True:
+            self._pause()
+            current = self._stat()
+            if current is None or current == self._seen:
+                continue
+            while True:
+                time.sleep(self.settle)
+                settled = self._stat()
+                if settled == current:
+                    break
+                current = settled
+            if current is not None:
+                self._seen = current
+                return
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,27 @@
+"""Workspace mode: every .bib of the paper bank in one run."""
+
+import os
+from pathlib import Path
+
+
+def discover_bib_files(root: str) -> list[str]:
+    """Bib files in the workspace root (e.g. the Paperpile export) and under papers/*."""
+    root_path = Path(root)
+    found = set(root_path.glob('*.bib')) | set(root_path.glob('papers/*/**/*.bib'))
+    return sorted(str(p) for p in found
+                  if not any(part.startswith('.') for part in p.relative_to(root_path).parts))
+
+
+def workspace_output_dirs(bib_paths: list[str]) -> dict[str, str]:
+    """Where each bib's progress and reports go: next to the bib, unless it
+    shares its directory with another bib, then in a per-bib subdirectory."""
+    per_dir = {}
+    for path in bib_paths:
+        per_dir.setdefault(os.path.dirname(os.path.abspath(path)), []).append(path)
+    out = {}
+    for directory, paths in per_dir.items():
+        for path in paths:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            out[path] = (directory if len(paths) == 1
+                         else os.path.join(directory, f'doi_check_{stem}'))
+    return out
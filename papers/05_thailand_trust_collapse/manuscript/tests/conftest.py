@@ -0,0 +1,36 @@
+"""Fixtures: the ``doi_verification`` package on ``sys.path`` and the stub servers."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import BooksStub, CrossRefStub  # noqa: E402
+
+
+@pytest.fixture
+def crossref():
+    server = CrossRefStub()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def books():
+    server = BooksStub()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def run_cli(monkeypatch, capsys):
+    """Run ``verify_dois.py`` with the given arguments; returns its stdout."""
+    from doi_verification.cli import main
+
+    def run(*argv) -> str:
+        monkeypatch.setattr(sys, 'argv', ['verify_dois.py', *map(str, argv)])
+        main()
+        return capsys.readouterr().out
+    return run
@@ -0,0 +1,180 @@
+"""Local stand-in HTTP servers for CrossRef and the book sources.
+
+They answer like CrossRef, Open Library and Google Books closely
+enough for the verifier, record every request, and can be told to add
+latency, throttle with 429s or fail transiently, so the tests never touch
+the network.
+"""
+
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+def crossref_work(doi: str, title: str = None, year: int = 2020) -> dict:
+    return {'DOI': doi, 'title': [title or f'Title for {doi}'], 'type': 'journal-article',
+            'issued': {'date-parts': [[year]]}}
+
+
+class StubServer:
+    """A threaded HTTP server on a free local port, with a request log."""
+
+    def __init__(self, handler):
+        self.requests = []
+        self.latency = 0.0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append((time.monotonic(), self.path, dict(self.headers)))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, headers, body = handler(self)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body is not None:
+                    self.wfile.write(body if isinstance(body, bytes) else json.dumps(body).encode())
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def paths(self) -> list[str]:
+        return [path for _, path, _ in self.requests]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class CrossRefStub(StubServer):
+    """``/works/{doi}`` and ``/works?filter=doi:...`` over a dict of works.
+
+    Works are ``crossref_work(doi)`` unless ``works`` maps the DOI to another
+    work, or to ``None`` for a 404; ``bodies`` maps a DOI to a raw body
+    served with a 200 instead (an HTML error page, say). ETags are a
+    checksum of the body, so a conditional request gets a 304 until the
+    work changes. ``fail_first``
+    maps a DOI to how many 503s it gets before an answer; ``limit`` (requests
+    per second) turns on 429s with ``retry_after`` and, if ``advertise``, the
+    ``X-Rate-Limit-*`` headers on every answer.
+    """
+
+    def __init__(self):
+        self.works = {}
+        self.bodies = {}
+        self.fail_first = {}
+        self.limit = None
+        self.retry_after = '1'
+        self.advertise = True
+        self.throttled = 0
+        self._window = []
+        super().__init__(self._answer)
+
+    def work(self, doi: str) -> dict | None:
+        return self.works[doi] if doi in self.works else crossref_work(doi)
+
+    def _answer(self, request):
+        headers = {}
+        if self.limit:
+            with self.lock:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.limit:
+                    self.throttled += 1
+                    return 429, {'Retry-After': self.retry_after} if self.retry_after else {}, None
+                self._window.append(now)
+            if self.advertise:
+                headers = {'X-Rate-Limit-Limit': str(self.limit), 'X-Rate-Limit-Interval': '1s'}
+        url = urlparse(request.path)
+        if url.path.startswith('/works/'):
+            doi = unquote(url.path[len('/works/'):])
+            with self.lock:
+                failures = self.fail_first.get(doi, 0)
+                if failures:
+                    self.fail_first[doi] = failures - 1
+            if failures:
+                return 503, headers, None
+            if doi in self.bodies:
+                return 200, headers, self.bodies[doi]
+            work = self.work(doi)
+            if work is None:
+                return 404, headers, b'Resource not found.'
+            body = json.dumps({'status': 'ok', 'message': work}).encode()
+            etag = '"%08x"' % zlib.crc32(body)
+            if request.headers.get('If-None-Match') == etag:
+                return 304, {**headers, 'ETag': etag}, None
+            return 200, {**headers, 'ETag': etag, 'Content-Type': 'application/json'}, body
+        if url.path == '/works':
+            dois = [term[len('doi:'):] for term in parse_qs(url.query)['filter'][0].split(',')]
+            items = [work for work in map(self.work, dois) if work is not None]
+            return 200, headers, {'status': 'ok',
+                                  'message': {'items': items, 'total-results': len(items)}}
+        return 400, headers, None
+
+
+class BooksStub(StubServer):
+    """Open Library (``/api/books``) and Google Books (``/volumes``) in one server.
+
+    ``books[source][isbn13]`` is the record each source knows, or ``bytes``
+    served as the raw body of a 200; ``fail_first`` maps ``(source, isbn)``
+    to a number of 503s to serve first.
+    """
+
+    def __init__(self):
+        self.books = {'openlibrary': {}, 'googlebooks': {}}
+        self.fail_first = {}
+        self.inflight = {'openlibrary': 0, 'googlebooks': 0}
+        self.max_inflight = {'openlibrary': 0, 'googlebooks': 0}
+        super().__init__(self._answer)
+
+    def _answer(self, request):
+        url = urlparse(request.path)
+        query = parse_qs(url.query)
+        if url.path.endswith('/api/books'):
+            source, isbn = 'openlibrary', query['bibkeys'][0].split(':', 1)[1]
+        elif url.path.endswith('/volumes'):
+            source, isbn = 'googlebooks', query['q'][0].split(':', 1)[1]
+        else:
+            return 400, {}, None
+        with self.lock:
+            failures = self.fail_first.get((source, isbn), 0)
+            if failures:
+                self.fail_first[(source, isbn)] = failures - 1
+            self.inflight[source] += 1
+            self.max_inflight[source] = max(self.max_inflight[source], self.inflight[source])
+        try:
+            time.sleep(0.02)
+            if failures:
+                return 503, {}, None
+            book = self.books[source].get(isbn)
+            if isinstance(book, bytes):
+                return 200, {}, book
+            if source == 'openlibrary':
+                return 200, {}, {f'ISBN:{isbn}': book} if book else {}
+            body = {'kind': 'books#volumes', 'totalItems': 1 if book else 0}
+            if book:
+                body['items'] = [{'volumeInfo': book}]
+            return 200, {}, body
+        finally:
+            with self.lock:
+                self.inflight[source] -= 1
+
+
+def write_bib(path, entries: list[dict]):
+    """Write ``@type{key, field = {value}, ...}`` entries to ``path``."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            fields = ',\n'.join(f'  {name} = {{{value}}}' for name, value in entry.items()
+                                if name not in ('type', 'key'))
+            f.write(f"@{entry.get('type', 'article')}{{{entry['key']},\n{fields}\n}}\n\n")
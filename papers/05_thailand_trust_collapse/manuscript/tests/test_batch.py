@@ -0,0 +1,58 @@
+from urllib.parse import parse_qs, urlparse
+
+from doi_verification.cache import DOICache
+from doi_verification.records import BibEntry
+from doi_verification.verifier import verify_batch, verify_doi_crossref
+
+
+def entries(dois: list[str]) -> list[BibEntry]:
+    return [BibEntry('ARTICLE', f'k{i}', {'doi': doi}) for i, doi in enumerate(dois)]
+
+
+def test_one_filter_query_per_chunk(crossref):
+    chunk = entries([f'10.5555/t.{i}' for i in range(20)])
+    done, leftover = verify_batch(chunk, api_url=crossref.url)
+    assert leftover == []
+    assert len(crossref.requests) == 1
+    query = parse_qs(urlparse(crossref.paths()[0]).query)
+    assert query['filter'][0].split(',') == [f'doi:10.5555/t.{i}' for i in range(20)]
+    assert [entry.key for entry, _ in done] == [entry.key for entry in chunk]
+    for entry, result in done:
+        expected = verify_doi_crossref(entry.fields['doi'], api_url=crossref.url)
+        assert result == expected
+
+
+def test_missing_dois_fall_back_to_single_lookups(crossref):
+    crossref.works['10.5555/gone'] = None
+    chunk = entries(['10.5555/t.1', '10.5555/gone', 'not a doi', '10.5555/a,b'])
+    done, leftover = verify_batch(chunk, api_url=crossref.url)
+    assert {entry.key: result.error for entry, result in done} == {
+        'k0': None, 'k2': 'Invalid DOI format'}
+    # Only a single lookup can tell the filter miss apart from a real 404;
+    # a DOI with a comma cannot be put in the filter at all.
+    assert [entry.key for entry in leftover] == ['k3', 'k1']
+    assert verify_doi_crossref('10.5555/gone', api_url=crossref.url).status_code == 404
+
+
+def test_cached_dois_are_not_sent(tmp_path, crossref):
+    cache = DOICache(str(tmp_path))
+    verify_batch(entries(['10.5555/t.1', '10.5555/t.2']), api_url=crossref.url, cache=cache)
+    crossref.requests.clear()
+    done, _ = verify_batch(entries(['10.5555/t.1', '10.5555/t.2', '10.5555/t.3']),
+                           api_url=crossref.url, cache=cache)
+    assert len(done) == 3
+    assert parse_qs(urlparse(crossref.paths()[0]).query)['filter'] == ['doi:10.5555/t.3']
+
+
+def test_batch_mode_cuts_requests(tmp_path, crossref, run_cli):
+    with open(tmp_path / 'refs.bib', 'w') as f:
+        for i in range(60):
+            doi = f'10.5555/gone.{i}' if i < 3 else f'10.5555/t.{i}'
+            f.write(f'@article{{k{i}, title = {{Title for {doi}}}, doi = {{{doi}}}}}\n')
+    crossref.works.update({f'10.5555/gone.{i}': None for i in range(3)})
+    run_cli(tmp_path / 'refs.bib', '--api-url', crossref.url, '--delay', 0, '--no-cache',
+            '--no-isbn', '--no-suggestions', '--batch-size', 20)
+    # 3 filter queries, plus one single lookup per DOI they did not return.
+    assert len(crossref.requests) == 3 + 3
+    report = (tmp_path / 'doi_verification_report.txt').read_text()
+    assert 'DOIs not found (404): 3\n' in report
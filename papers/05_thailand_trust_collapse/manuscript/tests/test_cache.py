@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from doi_verification.cache import DOICache
+from doi_verification.verifier import verify_doi_crossref
+from stubs import crossref_work
+
+TTL = 0.3  # seconds, for the expiry tests
+
+
+def lookup(crossref, cache, doi='10.5555/t.1'):
+    return verify_doi_crossref(doi, api_url=crossref.url, cache=cache)
+
+
+def test_fresh_record_needs_no_request(tmp_path, crossref):
+    cache = DOICache(str(tmp_path), ttl_days=30)
+    first = lookup(crossref, cache)
+    second = lookup(crossref, cache)
+    assert len(crossref.requests) == 1
+    assert (second.crossref_title, second.crossref_year) == (first.crossref_title, '2020')
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_is_case_insensitive(tmp_path, crossref):
+    cache = DOICache(str(tmp_path))
+    lookup(crossref, cache, '10.5555/ABC.1')
+    assert lookup(crossref, cache, 'https://doi.org/10.5555/abc.1').resolves
+    assert len(crossref.requests) == 1
+
+
+def test_expired_record_is_revalidated_with_its_etag(tmp_path, crossref):
+    cache = DOICache(str(tmp_path), ttl_days=TTL / 86400)
+    lookup(crossref, cache)
+    time.sleep(TTL * 1.5)
+    result = lookup(crossref, cache)
+    _, path, headers = crossref.requests[-1]
+    assert len(crossref.requests) == 2
+    assert headers['If-None-Match'].startswith('"')
+    # The 304 reuses the cached body and restarts the record's TTL.
+    assert result.resolves and result.status_code == 200
+    assert result.crossref_title == 'Title for 10.5555/t.1'
+    assert cache.revalidated == 1
+    assert cache.is_fresh('10.5555/t.1')
+
+
+def test_changed_work_replaces_the_cached_body(tmp_path, crossref):
+    cache = DOICache(str(tmp_path), ttl_days=TTL / 86400)
+    lookup(crossref, cache)
+    crossref.works['10.5555/t.1'] = crossref_work('10.5555/t.1', 'Corrected title', 2021)
+    time.sleep(TTL * 1.5)
+    result = lookup(crossref, cache)
+    assert (result.crossref_title, result.crossref_year) == ('Corrected title', '2021')
+    assert cache.revalidated == 0
+    assert cache.work('10.5555/t.1')['title'] == ['Corrected title']
+
+
+def test_404_is_cached_as_negative(tmp_path, crossref):
+    crossref.works['10.5555/gone'] = None
+    cache = DOICache(str(tmp_path), ttl_days=TTL / 86400)
+    first = lookup(crossref, cache, '10.5555/gone')
+    second = lookup(crossref, cache, '10.5555/gone')
+    assert len(crossref.requests) == 1
+    for result in (first, second):
+        assert not result.resolves and result.status_code == 404
+        assert result.error == 'DOI not found (404)' and not result.retryable
+    assert cache.work('10.5555/gone') is None
+    # Negative answers expire like any other.
+    time.sleep(TTL * 1.5)
+    crossref.works.pop('10.5555/gone')
+    assert lookup(crossref, cache, '10.5555/gone').resolves
+    assert len(crossref.requests) == 2
+
+
+def test_transient_errors_are_not_cached(tmp_path, crossref):
+    crossref.fail_first['10.5555/t.1'] = 1
+    cache = DOICache(str(tmp_path))
+    assert lookup(crossref, cache).retryable
+    assert lookup(crossref, cache).resolves
+    assert len(crossref.requests) == 2
+
+
+@pytest.mark.parametrize('body', [b'<html><body>Please try again</body></html>',
+                                  b'{"status": "ok", "mess', b'[]', b'{"message": "busy"}'])
+def test_unreadable_answer_is_retried_not_cached(tmp_path, crossref, body):
+    crossref.bodies['10.5555/t.1'] = body
+    cache = DOICache(str(tmp_path))
+    result = lookup(crossref, cache)
+    assert not result.resolves and result.status_code == 200
+    assert result.error == 'Unreadable response' and result.retryable
+    assert cache.lookup('10.5555/t.1') == (None, False)
+    del crossref.bodies['10.5555/t.1']
+    assert lookup(crossref, cache).crossref_title == 'Title for 10.5555/t.1'
+    assert lookup(crossref, cache).resolves
+    assert len(crossref.requests) == 2
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from doi_verification.progress import load_progress
+from doi_verification.records import BibEntry
+from doi_verification.verifier import verify_doi_crossref, verify_entries_async
+from stubs import write_bib
+
+
+def library(n: int) -> list[BibEntry]:
+    # Every fifth DOI is one the tests make CrossRef answer with a 404.
+    return [BibEntry('ARTICLE', f'k{i}', {'doi': f'10.5555/{"t" if i % 5 else "gone"}.{i}'})
+            for i in range(n)]
+
+
+def verify_async(entries, url: str, **kwargs) -> dict:
+    results = {}
+    asyncio.run(verify_entries_async(
+        entries, lambda entry, result: results.__setitem__(entry.key, result),
+        api_url=url, **kwargs))
+    return results
+
+
+def test_async_results_match_sequential(crossref):
+    entries = library(40)
+    crossref.works.update({f'10.5555/gone.{i}': None for i in range(0, 40, 5)})
+    sequential = {e.key: verify_doi_crossref(e.fields['doi'], api_url=crossref.url)
+                  for e in entries}
+    concurrent = verify_async(entries, crossref.url, concurrency=8, rate=1000)
+    assert concurrent == sequential
+    assert sum(not r.resolves and r.status_code == 404 for r in concurrent.values()) == 8
+
+
+def test_requests_overlap_under_latency(crossref):
+    crossref.latency = 0.1
+    entries = library(16)
+    start = time.perf_counter()
+    verify_async(entries, crossref.url, concurrency=8, rate=1000)
+    # 16 lookups of 0.1 s each take 1.6 s one at a time.
+    assert time.perf_counter() - start < 0.8
+    assert len(crossref.requests) == 16
+
+
+def test_rate_cap_holds_with_many_in_flight(crossref):
+    entries = library(12)
+    verify_async(entries, crossref.url, concurrency=8, rate=20)
+    sent = sorted(t for t, _, _ in crossref.requests)
+    # 12 requests at <= 20 req/s need at least 11 gaps of 50 ms.
+    assert sent[-1] - sent[0] >= 11 * 0.05 * 0.9
+
+
+def test_concurrent_run_is_resumable(tmp_path, crossref, run_cli):
+    bib = tmp_path / 'refs.bib'
+    write_bib(bib, [{'key': f'k{i}', 'title': f'Title for 10.5555/t.{i}', 'year': 2020,
+                     'doi': f'10.5555/t.{i}'} for i in range(20)])
+    common = (bib, '--api-url', crossref.url, '--delay', 0, '--no-cache', '--no-isbn',
+              '--no-suggestions')
+    run_cli(*common, '--concurrency', 4)
+    progress = load_progress(str(tmp_path / 'doi_verification_progress.json'))
+    assert sorted(progress) == sorted(f'k{i}' for i in range(20))
+    assert all(r.resolves for r in progress.values())
+    crossref.requests.clear()
+    out = run_cli(*common, '--concurrency', 4, '--resume')
+    assert crossref.requests == []
+    assert '20 unchanged' in out
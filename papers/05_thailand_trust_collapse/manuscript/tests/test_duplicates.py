@@ -0,0 +1,34 @@
+from doi_verification.bench_duplicates import (brute_force_pairs, clustered_pairs,
+                                               synthetic_library)
+from doi_verification.duplicates import find_duplicates
+from doi_verification.records import BibEntry
+
+
+def entry(key: str, title: str, author: str = 'Smith, J.', **fields) -> BibEntry:
+    return BibEntry('ARTICLE', key, {'title': title, 'author': author, **fields})
+
+
+def test_injected_duplicates_are_clustered():
+    entries, injected = synthetic_library(1500, seed=5, dup_share=0.05)
+    pairs = clustered_pairs(find_duplicates(entries))
+    assert pairs == {tuple(sorted((a, b))) for a, b, _ in injected}
+
+
+def test_blocking_finds_what_brute_force_finds():
+    entries, _ = synthetic_library(400, seed=8, dup_share=0.1)
+    assert clustered_pairs(find_duplicates(entries), 'title') == brute_force_pairs(entries)
+
+
+def test_shared_doi_cluster():
+    clusters = find_duplicates([entry('a', 'One title', doi='10.1/X'),
+                                entry('b', 'Another title', doi='https://doi.org/10.1/x')])
+    assert [(c['reason'], c['doi'], [e.key for e in c['entries']]) for c in clusters] == [
+        ('doi', '10.1/x', ['a', 'b'])]
+
+
+def test_numbers_and_first_authors_keep_works_apart():
+    title = 'Asian Barometer Survey of Democracy and Trust, Wave 3'
+    assert find_duplicates([entry('w3', title), entry('w4', title.replace('3', '4'))]) == []
+    assert find_duplicates([entry('a', title), entry('b', title, 'Doe, A.')]) == []
+    [cluster] = find_duplicates([entry('a', title), entry('b', title.lower() + ': a preprint')])
+    assert cluster['reason'] == 'title' and [e.key for e in cluster['entries']] == ['a', 'b']
@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from doi_verification.cache import DOICache
+from doi_verification.isbn import (GoogleBooks, OpenLibrary, book_record, isbn_progress_key,
+                                   lookup_book, normalize_isbn, verify_isbns_async)
+from doi_verification.progress import load_progress
+from doi_verification.ratelimit import RetryPolicy
+from doi_verification.records import BibEntry
+from stubs import write_bib
+
+ISBNS = ['9780306406157', '9783161484100', '9780804429573', '9780198526636']
+
+
+def sources(url: str, rate: float = 1000) -> list:
+    return [OpenLibrary(url, rate), GoogleBooks(url, rate)]
+
+
+def verify(isbns, url: str, **kwargs) -> dict:
+    results = {}
+    entries = [BibEntry('BOOK', f'k{i}', {'isbn': isbn}) for i, isbn in enumerate(isbns)]
+    kwargs.setdefault('sources', sources(url))
+    asyncio.run(verify_isbns_async(
+        entries, lambda entry, result: results.setdefault(entry.key, []).append(result),
+        **kwargs))
+    return results
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('978-0-306-40615-7', ('9780306406157', None)),
+    ('0-306-40615-2', ('9780306406157', None)),
+    ('ISBN-10: 0-8044-2957-X', ('9780804429573', None)),
+    ('978 3 16 148410 0', ('9783161484100', None)),
+    ('0-306-40615-3 and 978-3-16-148410-0', ('9783161484100', None)),
+    ('978-0-306-40615-8', (None, 'Invalid ISBN checksum')),
+    ('0-306-40615-3', (None, 'Invalid ISBN checksum')),
+    ('n/a', (None, 'Invalid ISBN format')),
+])
+def test_normalize_isbn(value, expected):
+    assert normalize_isbn(value) == expected
+
+
+def test_book_record():
+    assert book_record('Trust', 'A Survey', 'March 2004', ['10.1/x']) == {
+        'title': 'Trust: A Survey', 'year': '2004', 'doi': '10.1/x'}
+    assert book_record('', None, 'n.d.') == {'title': None, 'year': None, 'doi': None}
+
+
+def test_invalid_isbns_cost_no_requests(books):
+    results = verify(['978-0-306-40615-8', 'n/a'], books.url)
+    assert books.requests == []
+    assert [r[0].error for r in results.values()] == ['Invalid ISBN checksum',
+                                                      'Invalid ISBN format']
+
+
+def test_answers_of_both_sources_are_merged(books):
+    books.books['openlibrary'][ISBNS[0]] = {
+        'title': 'Trust', 'subtitle': 'A Survey', 'publish_date': 'March 2004',
+        'identifiers': {'doi': ['10.1/trust']}}
+    books.books['googlebooks'][ISBNS[0]] = {'title': 'Trust (2nd ed.)', 'publishedDate': '2005'}
+    books.books['googlebooks'][ISBNS[1]] = {'title': 'Institutions', 'publishedDate': '1999-05'}
+    results = verify(ISBNS[:3], books.url)
+    first, second, third = (results[f'k{i}'][0] for i in range(3))
+    assert first.found == {'openlibrary': True, 'googlebooks': True}
+    assert (first.title, first.year, first.doi) == ('Trust: A Survey', '2004', '10.1/trust')
+    assert second.found == {'openlibrary': False, 'googlebooks': True}
+    assert (second.title, second.year, second.doi) == ('Institutions', '1999', None)
+    assert third.found == {'openlibrary': False, 'googlebooks': False}
+    assert not third.error and not third.retryable
+
+
+def test_sources_are_queried_at_once(books):
+    books.latency = 0.2
+    start = time.perf_counter()
+    verify(ISBNS[:1], books.url)
+    # One source after the other would take 0.44 s.
+    assert time.perf_counter() - start < 0.35
+    assert books.max_inflight == {'openlibrary': 1, 'googlebooks': 1}
+
+
+def test_each_source_has_its_own_limiter(books):
+    slow = [OpenLibrary(books.url, rate=2, max_rate=2), GoogleBooks(books.url, rate=1000)]
+    verify(ISBNS, books.url, sources=slow, concurrency=4)
+    sent = {'openlibrary': [], 'googlebooks': []}
+    for t, path, _ in books.requests:
+        sent['openlibrary' if '/api/books' in path else 'googlebooks'].append(t)
+    # The slow source paces only its own requests.
+    assert max(sent['googlebooks']) - min(sent['googlebooks']) < 0.3
+    assert max(sent['openlibrary']) - min(sent['openlibrary']) >= 3 * 0.5 * 0.9
+    assert books.max_inflight['googlebooks'] > 1
+
+
+def test_failed_source_is_retried(books):
+    books.books['openlibrary'][ISBNS[0]] = {'title': 'Trust'}
+    books.fail_first[('googlebooks', ISBNS[0])] = 1
+    results = verify(ISBNS[:1], books.url,
+                     retry=RetryPolicy(max_attempts=2, base=0.01, rng=random.Random(0)))
+    first, second = results['k0']
+    assert first.found == {'openlibrary': True, 'googlebooks': None}
+    assert first.retryable and first.error == 'Google Books: HTTP 503'
+    assert second.found == {'openlibrary': True, 'googlebooks': False}
+    assert not second.retryable and second.title == 'Trust'
+
+
+def test_unreadable_answer_is_not_retried(books):
+    books.books['openlibrary'][ISBNS[0]] = {'title': 'Trust'}
+    books.books['googlebooks'][ISBNS[0]] = b'<html><body>Unusual traffic</body></html>'
+    assert lookup_book(GoogleBooks(books.url), ISBNS[0]) == (200, None, 'Unreadable response')
+    [result] = verify(ISBNS[:1], books.url, retry=RetryPolicy(max_attempts=3, base=0.01))['k0']
+    assert result.found == {'openlibrary': True, 'googlebooks': None}
+    assert result.error == 'Google Books: Unreadable response' and not result.retryable
+    assert result.title == 'Trust'
+
+
+def test_answers_are_cached(books, tmp_path):
+    books.books['googlebooks'][ISBNS[0]] = {'title': 'Trust', 'publishedDate': '2004'}
+    cache = DOICache(str(tmp_path))
+    first = verify(ISBNS[:2], books.url, cache=cache)
+    assert len(books.requests) == 4
+    second = verify(ISBNS[:2], books.url, cache=cache)
+    assert len(books.requests) == 4
+    assert second == first
+
+
+def test_cli_records_isbn_results(tmp_path, crossref, books, run_cli):
+    books.books['openlibrary'][ISBNS[0]] = {'title': 'Trust', 'publish_date': '2004'}
+    bib = tmp_path / 'refs.bib'
+    write_bib(bib, [{'type': 'book', 'key': 'b0', 'title': 'Trust', 'isbn': '0-306-40615-2'},
+                    {'type': 'book', 'key': 'b1', 'title': 'Bad', 'isbn': '0-306-40615-3'},
+                    {'key': 'a0', 'title': 'Title for 10.5555/t.0', 'doi': '10.5555/t.0'}])
+    common = (bib, '--api-url', crossref.url, '--openlibrary-url', books.url,
+              '--google-books-url', books.url, '--isbn-rate', 100, '--delay', 0,
+              '--no-cache', '--no-suggestions')
+    run_cli(*common)
+    progress = load_progress(str(tmp_path / 'doi_verification_progress.json'))
+    assert progress['a0'].resolves
+    assert progress[isbn_progress_key('b0')].found == {'openlibrary': True, 'googlebooks': False}
+    assert progress[isbn_progress_key('b0')].isbn == ISBNS[0]
+    assert progress[isbn_progress_key('b1')].error == 'Invalid ISBN checksum'
+    assert len(books.requests) == 2
+    books.requests.clear()
+    run_cli(*common, '--resume')
+    assert books.requests == []
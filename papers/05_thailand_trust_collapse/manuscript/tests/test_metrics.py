@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from doi_verification.cache import DOICache
+from doi_verification.metrics import RequestMetrics, percentile
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(i) for i in range(1, 11)]
+    assert percentile([], 50) is None
+    assert percentile([7.0], 99) == 7.0
+    assert [percentile(values, q) for q in (0, 10, 11, 50, 95, 100)] == [1, 1, 2, 5, 10, 10]
+
+
+def test_write_reports_percentiles_rates_and_histogram(tmp_path):
+    metrics = RequestMetrics()
+    # 99 requests taking 0.01s .. 0.99s, every 20th one throttled, plus one
+    # retry that timed out after 30.5s: 100 in all.
+    for i in range(1, 100):
+        metrics.record_request(i / 100, 429 if i % 20 == 0 else 200, 1000, 0, 0.0)
+    metrics.record_request(30.5, None, 0, 1, 0.0)
+
+    cache = DOICache(str(tmp_path / 'cache'))
+    cache.put('10.5555/t.1', 200, {'DOI': '10.5555/t.1'})
+    for doi in ('10.5555/t.1', '10.5555/t.1', '10.5555/t.1', '10.5555/t.2'):
+        cache.lookup(doi)
+
+    json_path, prom_path, data = metrics.write(str(tmp_path), cache)
+    with open(json_path) as f:
+        assert json.load(f) == json.loads(json.dumps(data))
+    latency = data['latency_seconds']
+    assert (latency['p50'], latency['p95'], latency['p99'], latency['max']) == \
+        (0.5, 0.95, 0.99, 30.5)
+    assert data['requests'] == 100
+    assert data['status_counts'] == {'200': 95, '429': 4, 'error': 1}
+    assert data['rate_429'] == 0.04
+    assert data['throttle_retries'] == 1
+    assert data['cache'] == {'hits': 3, 'misses': 1, 'revalidated': 0, 'hit_rate': 0.75}
+
+    with open(prom_path) as f:
+        samples = dict(line.rsplit(' ', 1) for line in f.read().splitlines()
+                       if not line.startswith('#'))
+    name = 'doi_verify_request_duration_seconds'
+    buckets = [float(v) for k, v in samples.items() if k.startswith(name + '_bucket')]
+    # Cumulative: never decreasing, and the slowest request only lands in +Inf.
+    assert buckets == sorted(buckets)
+    assert buckets[:3] == [5, 10, 25]
+    assert buckets[-2:] == [99, 100]
+    assert samples[name + '_bucket{le="+Inf"}'] == samples[name + '_count'] == '100'
+    assert float(samples[name + '_sum']) == pytest.approx(sum(range(1, 100)) / 100 + 30.5)
+    assert samples['doi_verify_request_duration_quantile_seconds{quantile="0.95"}'] == '0.95'
+    assert samples['doi_verify_requests_total{status="429"}'] == '4'
+    assert samples['doi_verify_throttled_ratio'] == '0.04'
+    assert samples['doi_verify_cache_hit_ratio'] == '0.75'
+    assert not (tmp_path / 'doi_verification_metrics.prom.tmp').exists()
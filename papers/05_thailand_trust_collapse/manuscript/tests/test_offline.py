@@ -0,0 +1,120 @@
+import gzip
+import json
+import random
+
+import pytest
+
+from doi_verification.offline import OfflineIndex, dump_signature, iter_dump_works
+from doi_verification.progress import load_progress
+from doi_verification.verifier import verify_doi_crossref
+from stubs import write_bib
+
+# The fields a lookup fills in; ``verified_at`` and ``retryable`` only
+# concern fetched answers.
+FIELDS = ('original_doi', 'cleaned_doi', 'format_valid', 'resolves', 'status_code',
+          'crossref_title', 'crossref_year', 'crossref_type', 'error', 'online_first')
+
+
+def synthetic_works(n: int, seed: int = 0) -> list[dict]:
+    """Works with the variations ``apply_crossref_work`` has to handle."""
+    rng = random.Random(seed)
+    works = []
+    for i in range(n):
+        work = {'DOI': f'10.{rng.randint(1000, 9999)}/Case.{i}',
+                'type': rng.choice(['journal-article', 'book', 'book-chapter', 'posted-content'])}
+        if rng.random() < 0.9:
+            work['title'] = [rng.choice(['Trust in <i>Thailand</i>', 'Démocratie et confiance',
+                                         'Survey of Asian Institutions']) + f' {i}']
+        dates = ['issued', 'published-online', 'published-print']
+        for key in rng.sample(dates, rng.randint(0, 3)):
+            work[key] = {'date-parts': [[rng.randint(1990, 2025), rng.randint(1, 12)]]}
+        if rng.random() < 0.05:
+            work['issued'] = {'date-parts': [[None]]}
+        works.append(work)
+    return works
+
+
+def write_dump(directory, works: list[dict]):
+    """Half the works as a ``{"items": [...]}`` data file, half as JSON lines."""
+    directory.mkdir()
+    half = len(works) // 2
+    with gzip.open(directory / '0.json.gz', 'wt', encoding='utf-8') as f:
+        json.dump({'items': works[:half]}, f, ensure_ascii=False)
+    with gzip.open(directory / '1.jsonl.gz', 'wt', encoding='utf-8') as f:
+        f.writelines(json.dumps(work) + '\n' for work in works[half:])
+
+
+@pytest.fixture
+def dump(tmp_path):
+    works = synthetic_works(300)
+    write_dump(tmp_path / 'dump', works)
+    return tmp_path / 'dump', works
+
+
+def fields(result) -> tuple:
+    return tuple(getattr(result, name) for name in FIELDS)
+
+
+def test_dump_is_streamed_in_full(dump):
+    source, works = dump
+    assert list(iter_dump_works(str(source))) == works
+
+
+def test_small_chunks_decode_the_same(dump, monkeypatch):
+    import doi_verification.offline as offline
+
+    source, works = dump
+    stream = offline._iter_json_items
+    monkeypatch.setattr(offline, '_iter_json_items', lambda f: stream(f, chunk_size=7))
+    assert list(iter_dump_works(str(source))) == works
+
+
+def test_lookups_match_online_mode(dump, tmp_path, crossref):
+    source, works = dump
+    crossref.works.update({work['DOI']: work for work in works})
+    index = OfflineIndex.open(str(source), str(tmp_path / 'cache'))
+    assert index.count == len(works)
+    # Case-folded and prefixed DOIs, one the dump lacks, and a malformed one.
+    dois = [work['DOI'] for work in works] + [
+        works[0]['DOI'].upper(), f"https://doi.org/{works[1]['DOI']}", '10.9999/missing', 'x']
+    # CrossRef DOIs are case-insensitive; the stub's keys are not.
+    crossref.works[dois[-4]] = works[0]
+    crossref.works['10.9999/missing'] = None
+    for doi in dois:
+        online = verify_doi_crossref(doi, api_url=crossref.url)
+        assert fields(verify_doi_crossref(doi, offline=index)) == fields(online), doi
+    index.close()
+
+
+def test_index_is_reused_until_the_dump_changes(dump, tmp_path, capsys):
+    source, works = dump
+    cache_dir = str(tmp_path / 'cache')
+    OfflineIndex.open(str(source), cache_dir).close()
+    assert 'Building offline index' in capsys.readouterr().out
+    index = OfflineIndex.open(str(source), cache_dir)
+    assert 'Building' not in capsys.readouterr().out
+    index.close()
+    signature = dump_signature(str(source))
+    with gzip.open(source / '2.jsonl.gz', 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'DOI': '10.1/new', 'title': ['New'], 'type': 'book'}) + '\n')
+    assert dump_signature(str(source)) != signature
+    index = OfflineIndex.open(str(source), cache_dir)
+    assert 'Building' in capsys.readouterr().out
+    assert index.count == len(works) + 1 and index.lookup('10.1/NEW')
+    index.close()
+
+
+def test_offline_run_makes_no_requests(dump, tmp_path, crossref, run_cli):
+    source, works = dump
+    crossref.works.update({work['DOI']: work for work in works})
+    bib = tmp_path / 'refs.bib'
+    write_bib(bib, [{'key': f'k{i}', 'title': (work.get('title') or ['Untitled'])[0],
+                     'doi': work['DOI']} for i, work in enumerate(works[:20])])
+    run_cli(bib, '--offline', source, '--api-url', crossref.url,
+            '--cache-dir', tmp_path / 'cache', '--no-suggestions')
+    assert crossref.requests == []
+    progress = load_progress(str(tmp_path / 'doi_verification_progress.json'))
+    assert sorted(progress) == sorted(f'k{i}' for i in range(20))
+    for i, work in enumerate(works[:20]):
+        online = verify_doi_crossref(work['DOI'], api_url=crossref.url)
+        assert fields(progress[f'k{i}'])[1:] == fields(online)[1:]
@@ -0,0 +1,76 @@
+from doi_verification.bench_parser import legacy_parse_bib_entries, synthetic_bib
+from doi_verification.parser import (IncrementalBibParser, iter_bib_file, parse_bib_entries,
+                                     parse_bib_string, read_bib_entry)
+
+
+def entry_dicts(entries):
+    return [{'type': e.type, 'key': e.key, 'fields': e.fields} for e in entries]
+
+
+def test_matches_regex_baseline(tmp_path):
+    # The regex parser only saw one level of nested braces, so it dropped the
+    # abstracts; every field it did extract must come back identical.
+    path = tmp_path / 'library.bib'
+    path.write_text(synthetic_bib(1209, seed=7), encoding='utf-8')
+    expected = legacy_parse_bib_entries(str(path))
+    entries = parse_bib_entries(str(path))
+    assert len(expected) == len(entries) == 1209
+    for old, new in zip(expected, entries):
+        assert (new.type, new.key) == (old['type'], old['key'])
+        assert {name: new.fields[name] for name in old['fields']} == old['fields']
+        assert new.fields['abstract'].startswith('Long abstract text with nested braces')
+
+
+def test_parallel_parse_matches_serial(tmp_path):
+    path = tmp_path / 'library.bib'
+    path.write_text(synthetic_bib(500, seed=3), encoding='utf-8')
+    assert (entry_dicts(parse_bib_entries(str(path), jobs=3))
+            == entry_dicts(parse_bib_entries(str(path))))
+
+
+def test_nested_braces_and_whitespace():
+    [entry] = parse_bib_string(
+        '@article{k1,\n  title = {The {{COVID-19}} Crisis in\n   {Thailand}},\n  year = 2021\n}')
+    assert entry.type == 'ARTICLE'
+    assert entry.fields == {'title': 'The COVID-19 Crisis in Thailand', 'year': '2021'}
+
+
+def test_quotes_macros_and_concatenation():
+    entries = parse_bib_string(
+        '@string{jd = "Journal of Democracy"}\n'
+        '@comment{@article{ignored, title = {No}}}\n'
+        '@preamble{"\\newcommand{\\x}{y}"}\n'
+        '@article{k1,\n'
+        '  title = "Quoted {Title}, with comma",\n'
+        '  journal = jd,\n'
+        '  note = jd # " special issue",\n'
+        '  month = mar\n'
+        '}')
+    assert [e.key for e in entries] == ['k1']
+    assert entries[0].fields == {'title': 'Quoted Title, with comma',
+                                 'journal': 'Journal of Democracy',
+                                 'note': 'Journal of Democracy special issue',
+                                 'month': 'March'}
+
+
+def test_malformed_entry_is_skipped():
+    entries = parse_bib_string('@article{bad, title = {unclosed\n'
+                               '@article{good, title = {Fine}}\n')
+    assert [e.key for e in entries] == ['good']
+
+
+def test_offsets_read_back_the_entry(tmp_path):
+    path = tmp_path / 'library.bib'
+    path.write_text(synthetic_bib(50, seed=1), encoding='utf-8')
+    for entry in iter_bib_file(str(path)):
+        assert read_bib_entry(str(path), entry.offset) == entry
+
+
+def test_incremental_parser_sees_edits(tmp_path):
+    path = tmp_path / 'library.bib'
+    path.write_text(synthetic_bib(200, seed=2), encoding='utf-8')
+    bib_parser = IncrementalBibParser()
+    assert entry_dicts(bib_parser.parse(str(path))) == entry_dicts(parse_bib_entries(str(path)))
+    text = path.read_text(encoding='utf-8')
+    path.write_text(text.replace('Key5-', 'Renamed5-', 1), encoding='utf-8')
+    assert entry_dicts(bib_parser.parse(str(path))) == entry_dicts(parse_bib_entries(str(path)))
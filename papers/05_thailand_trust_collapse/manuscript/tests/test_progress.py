@@ -0,0 +1,136 @@
+import json
+
+from doi_verification.isbn import isbn_progress_key
+from doi_verification.progress import (ProgressJournal, entry_fingerprint, journal_path_for,
+                                       load_progress, plan_resume)
+from doi_verification.records import BibEntry, ISBNResult, VerificationResult
+
+
+def entry(key: str, doi: str = None, **fields) -> BibEntry:
+    return BibEntry('ARTICLE', key, {'doi': doi or f'10.1/{key}', 'title': f'Title {key}',
+                                     'date': '2020', **fields})
+
+
+def saved(entry_: BibEntry, fingerprint: bool = True, **fields) -> VerificationResult:
+    doi = entry_.fields['doi']
+    fields = {'resolves': True, 'status_code': 200, **fields}
+    return VerificationResult(doi, doi, **fields,
+                              fingerprint=entry_fingerprint(entry_) if fingerprint else None)
+
+
+def saved_isbn(entry_: BibEntry) -> ISBNResult:
+    return ISBNResult(entry_.fields['isbn'], '9780306406157',
+                      found={'openlibrary': True}, fingerprint=entry_fingerprint(entry_))
+
+
+def keys(entries: list[BibEntry]) -> list[str]:
+    return [e.key for e in entries]
+
+
+def test_counts_every_kind_of_entry():
+    same, doi, title, year, retry, legacy = (entry(k) for k in
+                                             ('same', 'doi', 'title', 'year', 'retry', 'legacy'))
+    progress = {e.key: saved(e) for e in (same, doi, title, year)}
+    progress['retry'] = saved(retry, resolves=False, status_code=503, retryable=True)
+    progress['legacy'] = saved(legacy, fingerprint=False)
+    progress['gone'] = saved(entry('gone'))
+    current = [same, entry('doi', doi='10.1/other'), entry('title', title='Retitled'),
+               entry('year', date='2021'), retry, legacy, entry('new')]
+    to_check, counts = plan_resume(current, progress)
+    assert keys(to_check) == ['doi', 'title', 'year', 'retry', 'new']
+    assert counts == {'new': 1, 'changed': 3, 'retry': 1, 'unchanged': 2, 'removed': 1}
+    assert 'gone' not in progress
+    # The legacy record is kept and stamped instead of being checked again.
+    assert progress['legacy'].fingerprint == entry_fingerprint(legacy)
+    assert plan_resume(current[:1] + current[5:6], progress)[1]['unchanged'] == 2
+
+
+def test_legacy_record_with_another_doi_is_checked():
+    old = entry('k')
+    progress = {'k': saved(old, fingerprint=False)}
+    to_check, counts = plan_resume([entry('k', doi='10.1/moved')], progress)
+    assert keys(to_check) == ['k'] and counts['changed'] == 1
+
+
+def test_isbn_and_doi_stages_leave_each_other_alone():
+    book = entry('book', isbn='0-306-40615-2')
+    progress = {'book': saved(book), isbn_progress_key('book'): saved_isbn(book),
+                isbn_progress_key('gone'): saved_isbn(entry('gone', isbn='0-306-40615-2'))}
+    to_check, counts = plan_resume([book], progress, field='isbn')
+    assert to_check == [] and counts['unchanged'] == 1 and counts['removed'] == 1
+    assert sorted(progress) == ['book', isbn_progress_key('book')]
+    # A DOI-stage run over a library without the book's DOI keeps its ISBN result.
+    to_check, counts = plan_resume([entry('other')], progress)
+    assert keys(to_check) == ['other'] and counts['removed'] == 1
+    assert sorted(progress) == [isbn_progress_key('book')]
+    book.fields['isbn'] = '978-3-16-148410-0'
+    assert keys(plan_resume([book], progress, field='isbn')[0]) == ['book']
+
+
+def test_without_pruning_only_the_given_entries_are_planned():
+    a, b = entry('a'), entry('b')
+    progress = {'a': saved(a), 'b': saved(b)}
+    to_check, counts = plan_resume([entry('a', title='Changed')], progress, prune=False)
+    assert keys(to_check) == ['a'] and counts['removed'] == 0
+    assert sorted(progress) == ['a', 'b']
+
+
+def as_dicts(progress: dict) -> dict:
+    return {key: result.to_dict() for key, result in progress.items()}
+
+
+def record_all(journal: ProgressJournal, n: int, start: int = 0):
+    for i in range(start, start + n):
+        journal.record(f'k{i}', saved(entry(f'k{i}'), verified_at=1_700_000_000 + i))
+
+
+def test_torn_journal_line_loses_only_the_last_record(tmp_path):
+    path = str(tmp_path / 'progress.json')
+    journal = ProgressJournal(path, {}, compact_every=0)
+    record_all(journal, 10)
+    # Crash while writing the tenth line: keep only part of it.
+    with open(journal_path_for(path), 'rb') as f:
+        data = f.read()
+    last = data.rstrip(b'\n').rfind(b'\n') + 1
+    with open(journal_path_for(path), 'wb') as f:
+        f.write(data[:last + (len(data) - last) // 2])
+    progress = load_progress(path)
+    assert sorted(progress) == sorted(f'k{i}' for i in range(9))
+    assert as_dicts(progress) == {key: value for key, value in as_dicts(journal.progress).items()
+                                  if key != 'k9'}
+
+
+def test_snapshot_plus_journal_replays_to_the_same_progress(tmp_path):
+    path = str(tmp_path / 'progress.json')
+    first = {'old': saved(entry('old')), 'k1': saved(entry('k1'), resolves=False,
+                                                     status_code=503, retryable=True)}
+    journal = ProgressJournal(path, first, compact_every=0)
+    record_all(journal, 5)
+    # No close(): the snapshot is the opening one and everything else is journal.
+    with open(path) as f:
+        assert sorted(json.load(f)) == ['k1', 'old']
+    assert as_dicts(load_progress(path)) == as_dicts(journal.progress)
+    assert load_progress(path)['k1'].attempts == 2
+    journal.close()
+    assert as_dicts(load_progress(path)) == as_dicts(journal.progress)
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    path = str(tmp_path / 'progress.json')
+    journal = ProgressJournal(path, {}, compact_every=3)
+
+    def journal_lines() -> int:
+        with open(journal_path_for(path)) as f:
+            return len(f.readlines())
+
+    record_all(journal, 2)
+    assert journal_lines() == 2
+    record_all(journal, 1, start=2)
+    assert journal_lines() == 0
+    with open(path) as f:
+        assert sorted(json.load(f)) == ['k0', 'k1', 'k2']
+    record_all(journal, 1, start=3)
+    assert journal_lines() == 1
+    journal.close()
+    assert journal_lines() == 0
+    assert sorted(load_progress(path)) == ['k0', 'k1', 'k2', 'k3']
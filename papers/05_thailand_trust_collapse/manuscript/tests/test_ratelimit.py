@@ -0,0 +1,150 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from doi_verification.ratelimit import (RateController, RetryPolicy, parse_rate_limit,
+                                        parse_retry_after)
+from doi_verification.records import BibEntry
+from doi_verification.verifier import verify_doi_crossref, verify_entries_async
+
+
+class Response:
+    def __init__(self, status_code: int = 200, **headers):
+        self.status_code = status_code
+        self.headers = {name.replace('_', '-'): value for name, value in headers.items()}
+
+
+def verify_async(dois, url: str, **kwargs) -> dict:
+    results = {}
+    entries = [BibEntry('ARTICLE', doi, {'doi': doi}) for doi in dois]
+    asyncio.run(verify_entries_async(
+        entries, lambda entry, result: results.setdefault(entry.key, []).append(result),
+        api_url=url, **kwargs))
+    return results
+
+
+@pytest.mark.parametrize('limit, interval, expected', [
+    ('50', '1s', 50.0), ('100', '2s', 50.0), ('60', '1m', 1.0), ('5', '500ms', 10.0),
+    ('50', None, 50.0), (None, '1s', None), ('0', '1s', None), ('x', '1s', None),
+])
+def test_parse_rate_limit(limit, interval, expected):
+    headers = {name: value for name, value in (('X-Rate-Limit-Limit', limit),
+                                               ('X-Rate-Limit-Interval', interval)) if value}
+    assert parse_rate_limit(headers) == expected
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2') == 2.0
+    assert parse_retry_after('0.5') == 0.5
+    assert parse_retry_after('-3') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28 < parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+
+
+def test_aimd_halves_once_per_burst_and_recovers():
+    limiter = RateController(10, increase=1.0)
+    sent = limiter.wait()
+    assert limiter.observe(Response(429, Retry_After='0'), sent)
+    assert limiter.rate == 5
+    # The rest of the burst was sent before the cut; it must not cut again.
+    assert limiter.observe(Response(429, Retry_After='0'), sent)
+    assert limiter.rate == 5 and limiter.throttled == 2
+    for _ in range(30):
+        assert not limiter.observe(Response(200), sent)
+    # +1/rate per response is about +1 req/s per second of traffic:
+    # rate**2 grows by 2 per response, from 25 to 85.
+    assert 9 < limiter.rate < 9.5
+
+
+def test_rate_never_drops_below_the_floor():
+    limiter = RateController(1, min_rate=0.25)
+    for _ in range(5):
+        limiter.observe(Response(429, Retry_After='0'), time.monotonic() + 1)
+    assert limiter.rate == 0.25
+
+
+def test_advertised_limit_caps_the_rate():
+    limiter = RateController(100, max_rate=200)
+    limiter.observe(Response(200, X_Rate_Limit_Limit='10', X_Rate_Limit_Interval='1s'), 0)
+    assert limiter.advertised == 10 and limiter.ceiling == 10 and limiter.rate == 10
+    limiter.observe(Response(200), 0)
+    assert limiter.rate == 10
+
+
+def test_retry_after_holds_every_caller_back():
+    limiter = RateController(1000)
+    limiter.observe(Response(429, Retry_After='0.3'), limiter.wait())
+    start = time.monotonic()
+    limiter.wait()
+    assert time.monotonic() - start >= 0.28
+
+
+def test_429_is_retried_after_retry_after(crossref):
+    crossref.limit = 2
+    crossref.advertise = False
+    limiter = RateController(50)
+    start = time.monotonic()
+    results = [verify_doi_crossref(f'10.5555/t.{i}', api_url=crossref.url, limiter=limiter)
+               for i in range(5)]
+    assert all(r.resolves and not r.error for r in results)
+    assert crossref.throttled == limiter.throttled == 2
+    sent = sorted(t for t, _, _ in crossref.requests)
+    gaps = sorted(b - a for a, b in zip(sent, sent[1:]))
+    # Each 429 came with ``Retry-After: 1``; nothing was sent before it passed.
+    assert gaps[-2] >= 0.95 and time.monotonic() - start >= 1.9
+    assert len(sent) == 7
+
+
+def test_429_without_limiter_is_a_retryable_error(crossref):
+    crossref.limit = 1
+    verify_doi_crossref('10.5555/t.0', api_url=crossref.url)
+    result = verify_doi_crossref('10.5555/t.1', api_url=crossref.url)
+    assert not result.resolves and result.status_code == 429
+    assert result.retryable and 'Rate limited' in result.error
+
+
+def test_concurrent_run_backs_off_to_the_server_limit(crossref):
+    crossref.limit = 5
+    crossref.retry_after = '0.5'
+    crossref.advertise = False
+    limiter = RateController(40)
+    results = verify_async([f'10.5555/t.{i}' for i in range(12)], crossref.url,
+                           concurrency=8, limiter=limiter)
+    assert all(len(tries) == 1 and tries[0].resolves for tries in results.values())
+    assert crossref.throttled >= 1 and limiter.throttled == crossref.throttled
+    assert limiter.rate < 40 and limiter.advertised is None
+
+
+def test_concurrent_run_adopts_the_advertised_limit(crossref):
+    crossref.limit = 20
+    limiter = RateController(100)
+    results = verify_async([f'10.5555/t.{i}' for i in range(15)], crossref.url,
+                           concurrency=4, limiter=limiter)
+    assert all(tries[-1].resolves for tries in results.values())
+    assert limiter.advertised == 20 and limiter.rate <= 20
+
+
+def test_transient_failures_are_retried(crossref):
+    crossref.fail_first = {'10.5555/t.0': 2, '10.5555/t.1': 5}
+    retry = RetryPolicy(max_attempts=3, base=0.05, rng=random.Random(1))
+    results = verify_async(['10.5555/t.0', '10.5555/t.1', '10.5555/t.2'], crossref.url,
+                           concurrency=2, rate=1000, retry=retry)
+    assert [r.status_code for r in results['10.5555/t.0']] == [503, 503, 200]
+    assert results['10.5555/t.0'][-1].resolves
+    assert [r.status_code for r in results['10.5555/t.1']] == [503, 503, 503]
+    assert results['10.5555/t.1'][-1].retryable
+    assert len(results['10.5555/t.2']) == 1
+
+
+def test_retry_delay_is_jittered_and_capped():
+    retry = RetryPolicy(base=2.0, cap=5.0, rng=random.Random(3))
+    delays = [retry.delay(tries) for tries in (1, 2, 3, 4, 5) for _ in range(50)]
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert max(retry.delay(1) for _ in range(50)) <= 2.0
+    assert len(set(delays)) == len(delays)
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import re
+
+import pytest
+
+from doi_verification.isbn import isbn_progress_key
+from doi_verification.records import BibEntry, ISBNResult, VerificationResult
+from doi_verification.report import (CSV_COLUMNS, REPORT_WRITERS, generate_report,
+                                     iter_report_rows, print_report_paths)
+from doi_verification.store import REPORT_COLUMN_NAMES, ResultStore
+
+# The CSV written by earlier runs, which downstream scripts read by header.
+EXISTING_CSV = os.path.join(os.path.dirname(__file__), *['..'] * 4, 'doi-check',
+                            'doi_verification_results.csv')
+
+
+def library() -> tuple[list[BibEntry], dict]:
+    entries = [
+        BibEntry('ARTICLE', 'valid', {'title': 'Trust in parliaments', 'date': '2020',
+                                      'doi': '10.1/valid'}),
+        BibEntry('ARTICLE', 'moved', {'title': 'Protest cycles in Bangkok', 'date': '2020',
+                                      'doi': '10.1/moved'}),
+        BibEntry('ARTICLE', 'missing', {'title': 'Military courts', 'date': '2019',
+                                        'doi': '10.1/missing'}),
+        BibEntry('ARTICLE', 'typo', {'title': 'Electoral reform', 'doi': 'not-a-doi'}),
+        BibEntry('ARTICLE', 'flaky', {'title': 'Party switching', 'doi': '10.1/flaky'}),
+        BibEntry('BOOK', 'book', {'title': 'Political Order', 'date': '1968',
+                                  'isbn': '9780306406157'}),
+        BibEntry('ARTICLE', 'unchecked', {'title': 'Not yet looked up', 'doi': '10.1/later'}),
+    ]
+    progress = {
+        'valid': VerificationResult('10.1/valid', '10.1/valid', resolves=True, status_code=200,
+                                    crossref_title='Trust in parliaments',
+                                    crossref_year='2020', crossref_type='journal-article'),
+        'moved': VerificationResult('10.1/moved', '10.1/moved', resolves=True, status_code=200,
+                                    crossref_title='A different paper entirely',
+                                    crossref_year='2015'),
+        'missing': VerificationResult('10.1/missing', '10.1/missing', status_code=404,
+                                      error='Not found'),
+        'typo': VerificationResult('not-a-doi', '', format_valid=False,
+                                   error='Invalid DOI format'),
+        'flaky': VerificationResult('10.1/flaky', '10.1/flaky', error='Timeout',
+                                    retryable=True, attempts=2,
+                                    error_history=['Timeout', 'Timeout']),
+        isbn_progress_key('book'): ISBNResult('9780306406157', '9780306406157',
+                                              found={'openlibrary': True, 'googlebooks': None},
+                                              title='Political Order', year='1968'),
+    }
+    return entries, progress
+
+
+def report_rows() -> list[dict]:
+    entries, progress = library()
+    return list(iter_report_rows(entries, progress, {}))
+
+
+def test_rows_cover_each_category():
+    rows = report_rows()
+    assert [(row['cite_key'], row['category']) for row in rows] == [
+        ('valid', 'valid'), ('moved', 'valid'), ('missing', 'not_found'),
+        ('typo', 'invalid_format'), ('flaky', 'retryable'), ('book', 'no_doi')]
+    moved = rows[1]
+    assert (moved['title_mismatch'], moved['year_mismatch']) == (True, True)
+    assert rows[-1]['isbn_category'] == 'confirmed'
+
+
+def test_writers_agree_on_the_same_rows(tmp_path):
+    rows = report_rows()
+    entries, progress = library()
+    paths = generate_report(entries, progress, str(tmp_path),
+                            formats=('text', 'csv', 'jsonl', 'sqlite'))
+    assert set(paths) == {'text', 'csv', 'jsonl', 'sqlite', 'duplicates'}
+
+    with open(paths['jsonl'], encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == json.loads(json.dumps(rows))
+
+    with open(paths['csv'], newline='') as f:
+        written = list(csv.DictReader(f))
+    assert [row['cite_key'] for row in written] == [row['cite_key'] for row in rows]
+    for line, row in zip(written, rows):
+        for name in CSV_COLUMNS:
+            value = row[name]
+            if name in ('title_similarity', 'suggestion_score') and value is not None:
+                value = round(value, 2)
+            assert line[name] == ('' if value is None else str(value)), (row['cite_key'], name)
+
+    store = ResultStore(paths['sqlite'])
+    stored = store.query()
+    store.close()
+    assert [record[0] for record in stored] == sorted(row['cite_key'] for row in rows)
+    by_key = {row['cite_key']: row for row in rows}
+    for record in stored:
+        row = by_key[record[0]]
+        for name, value in zip(REPORT_COLUMN_NAMES, record):
+            expected = row[name]
+            if isinstance(expected, bool):
+                expected = int(expected)
+            elif isinstance(expected, list):
+                expected = json.dumps(expected)
+            assert value == expected, (row['cite_key'], name)
+
+    with open(paths['text'], encoding='utf-8') as f:
+        text = f.read()
+    # Flagged rows are listed; the valid one and the confirmed book are not.
+    assert set(re.findall(r'^  \[(\w+)\]$', text, re.M)) == {'moved', 'missing', 'typo',
+                                                           'flaky'}
+    assert '⚠ 1 DOIs not yet checked' in text
+    assert 'ISBNs confirmed:      1' in text
+
+
+def test_parquet_matches_the_rows(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    rows = report_rows()
+    entries, progress = library()
+    paths = generate_report(entries, progress, str(tmp_path), formats=('parquet',))
+    table = pq.read_table(paths['parquet'])
+    assert table.to_pylist() == [{name: row[name] for name in table.column_names}
+                                 for row in rows]
+
+
+@pytest.mark.parametrize('formats', [('text',), ('csv',), ('jsonl', 'sqlite'), ()])
+def test_only_the_requested_writers_run(tmp_path, formats):
+    entries, progress = library()
+    paths = generate_report(entries, progress, str(tmp_path), formats=formats)
+    expected = {fmt: os.path.join(str(tmp_path), REPORT_WRITERS[fmt].filename)
+                for fmt in formats}
+    if 'csv' in formats:
+        expected['duplicates'] = os.path.join(str(tmp_path), 'doi_verification_duplicates.csv')
+    assert paths == expected
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in expected.values())
+
+
+@pytest.mark.skipif(not os.path.exists(EXISTING_CSV), reason='no earlier results CSV')
+def test_csv_header_matches_earlier_runs(tmp_path):
+    with open(EXISTING_CSV, newline='') as f:
+        header = next(csv.reader(f))
+    assert header == CSV_COLUMNS
+    entries, progress = library()
+    paths = generate_report(entries, progress, str(tmp_path), formats=('csv',))
+    with open(paths['csv'], newline='') as f:
+        assert next(csv.reader(f)) == header
+
+
+def test_report_paths_are_aligned(capsys):
+    print_report_paths({'text': 'out/report.txt', 'csv': 'out/results.csv',
+                        'snapshot': 'out/snapshots/1.json', 'duplicates': 'out/dups.csv'})
+    lines = capsys.readouterr().out.splitlines()[1:]
+    assert lines[0] == 'Report:     out/report.txt'
+    assert len({line.index(' out/') for line in lines}) == 1
@@ -0,0 +1,108 @@
+from datetime import datetime
+
+import pytest
+
+from doi_verification.records import BibEntry, VerificationResult
+from doi_verification.revalidate import (REVALIDATE_AFTER_DAYS, REVALIDATE_FAILED,
+                                         REVALIDATE_ONLINE_FIRST, REVALIDATE_STABLE,
+                                         plan_revalidation, revalidation_tier)
+from doi_verification.similarity import TITLE_MISMATCH_THRESHOLDS, similarity
+
+NOW = datetime(2026, 6, 1, 12).timestamp()
+DAY = 86400
+
+
+def entry(key: str, title: str = 'Trust in Thailand', year: str = '2020') -> BibEntry:
+    return BibEntry('ARTICLE', key, {'doi': f'10.1/{key}', 'title': title, 'date': year})
+
+
+def result(key: str, days_ago: float = 365, resolves: bool = True, title='Trust in Thailand',
+           year: str = '2020', **fields) -> VerificationResult:
+    values = {'resolves': resolves, 'status_code': 200 if resolves else 404,
+              'crossref_title': title if resolves else None,
+              'crossref_year': year if resolves else None,
+              'verified_at': round(NOW - days_ago * DAY)}
+    values.update(fields)
+    return VerificationResult(f'10.1/{key}', f'10.1/{key}', **values)
+
+
+def tier(entry_, result_) -> int | None:
+    return revalidation_tier(entry_, result_, similarity, TITLE_MISMATCH_THRESHOLDS['sequence'],
+                             2026)
+
+
+def test_tiers():
+    assert tier(entry('a'), result('a', resolves=False)) == REVALIDATE_FAILED
+    assert tier(entry('a'), result('a', year='2019')) == REVALIDATE_FAILED
+    assert tier(entry('a'), result('a', title='Coffee prices in Brazil')) == REVALIDATE_FAILED
+    assert tier(entry('a', year='2025'), result('a', year='2025', online_first=True)) \
+        == REVALIDATE_ONLINE_FIRST
+    # Saved before online_first was recorded: recent counts as online-first.
+    assert tier(entry('a', year='2024'), result('a', year='2024', verified_at=None)) \
+        == REVALIDATE_ONLINE_FIRST
+    assert tier(entry('a', year='2019'), result('a', year='2019', online_first=True)) \
+        == REVALIDATE_STABLE
+    assert tier(entry('a'), result('a')) == REVALIDATE_STABLE
+
+
+@pytest.mark.parametrize('fields', [{'format_valid': False, 'resolves': False},
+                                    {'resolves': False, 'status_code': 503, 'retryable': True}])
+def test_final_and_transient_results_are_not_queued(fields):
+    assert tier(entry('a'), result('a', **fields)) is None
+
+
+def library():
+    """Keys tell the tier and how many days ago the result was verified."""
+    specs = [('stable-400', '2020', {}), ('stable-100', '2020', {}),
+             ('stable-500', '2020', {}), ('stable-30', '2020', {}),
+             ('online-10', '2025', {'online_first': True}),
+             ('online-3', '2025', {'online_first': True}),
+             ('failed-2', '2020', {'resolves': False}),
+             ('mismatch-5', '2020', {'year': '2018'}),
+             ('failed-0.5', '2020', {'resolves': False})]
+    entries, progress = [], {}
+    for key, year, fields in specs:
+        days = float(key.rsplit('-', 1)[1])
+        entries.append(entry(key, year=year))
+        progress[key] = result(key, days, year=fields.pop('year', year), **fields)
+    return entries, progress
+
+
+def test_due_results_are_served_by_tier_then_oldest_first():
+    entries, progress = library()
+    picked, counts = plan_revalidation(entries, progress, budget=100, now=NOW)
+    assert [e.key for e in picked] == ['mismatch-5', 'failed-2', 'online-10',
+                                       'stable-500', 'stable-400', 'stable-100']
+    assert counts == {'failed or mismatched': {'due': 2, 'picked': 2},
+                      'online-first': {'due': 1, 'picked': 1},
+                      'stable': {'due': 3, 'picked': 3}}
+
+
+def test_due_windows():
+    assert REVALIDATE_AFTER_DAYS == (1, 7, 90)
+    entries, progress = library()
+    later = NOW + 8 * DAY
+    picked, _ = plan_revalidation(entries, progress, budget=100, now=later)
+    # Eight days on, the 0.5- and 3-day-old results are due too, and the
+    # 30-day-old stable one still is not.
+    assert 'failed-0.5' in {e.key for e in picked} and 'online-3' in {e.key for e in picked}
+    assert 'stable-30' not in {e.key for e in picked}
+
+
+def test_budget_and_exclude():
+    entries, progress = library()
+    picked, counts = plan_revalidation(entries, progress, budget=3, now=NOW)
+    assert [e.key for e in picked] == ['mismatch-5', 'failed-2', 'online-10']
+    assert counts['stable'] == {'due': 3, 'picked': 0}
+    excluded = [e for e in entries if e.key in ('mismatch-5', 'stable-500')]
+    picked, counts = plan_revalidation(entries, progress, budget=3, exclude=excluded, now=NOW)
+    assert [e.key for e in picked] == ['failed-2', 'online-10', 'stable-400']
+    assert counts['failed or mismatched']['due'] == 1
+    assert plan_revalidation(entries, progress, budget=0, now=NOW)[0] == []
+
+
+def test_entries_without_saved_results_are_skipped():
+    entries, progress = library()
+    del progress['mismatch-5']
+    picked, _ = plan_revalidation(entries, progress, budget=1, now=NOW)
+    assert [e.key for e in picked] == ['failed-2']
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from doi_verification.similarity import (DEFAULT_TITLE_SCORER, TITLE_MISMATCH_THRESHOLDS,
+                                         TITLE_SCORERS, levenshtein, normalize_title,
+                                         score_titles, score_titles_parallel, similarity,
+                                         token_set_ratio)
+from doi_verification.suggest import TitleIndex
+
+LONG_TITLE = 'Risk and uncertainty in modern finance'
+
+
+def reference_levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+
+def test_default_scorer_is_sequence():
+    assert DEFAULT_TITLE_SCORER == 'sequence'
+    assert TITLE_SCORERS['sequence'] is similarity
+
+
+def test_normalize_strips_markup_and_punctuation():
+    assert (normalize_title('The <i>{COVID-19}</i> Crisis:  \\textit{Thailand}')
+            == 'the covid 19 crisis thailand')
+
+
+@pytest.mark.parametrize('short', ['Risk', 'Modern finance', 'Uncertainty'])
+def test_short_subset_is_not_a_match(short):
+    # A CrossRef title whose few words all appear in the bib title is a
+    # different work, not a truncated match; it must stay under the cutoff.
+    for a, b in ((short, LONG_TITLE), (LONG_TITLE, short)):
+        assert token_set_ratio(a, b) < TITLE_MISMATCH_THRESHOLDS['token_set']
+
+
+def test_long_subset_is_a_match():
+    assert token_set_ratio('Trust in government and democracy in Thailand',
+                           'Trust in Government and Democracy in Thailand: A Survey') == 1.0
+    assert token_set_ratio('Political trust and institutions',
+                           'Political Trust and Institutions') == 1.0
+
+
+def test_levenshtein_matches_reference():
+    rng = random.Random(5)
+    for _ in range(300):
+        a = ''.join(rng.choice('abcd ') for _ in range(rng.randint(0, 30)))
+        b = ''.join(rng.choice('abcd ') for _ in range(rng.randint(0, 30)))
+        assert levenshtein(a, b) == reference_levenshtein(a, b)
+
+
+def test_parallel_scores_match_serial(monkeypatch):
+    monkeypatch.setattr('doi_verification.similarity.SCORE_BATCH_SIZE', 50)
+    rng = random.Random(9)
+    words = LONG_TITLE.split() + ['trust', 'Thailand', 'democracy']
+    pairs = [(' '.join(rng.sample(words, rng.randint(1, 6))),
+              ' '.join(rng.sample(words, rng.randint(1, 6)))) for _ in range(220)]
+    for scorer in TITLE_SCORERS:
+        assert score_titles_parallel(pairs, scorer, jobs=2) == score_titles(pairs, scorer)
+
+
+@pytest.mark.parametrize('scorer', sorted(TITLE_SCORERS))
+def test_suggestions_skip_short_subset_titles(scorer):
+    index = TitleIndex(scorer)
+    index.add('10.1/risk', 'Risk', 2020, ['knight'])
+    index.add('10.1/finance', 'Risk and Uncertainty in Modern Finance', 2020, ['knight'])
+    suggestions = index.suggest(LONG_TITLE, 2020, ['knight'])
+    assert [s['doi'] for s in suggestions] == ['10.1/finance']
+    assert index.suggest(LONG_TITLE, 2020, ['knight'], exclude={'10.1/finance'}) == []
@@ -0,0 +1,124 @@
+import json
+import os
+
+import pytest
+
+from doi_verification.snapshots import (SNAPSHOT_DIR, SnapshotReportWriter, diff_snapshots,
+                                        list_snapshots, snapshot_state)
+from stubs import write_bib
+
+
+def row(key: str, category: str = 'valid', doi: str = None, **fields) -> dict:
+    values = {'cite_key': key, 'doi': doi if doi is not None else f'10.1/{key}',
+              'category': category, 'status_code': 200, 'title_mismatch': False,
+              'year_mismatch': False, 'title_similarity': 0.9, 'crossref_title': 'Title',
+              'bib_date': '2020', 'crossref_year': '2020', 'isbn_category': None,
+              'isbn_error': None, 'isbn': None, 'error': None}
+    values.update(fields)
+    return values
+
+
+def write_snapshot(output_dir, rows: list[dict]) -> str:
+    writer = SnapshotReportWriter(str(output_dir))
+    for values in rows:
+        writer.write(values)
+    writer.close({})
+    return writer.path
+
+
+def changes_by_key(changes: list[dict]) -> dict:
+    return {c['cite_key']: (c['change'], c['old_state'], c['new_state']) for c in changes}
+
+
+def test_snapshot_state():
+    assert snapshot_state(row('a')) == 'valid'
+    assert snapshot_state(row('a', title_mismatch=True, year_mismatch=True)) \
+        == 'title_year_mismatch'
+    assert snapshot_state(row('a', year_mismatch=True)) == 'year_mismatch'
+    assert snapshot_state(row('a', 'not_found')) == 'not_found'
+    assert snapshot_state(row('a', 'no_doi', isbn_category='confirmed')) == 'isbn_confirmed'
+
+
+def test_diff_classifies_changes(tmp_path):
+    write_snapshot(tmp_path, [
+        row('broken'), row('fixed', 'not_found'), row('moved'), row('worse', 'not_found'),
+        row('same', 'errors'), row('removed'), row('book', 'no_doi', isbn_category='invalid')])
+    write_snapshot(tmp_path, [
+        row('broken', 'not_found'), row('fixed'), row('moved', doi='10.1/elsewhere'),
+        row('worse', title_mismatch=True), row('same', 'errors'),
+        row('book', 'no_doi', isbn_category='confirmed'),
+        row('new'), row('new-broken', 'invalid_format')])
+    old, new = list_snapshots(str(tmp_path))
+    changes = diff_snapshots(old, new)
+    assert changes_by_key(changes) == {
+        'broken': ('broken', 'valid', 'not_found'),
+        'new-broken': ('broken', '', 'invalid_format'),
+        'book': ('fixed', 'isbn_invalid', 'isbn_confirmed'),
+        'fixed': ('fixed', 'not_found', 'valid'),
+        'moved': ('changed', 'valid', 'valid'),
+        'worse': ('changed', 'not_found', 'title_mismatch'),
+        'new': ('added', '', 'valid'),
+        'removed': ('removed', 'valid', ''),
+    }
+    # Sorted by change, then cite key.
+    assert [c['cite_key'] for c in changes] == [
+        'broken', 'new-broken', 'book', 'fixed', 'moved', 'worse', 'new', 'removed']
+    assert next(c for c in changes if c['cite_key'] == 'moved')['old_doi'] == '10.1/moved'
+
+
+def test_pending_results_are_neither_broken_nor_fixed(tmp_path):
+    write_snapshot(tmp_path, [row('a'), row('b', 'not_found'), row('c', 'retryable'),
+                              row('d', 'no_doi', isbn_category='retryable')])
+    write_snapshot(tmp_path, [row('a', 'retryable'), row('b', 'retryable'), row('c'),
+                              row('d', 'no_doi', isbn_category='confirmed'),
+                              row('e', 'retryable')])
+    changes = diff_snapshots(*list_snapshots(str(tmp_path)))
+    assert {key: change for key, (change, _, _) in changes_by_key(changes).items()} == {
+        'a': 'changed', 'b': 'changed', 'c': 'changed', 'd': 'changed', 'e': 'added'}
+
+
+def test_identical_run_reuses_the_previous_snapshot(tmp_path):
+    rows = [row('a'), row('b', 'not_found', error='DOI not found (404)')]
+    first = write_snapshot(tmp_path, rows)
+    assert write_snapshot(tmp_path, rows) == first
+    assert os.listdir(tmp_path / SNAPSHOT_DIR) == [os.path.basename(first)]
+    second = write_snapshot(tmp_path, rows[:1])
+    assert second != first
+    assert [s.run_id for s in list_snapshots(str(tmp_path))] == [1, 2]
+
+
+def test_diff_picks_runs_by_id_or_from_the_latest(tmp_path, run_cli):
+    for keys in (['a'], ['a', 'b'], ['a', 'b', 'c']):
+        write_snapshot(tmp_path, [row(key) for key in keys])
+    snapshots = list_snapshots(str(tmp_path))
+
+    def diff(*argv) -> list[str]:
+        out = run_cli('diff', tmp_path, *argv, '--format', 'json')
+        return [(c['change'], c['cite_key']) for c in json.loads(out)]
+
+    assert diff() == [('added', 'c')]
+    assert diff('--from', -3, '--to', -1) == [('added', 'b'), ('added', 'c')]
+    assert diff('--from', 2, '--to', -3) == [('removed', 'b')]
+    assert diff('--from', 1) == [
+        (c['change'], c['cite_key']) for c in diff_snapshots(snapshots[0], snapshots[2])]
+    assert diff('--only', 'removed') == []
+    with pytest.raises(SystemExit):
+        diff('--from', -4)
+    with pytest.raises(SystemExit):
+        diff('--to', 9)
+
+
+def test_runs_are_snapshotted_and_diffed(tmp_path, crossref, run_cli):
+    bib = tmp_path / 'refs.bib'
+    write_bib(bib, [{'key': f'k{i}', 'title': f'Title for 10.5555/t.{i}', 'date': 2020,
+                     'doi': f'10.5555/t.{i}'} for i in range(4)])
+    common = (bib, '--api-url', crossref.url, '--delay', 0, '--no-cache', '--no-isbn',
+              '--no-suggestions', '--formats', 'text,snapshot')
+    run_cli(*common)
+    crossref.works['10.5555/t.1'] = None
+    run_cli(*common)
+    out = run_cli('diff', tmp_path, '--format', 'json')
+    assert [(c['change'], c['cite_key'], c['new_state']) for c in json.loads(out)] == [
+        ('broken', 'k1', 'not_found')]
+    listed = json.loads(run_cli('diff', tmp_path, '--list', '--format', 'json'))
+    assert [(r['run'], r['entries'], r['broken']) for r in listed] == [(1, 4, 0), (2, 4, 1)]
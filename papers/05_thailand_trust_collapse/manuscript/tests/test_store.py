@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from doi_verification.progress import PROGRESS_FILE, load_progress
+from doi_verification.store import STORE_FILE, ResultStore
+from stubs import write_bib
+
+
+def library(n: int) -> list[dict]:
+    return [{'key': f'k{i}', 'title': f'Title for 10.5555/t.{i}', 'year': 2020,
+             'doi': f'10.5555/t.{i}'} for i in range(n)]
+
+
+@pytest.fixture
+def migrated(tmp_path, crossref, run_cli):
+    """A directory moved to the store after a JSON run, with one more entry
+    verified into the store only."""
+    bib = tmp_path / 'refs.bib'
+    common = (bib, '--api-url', crossref.url, '--delay', 0, '--no-cache', '--no-isbn',
+              '--no-suggestions')
+    write_bib(bib, library(10))
+    run_cli(*common)
+    run_cli(*common, '--store', 'sqlite', '--resume')
+    write_bib(bib, library(11))
+    run_cli(*common, '--store', 'sqlite', '--resume')
+    crossref.requests.clear()
+    return tmp_path, common
+
+
+def stored_runs(tmp_path) -> list[tuple]:
+    store = ResultStore(str(tmp_path / STORE_FILE))
+    try:
+        return store.runs()
+    finally:
+        store.close()
+
+
+def test_migration_keeps_the_json_progress_as_it_was(migrated):
+    tmp_path, _ = migrated
+    assert len(load_progress(str(tmp_path / PROGRESS_FILE))) == 10
+    assert len(load_progress(str(tmp_path / STORE_FILE))) == 11
+    # The migrating run had nothing to check, and is still in the history.
+    assert [checked for _, _, _, checked in stored_runs(tmp_path)] == [1, 0]
+
+
+def test_plain_resume_after_migration_uses_the_store(migrated, crossref, run_cli):
+    tmp_path, common = migrated
+    out = run_cli(*common, '--resume')
+    assert crossref.requests == []
+    assert '11 unchanged' in out and 'All DOIs already verified' in out
+    assert len(stored_runs(tmp_path)) == 3
+    assert len(load_progress(str(tmp_path / PROGRESS_FILE))) == 10
+
+
+def test_plain_report_after_migration_reads_the_store(migrated, run_cli):
+    _, common = migrated
+    assert 'Regenerating report from 11 saved results' in run_cli(*common, '--report')
+
+
+def test_newer_json_progress_wins(migrated, crossref, run_cli):
+    tmp_path, common = migrated
+    run_cli(*common, '--store', 'json', '--resume')
+    assert len(load_progress(str(tmp_path / PROGRESS_FILE))) == 11
+    crossref.requests.clear()
+    out = run_cli(*common, '--resume')
+    assert crossref.requests == [] and '11 unchanged' in out
+    assert len(stored_runs(tmp_path)) == 2
+
+
+def test_query_runs_without_run_history(migrated, run_cli):
+    tmp_path, _ = migrated
+    with sqlite3.connect(tmp_path / STORE_FILE) as conn:
+        conn.execute('DELETE FROM runs')
+    rows = json.loads(run_cli('query', tmp_path, '--runs', 1, '--format', 'json'))
+    assert len(rows) == 11
+    assert os.path.exists(tmp_path / STORE_FILE)
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+import pytest
+
+from doi_verification import cli, watch
+from doi_verification.progress import PROGRESS_FILE, load_progress
+from stubs import write_bib
+
+SETTLE = 0.3  # seconds
+
+
+@pytest.fixture
+def polling(monkeypatch):
+    monkeypatch.setattr(watch, '_inotify_watch', lambda directory: None)
+
+
+def start_waiting(watcher: watch.FileWatcher) -> list[float]:
+    """Run ``watcher.wait()`` in a thread; the list gets the time it returned."""
+    returned = []
+
+    def wait():
+        watcher.wait()
+        returned.append(time.monotonic())
+    threading.Thread(target=wait, daemon=True).start()
+    return returned
+
+
+def wait_for(returned: list[float], timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not returned and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_rewrite_fires_once_it_settles(tmp_path, polling):
+    path = tmp_path / 'refs.bib'
+    path.write_text('@article{a,\n')
+    watcher = watch.FileWatcher(str(path), interval=0.02, settle=SETTLE)
+    assert watcher.mode.startswith('polling')
+    returned = start_waiting(watcher)
+    # A download arriving in pieces, each within the settle time of the last.
+    for piece in ('  title = {A},\n', '  doi = {10.5555/t.1}\n', '}\n'):
+        time.sleep(SETTLE / 2)
+        with open(path, 'a') as f:
+            f.write(piece)
+        last_write = time.monotonic()
+        assert not returned
+    wait_for(returned)
+    assert returned and returned[0] - last_write >= SETTLE
+    watcher.close()
+
+
+def test_rename_over_the_file_is_seen(tmp_path, polling):
+    path = tmp_path / 'refs.bib'
+    path.write_text('@article{a, doi = {10.5555/t.1}}\n')
+    st = os.stat(path)
+    watcher = watch.FileWatcher(str(path), interval=0.02, settle=0.05)
+    returned = start_waiting(watcher)
+    # Same size and mtime: only the inode tells the new export apart.
+    tmp = tmp_path / 'refs.bib.part'
+    tmp.write_text('@article{a, doi = {10.5555/t.2}}\n')
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp, path)
+    wait_for(returned)
+    assert returned
+    watcher.close()
+
+
+def entry(i: int, doi: int = None) -> dict:
+    return {'key': f'k{i}', 'title': f'Title for 10.5555/t.{doi or i}', 'date': 2020,
+            'doi': f'10.5555/t.{doi or i}'}
+
+
+def test_new_export_rechecks_only_added_and_changed(tmp_path, crossref, run_cli,
+                                                    monkeypatch):
+    bib = tmp_path / 'refs.bib'
+    write_bib(bib, [entry(i) for i in range(1, 6)])
+    seen = {}
+
+    class OneExport:
+        """Delivers one new export, then stops watching as Ctrl+C would."""
+
+        def __init__(self, path, interval):
+            self.mode = 'test'
+            self.exports = 0
+
+        def wait(self):
+            if self.exports:
+                raise KeyboardInterrupt
+            self.exports += 1
+            seen['first pass'] = sorted(crossref.paths())
+            crossref.requests.clear()
+            # k2 now cites another DOI, k5 is gone and k6 is new.
+            write_bib(bib, [entry(1), entry(2, doi=20), entry(3), entry(4), entry(6)])
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(cli, 'FileWatcher', OneExport)
+    out = run_cli(bib, '--watch', '--api-url', crossref.url, '--delay', 0, '--no-cache',
+                  '--no-isbn', '--no-suggestions', '--formats', 'text,csv')
+    assert seen['first pass'] == sorted(f'/works/10.5555%2Ft.{i}' for i in range(1, 6))
+    assert sorted(crossref.paths()) == ['/works/10.5555%2Ft.20', '/works/10.5555%2Ft.6']
+    assert '1 added, 1 changed, 1 removed' in out
+    assert 'Stopped watching.' in out
+    progress = load_progress(str(tmp_path / PROGRESS_FILE))
+    assert sorted(progress) == ['k1', 'k2', 'k3', 'k4', 'k6']
+    assert progress['k2'].cleaned_doi == '10.5555/t.20'
+    with open(tmp_path / 'doi_verification_results.csv', encoding='utf-8') as f:
+        assert len(f.readlines()) == 6
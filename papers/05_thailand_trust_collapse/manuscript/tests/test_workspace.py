@@ -0,0 +1,57 @@
+import os
+
+from doi_verification.progress import PROGRESS_FILE, load_progress
+from doi_verification.workspace import discover_bib_files, workspace_output_dirs
+from stubs import write_bib
+
+
+def bib_entries(dois: range, prefix: str) -> list[dict]:
+    return [{'key': f'{prefix}{i}', 'title': f'Title for 10.5555/t.{i}', 'date': 2020,
+             'doi': f'10.5555/t.{i}'} for i in dois]
+
+
+def test_discovery_and_output_dirs(tmp_path):
+    paths = ['library.bib', 'papers/01_a/manuscript/refs.bib', 'papers/02_b/main.bib',
+             'papers/02_b/extra.bib', 'papers/02_b/.cache/old.bib', 'notes/other.bib']
+    for path in paths:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text('')
+    found = discover_bib_files(str(tmp_path))
+    assert found == sorted(str(tmp_path / path) for path in paths[:4])
+    out = workspace_output_dirs(found)
+    assert out[str(tmp_path / 'library.bib')] == str(tmp_path)
+    assert out[str(tmp_path / paths[1])] == str(tmp_path / 'papers/01_a/manuscript')
+    # Two bibs in one directory each get their own.
+    assert out[str(tmp_path / paths[2])] == str(tmp_path / 'papers/02_b/doi_check_main')
+    assert out[str(tmp_path / paths[3])] == str(tmp_path / 'papers/02_b/doi_check_extra')
+
+
+def test_shared_dois_are_looked_up_once(tmp_path, crossref, run_cli):
+    a = tmp_path / 'papers/01_a/refs.bib'
+    b = tmp_path / 'papers/02_b/refs.bib'
+    for path in (a, b):
+        path.parent.mkdir(parents=True)
+    write_bib(a, bib_entries(range(0, 10), 'a'))
+    write_bib(b, bib_entries(range(5, 15), 'b'))
+    common = ('--workspace', tmp_path, '--api-url', crossref.url, '--delay', 0,
+              '--no-cache', '--no-isbn', '--no-suggestions', '--formats', 'text,csv')
+    out = run_cli(*common)
+    assert 'Entries to check:  20' in out
+    assert 'Network lookups:   15 (de-duplication saves 5)' in out
+    assert sorted(crossref.paths()) == sorted(f'/works/10.5555%2Ft.{i}' for i in range(15))
+    for path, prefix, dois in ((a, 'a', range(0, 10)), (b, 'b', range(5, 15))):
+        progress = load_progress(str(path.parent / PROGRESS_FILE))
+        assert sorted(progress) == sorted(f'{prefix}{i}' for i in dois)
+        assert all(r.resolves and r.cleaned_doi == f'10.5555/t.{key[1:]}'
+                   for key, r in progress.items())
+        with open(path.parent / 'doi_verification_results.csv', encoding='utf-8') as f:
+            assert len(f.readlines()) == 11
+        assert os.path.exists(path.parent / 'doi_verification_report.txt')
+
+    # A DOI another paper already verified costs nothing on resume.
+    write_bib(b, bib_entries(range(5, 15), 'b') + bib_entries(range(0, 1), 'new'))
+    crossref.requests.clear()
+    out = run_cli(*common, '--resume')
+    assert 'Distinct DOIs:     1 (1 already verified in another paper)' in out
+    assert crossref.requests == []
+    assert load_progress(str(b.parent / PROGRESS_FILE))['new0'].resolves